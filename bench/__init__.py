@@ -0,0 +1,2 @@
+# bench/__init__.py
+"""Нагрузочные тесты и замеры бота; запускаются офлайн, Telegram не нужен"""
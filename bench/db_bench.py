@@ -0,0 +1,359 @@
+# bench/db_bench.py
+"""Замеры методов Database на синтетических данных заданного объема.
+
+Временная БД (или --db) создается миграциями бота и заполняется
+пользователями, заданиями администраторов и запросами работников за
+последний год. Затем каждый метод вызывается --iterations раз со
+случайными аргументами; печатаются среднее, p50/p95/p99 и число вызовов
+в секунду, а --json сохраняет результаты вместе с параметрами запуска и
+профилем SQL-запросов - чтобы сравнивать индексы, PRAGMA и кэши по
+цифрам.
+
+Запуск из корня проекта:
+    python -m bench.db_bench --workers 2000 --admin-tasks 200000 --json db_bench.json
+    python -m bench.db_bench --filter timeline --iterations 1000
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import random
+import sqlite3
+import statistics
+import tempfile
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Callable, List
+
+from config import Config
+from database import Database
+
+logger = logging.getLogger(__name__)
+
+SEED_CHUNK = 10000
+WARMUP = 5
+_TIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+_WORDS = (
+    'бетон', 'арматура', 'опалубка', 'кран', 'леса', 'кирпич', 'секция', 'подъезд', 'этаж',
+    'кровля', 'фасад', 'утеплитель', 'щебень', 'песок', 'электрика', 'сварка', 'демонтаж',
+    'залить', 'привезти', 'проверить', 'смонтировать', 'убрать', 'закрыть', 'разгрузить',
+)
+_NAMES = ('Иванов', 'Петров', 'Сидоров', 'Кузнецов', 'Смирнов', 'Попов', 'Васильев', 'Соколов',
+          'Михайлов', 'Новиков', 'Федоров', 'Морозов', 'Волков', 'Алексеев', 'Лебедев', 'Козлов')
+_FIRST_NAMES = ('Иван', 'Петр', 'Сергей', 'Алексей', 'Андрей', 'Дмитрий', 'Олег', 'Николай')
+
+ADMIN_STATUSES = (('pending', 20), ('accepted', 50), ('completed', 20), ('commented', 10))
+WORKER_STATUSES = (('pending', 10), ('approved', 70), ('rejected', 20))
+
+
+@dataclass
+class SeedData:
+    """Что лежит в БД: ID для случайных аргументов"""
+    admins: List[int] = field(default_factory=list)
+    workers: List[int] = field(default_factory=list)
+    admin_task_ids: range = range(0)
+    worker_task_ids: range = range(0)
+
+
+def _choices(rng: random.Random, weighted: tuple, count: int) -> list:
+    values, weights = zip(*weighted)
+    return rng.choices(values, weights, k=count)
+
+
+def _text(rng: random.Random) -> str:
+    return ' '.join(rng.choice(_WORDS) for _ in range(rng.randint(3, 8))).capitalize()
+
+
+def _insert_chunks(conn: sqlite3.Connection, sql: str, rows, total: int):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= SEED_CHUNK:
+            conn.executemany(sql, chunk)
+            conn.commit()
+            chunk = []
+    if chunk:
+        conn.executemany(sql, chunk)
+        conn.commit()
+    logger.info("Записано %s строк: %s", total, sql.split('(')[0].strip())
+
+
+def seed(db: Database, rng: random.Random, workers: int, admins: int, admin_tasks: int,
+         worker_tasks: int) -> SeedData:
+    """Заполняем БД синтетическими данными (триггеры счетчиков и поиска работают как обычно)"""
+    data = SeedData()
+    now = datetime.now()
+    year = 365 * 24 * 3600
+
+    def moment() -> datetime:
+        return now - timedelta(seconds=rng.randrange(year))
+
+    data.admins = list(range(1, admins + 1))
+    data.workers = list(range(1000, 1000 + workers))
+    users = [
+        (user_id, f'user{user_id}', f'{rng.choice(_NAMES)} {rng.choice(_FIRST_NAMES)} {user_id}',
+         'admin' if user_id <= admins else 'worker', moment().strftime(_TIME_FORMAT))
+        for user_id in data.admins + data.workers
+    ]
+    _insert_chunks(db.conn, 'INSERT INTO users (user_id, username, fio, role, registered_at) VALUES (?, ?, ?, ?, ?)',
+                   users, len(users))
+    db.conn.executemany('INSERT OR IGNORE INTO admins (user_id) VALUES (?)', [(user_id,) for user_id in data.admins])
+    db.conn.commit()
+    db._load_admin_ids()
+
+    def admin_rows():
+        for status in _choices(rng, ADMIN_STATUSES, admin_tasks):
+            created = moment()
+            read_at = completed_at = comment = None
+            if status != 'pending':
+                read_at = (created + timedelta(seconds=rng.randrange(60, 6 * 3600))).strftime(_TIME_FORMAT)
+            if status == 'completed':
+                completed_at = read_at
+            if status == 'commented':
+                comment = _text(rng)
+            yield (rng.choice(data.admins), rng.choice(data.workers), _text(rng), status,
+                   created.strftime(_TIME_FORMAT), read_at, completed_at, comment)
+
+    _insert_chunks(db.conn, '''
+        INSERT INTO admin_tasks (from_admin_id, to_worker_id, task_text, status, created_at, read_at,
+                                 completed_at, worker_comment)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)''', admin_rows(), admin_tasks)
+
+    def worker_rows():
+        for status in _choices(rng, WORKER_STATUSES, worker_tasks):
+            created = moment()
+            reviewed_at = reviewed_by = comment = None
+            if status != 'pending':
+                reviewed_at = (created + timedelta(seconds=rng.randrange(60, 24 * 3600))).strftime(_TIME_FORMAT)
+                reviewed_by = rng.choice(data.admins)
+            if status == 'rejected':
+                comment = _text(rng)
+            yield (rng.choice(data.workers), _text(rng), status, created.strftime(_TIME_FORMAT),
+                   comment, reviewed_at, reviewed_by)
+
+    _insert_chunks(db.conn, '''
+        INSERT INTO worker_tasks (from_worker_id, task_text, status, created_at, admin_comment,
+                                  reviewed_at, reviewed_by)
+        VALUES (?, ?, ?, ?, ?, ?, ?)''', worker_rows(), worker_tasks)
+
+    db.conn.execute('ANALYZE')
+    db.conn.commit()
+    data.admin_task_ids = range(1, admin_tasks + 1)
+    data.worker_task_ids = range(1, worker_tasks + 1)
+    return data
+
+
+def load(db: Database) -> SeedData:
+    """SeedData по уже заполненной БД (--db с данными)"""
+    cursor = db.conn.cursor()
+    data = SeedData()
+    data.admins = sorted(db.admin_ids)
+    data.workers = [row[0] for row in cursor.execute("SELECT user_id FROM users WHERE role = 'worker'")]
+    data.admin_task_ids = range(1, cursor.execute('SELECT COALESCE(MAX(task_id), 0) FROM admin_tasks').fetchone()[0] + 1)
+    data.worker_task_ids = range(1, cursor.execute('SELECT COALESCE(MAX(task_id), 0) FROM worker_tasks').fetchone()[0] + 1)
+    return data
+
+
+@dataclass
+class Benchmark:
+    """Замер: method - имя метода Database, args(data, rng) - его аргументы"""
+    name: str
+    method: str
+    args: Callable[[SeedData, random.Random], tuple] = lambda data, rng: ()
+    kwargs: dict = field(default_factory=dict)
+
+
+def _worker(data: SeedData, rng: random.Random) -> tuple:
+    return rng.choice(data.workers),
+
+
+def _admin_task(data: SeedData, rng: random.Random) -> tuple:
+    return rng.choice(data.admin_task_ids),
+
+
+def _worker_task(data: SeedData, rng: random.Random) -> tuple:
+    return rng.choice(data.worker_task_ids),
+
+
+BENCHMARKS = [
+    # Профили: на каждом апдейте (попадание в кэш) и промах кэша
+    Benchmark('get_user (cache hit)', 'get_user', lambda data, rng: (data.workers[0],)),
+    Benchmark('load_user', 'load_user', _worker),
+    # Работники
+    Benchmark('get_all_workers', 'get_all_workers'),
+    Benchmark('get_all_worker_ids', 'get_all_worker_ids'),
+    Benchmark('get_workers_page', 'get_workers_page', lambda data, rng: (Config.WORKERS_PAGE_SIZE,)),
+    Benchmark('get_workers_page (anchor)', 'get_workers_page',
+              lambda data, rng: (Config.WORKERS_PAGE_SIZE, rng.choice(data.workers))),
+    Benchmark('search_workers', 'search_workers',
+              lambda data, rng: (rng.choice(_NAMES)[:3], Config.WORKERS_PAGE_SIZE)),
+    # Задания работника
+    Benchmark('get_worker_tasks', 'get_worker_tasks', _worker),
+    Benchmark('get_worker_tasks (pending)', 'get_worker_tasks', lambda data, rng: (rng.choice(data.workers), 'pending')),
+    Benchmark('get_worker_tasks_page', 'get_worker_tasks_page',
+              lambda data, rng: (rng.choice(data.workers), Config.TASKS_PAGE_SIZE)),
+    Benchmark('get_worker_requests', 'get_worker_requests', _worker),
+    # Соединения с users, которые обработчики делают на каждое нажатие кнопки
+    Benchmark('get_admin_task_details', 'get_admin_task_details', _admin_task),
+    Benchmark('get_worker_task_details', 'get_worker_task_details', _worker_task),
+    Benchmark('get_pending_worker_tasks', 'get_pending_worker_tasks'),
+    # Лента, поиск и статистика администратора
+    Benchmark('get_timeline_page', 'get_timeline_page', lambda data, rng: (Config.TIMELINE_PAGE_SIZE,)),
+    Benchmark('get_timeline_page (anchor)', 'get_timeline_page',
+              lambda data, rng: (Config.TIMELINE_PAGE_SIZE, ('a', rng.choice(data.admin_task_ids)))),
+    Benchmark('get_timeline_page (status)', 'get_timeline_page', lambda data, rng: (Config.TIMELINE_PAGE_SIZE,),
+              {'status': 'commented'}),
+    Benchmark('get_timeline_page (worker)', 'get_timeline_page',
+              lambda data, rng: (Config.TIMELINE_PAGE_SIZE,), {'worker_id': 1000}),
+    Benchmark('search_tasks', 'search_tasks',
+              lambda data, rng: (' '.join(rng.sample(_WORDS, 2)), Config.SEARCH_PAGE_SIZE)),
+    Benchmark('get_stats', 'get_stats'),
+    # Запись (каждый вызов - отдельная транзакция)
+    Benchmark('update_task_status', 'update_task_status', lambda data, rng: (rng.choice(data.admin_task_ids), 'accepted')),
+    Benchmark('update_worker_task_status', 'update_worker_task_status',
+              lambda data, rng: (rng.choice(data.worker_task_ids), 'approved', rng.choice(data.admins))),
+    Benchmark('add_admin_task', 'add_admin_task',
+              lambda data, rng: (rng.choice(data.admins), rng.choice(data.workers), _text(rng))),
+    Benchmark('add_worker_task', 'add_worker_task', lambda data, rng: (rng.choice(data.workers), _text(rng))),
+]
+
+
+def _rows(result) -> int:
+    # Методы страниц возвращают (строки, флаги...), остальные - строки или одну строку
+    if isinstance(result, tuple) and result and isinstance(result[0], list):
+        result = result[0]
+    if isinstance(result, (list, set, dict)):
+        return len(result)
+    return int(result is not None)
+
+
+def run_benchmark(db: Database, data: SeedData, benchmark: Benchmark, iterations: int,
+                  rng: random.Random) -> dict:
+    method = getattr(db, benchmark.method)
+    timings, rows = [], 0
+
+    for iteration in range(WARMUP + iterations):
+        args = benchmark.args(data, rng)
+        started = time.perf_counter()
+        result = method(*args, **benchmark.kwargs)
+        elapsed = time.perf_counter() - started
+        if iteration >= WARMUP:
+            timings.append(elapsed)
+            rows += _rows(result)
+
+    timings.sort()
+    total = sum(timings)
+    return {
+        'name': benchmark.name,
+        'method': benchmark.method,
+        'iterations': iterations,
+        'mean_ms': round(total / iterations * 1000, 4),
+        'p50_ms': round(timings[iterations // 2] * 1000, 4),
+        'p95_ms': round(timings[min(iterations - 1, int(iterations * 0.95))] * 1000, 4),
+        'p99_ms': round(timings[min(iterations - 1, int(iterations * 0.99))] * 1000, 4),
+        'max_ms': round(timings[-1] * 1000, 4),
+        'stdev_ms': round(statistics.pstdev(timings) * 1000, 4),
+        'ops_per_second': round(iterations / total, 1) if total else 0.0,
+        'rows': round(rows / iterations, 1),
+    }
+
+
+def print_report(results: list):
+    header = f"{'метод':<32} {'ср. мс':>9} {'p50 мс':>9} {'p95 мс':>9} {'p99 мс':>9} {'выз/с':>10} {'строк':>7}"
+    print(header)
+    print('-' * len(header))
+    for result in results:
+        print(f"{result['name']:<32} {result['mean_ms']:>9.3f} {result['p50_ms']:>9.3f} {result['p95_ms']:>9.3f} "
+              f"{result['p99_ms']:>9.3f} {result['ops_per_second']:>10} {result['rows']:>7}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Замеры методов Database на синтетических данных")
+    parser.add_argument('--workers', type=int, default=1000, help="работников")
+    parser.add_argument('--admins', type=int, default=10, help="администраторов")
+    parser.add_argument('--admin-tasks', type=int, default=100000, help="заданий администраторов")
+    parser.add_argument('--worker-tasks', type=int, default=20000, help="запросов работников")
+    parser.add_argument('--iterations', type=int, default=200, help="вызовов каждого метода")
+    parser.add_argument('--filter', help="только замеры, в названии которых есть эта строка")
+    parser.add_argument('--seed', type=int, default=1, help="seed генератора данных и аргументов")
+    parser.add_argument('--db', help="файл БД: заполняется, если пустой, и не удаляется")
+    parser.add_argument('--json', help="записать результаты в JSON-файл")
+    parser.add_argument('-v', '--verbose', action='store_true', help="ход заполнения и медленные запросы")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.ERROR, format='%(message)s')
+
+    workdir = None
+    db_path = args.db
+    if db_path is None:
+        workdir = tempfile.mkdtemp(prefix='db-bench-')
+        db_path = os.path.join(workdir, 'bench.db')
+
+    rng = random.Random(args.seed)
+    db = Database(db_path)
+    try:
+        seed_seconds = None
+        data = load(db)
+        if not data.admin_task_ids and not data.worker_task_ids:
+            started = time.perf_counter()
+            data = seed(db, rng, args.workers, args.admins, args.admin_tasks, args.worker_tasks)
+            seed_seconds = round(time.perf_counter() - started, 2)
+            print(f"Данные записаны за {seed_seconds} с")
+
+        benchmarks = [
+            benchmark for benchmark in BENCHMARKS
+            if not args.filter or args.filter in benchmark.name
+        ]
+        # Профиль SQL - только по замерам, без заполнения
+        db.profiler.reset()
+        results = [run_benchmark(db, data, benchmark, args.iterations, rng) for benchmark in benchmarks]
+        queries = db.get_query_profile(50)
+        db_size = os.path.getsize(db_path)
+    finally:
+        db.close()
+        if workdir is not None:
+            for suffix in ('', '-wal', '-shm'):
+                if os.path.exists(db_path + suffix):
+                    os.remove(db_path + suffix)
+            os.rmdir(workdir)
+
+    print_report(results)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as file:
+            json.dump({
+                'created_at': datetime.now().strftime(_TIME_FORMAT),
+                'environment': {
+                    'python': platform.python_version(),
+                    'sqlite': sqlite3.sqlite_version,
+                    'platform': platform.platform(),
+                    'pragmas': Config.get_sqlite_pragmas(),
+                },
+                'data': {
+                    'workers': len(data.workers),
+                    'admins': len(data.admins),
+                    'admin_tasks': len(data.admin_task_ids),
+                    'worker_tasks': len(data.worker_task_ids),
+                    'db_size_bytes': db_size,
+                    'seed_seconds': seed_seconds,
+                },
+                'iterations': args.iterations,
+                'results': results,
+                'queries': [
+                    dict(
+                        {key: value for key, value in query.items() if key not in ('total', 'max')},
+                        total_ms=round(query['total'] * 1000, 3), max_ms=round(query['max'] * 1000, 3)
+                    )
+                    for query in queries
+                ],
+            }, file, ensure_ascii=False, indent=2)
+        print(f"Результаты: {args.json}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+# bench/fake_api.py
+"""Telegram внутри процесса: сессия-заглушка и генератор апдейтов"""
+import asyncio
+import itertools
+import time
+from collections import Counter
+from contextvars import ContextVar
+
+from aiogram import Bot
+from aiogram.client.session.base import BaseSession
+from aiogram.methods import EditMessageText, SendDocument, SendMessage, TelegramMethod
+from aiogram.types import Message, Update
+
+# Кто делает запрос к Bot API: нагрузочный тест ставит 'handler' на время
+# обработки апдейта, фоновые задачи (очередь уведомлений) остаются 'background'
+CALL_SOURCE: ContextVar[str] = ContextVar('call_source', default='background')
+
+
+class FakeSession(BaseSession):
+    """Сессия без сети: каждый запрос ждет latency секунд и считается
+    в calls по ключу (CALL_SOURCE, имя метода).
+
+    SendMessage, EditMessageText и SendDocument возвращают Message,
+    остальные методы - True (этого хватает обработчикам бота).
+    """
+
+    def __init__(self, latency: float = 0.0):
+        super().__init__()
+        self.latency = latency
+        self.calls = Counter()
+        self._message_ids = itertools.count(1)
+
+    async def close(self):
+        pass
+
+    async def make_request(self, bot: Bot, method: TelegramMethod, timeout: int = None):
+        self.calls[CALL_SOURCE.get(), type(method).__name__] += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        if isinstance(method, (SendMessage, EditMessageText, SendDocument)):
+            return Message.model_validate({
+                'message_id': next(self._message_ids),
+                'date': int(time.time()),
+                'chat': {'id': method.chat_id or 0, 'type': 'private'},
+                'text': getattr(method, 'text', None),
+            })
+        return True
+
+    async def stream_content(self, url: str, headers: dict = None, timeout: int = 30,
+                             chunk_size: int = 65536, raise_for_status: bool = True):
+        yield b''
+
+
+class UpdateFactory:
+    """Апдейты от пользователей лички: сообщения и нажатия inline-кнопок"""
+
+    def __init__(self):
+        self._ids = itertools.count(1)
+
+    def _user(self, user_id: int) -> dict:
+        return {'id': user_id, 'is_bot': False, 'first_name': f'User{user_id}'}
+
+    def message(self, user_id: int, text: str) -> Update:
+        return Update.model_validate({
+            'update_id': next(self._ids),
+            'message': {
+                'message_id': next(self._ids),
+                'date': int(time.time()),
+                'chat': {'id': user_id, 'type': 'private'},
+                'from': self._user(user_id),
+                'text': text,
+            },
+        })
+
+    def callback(self, user_id: int, data: str) -> Update:
+        update_id = next(self._ids)
+        return Update.model_validate({
+            'update_id': update_id,
+            'callback_query': {
+                'id': str(update_id),
+                'chat_instance': str(user_id),
+                'from': self._user(user_id),
+                'data': data,
+                'message': {
+                    'message_id': update_id,
+                    'date': int(time.time()),
+                    'chat': {'id': user_id, 'type': 'private'},
+                    'text': '-',
+                },
+            },
+        })
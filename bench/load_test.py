@@ -0,0 +1,325 @@
+# bench/load_test.py
+"""Нагрузочный тест диспетчера бота без Telegram.
+
+Настоящий Dispatcher из bot.create_dispatcher (роутеры common, worker,
+admin, все middleware, FSM в SQLite и очередь уведомлений) получает
+сгенерированные апдейты, а запросы к Bot API уходят в FakeSession с
+заданной задержкой. БД - временный файл, рабочая база не затрагивается.
+
+Для каждого сценария печатаются пропускная способность (апдейтов в
+секунду), p50/p99 времени обработки апдейта и число запросов к Bot API:
+сделанных обработчиками и отправленных очередью уведомлений.
+
+Запуск из корня проекта:
+    python -m bench.load_test --users 200 --concurrency 50 --latency 30
+    python -m bench.load_test --scenario approvals --json results.json
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import tempfile
+import time
+from collections import Counter
+
+from bench.fake_api import CALL_SOURCE, FakeSession, UpdateFactory
+
+logger = logging.getLogger(__name__)
+
+BENCH_ADMIN_ID = 1
+BENCH_TOKEN = '123456:BENCH'
+# Пользователи каждого сценария - из своего диапазона ID, чтобы сценарии не пересекались
+ID_RANGE = 1_000_000
+ADMINS_PER_WORKERS = 20
+
+_LETTERS = 'абвгдежзиклмнопрстуфхцчшэюя'
+
+
+def _name(number: int) -> str:
+    """Уникальное «слово» из русских букв для ФИО"""
+    letters = []
+    while True:
+        number, index = divmod(number, len(_LETTERS))
+        letters.append(_LETTERS[index])
+        if not number:
+            break
+    return ''.join(letters).capitalize()
+
+
+def _fio(number: int) -> str:
+    return f"Работников{_name(number)} Иван"
+
+
+async def _seed_workers(db, worker_ids: list):
+    await db.import_workers([(worker_id, None, _fio(worker_id)) for worker_id in worker_ids])
+
+
+async def _seed_admins(db, admin_ids: list):
+    await db.import_workers([(admin_id, None, f"Админов{_name(admin_id)} Петр") for admin_id in admin_ids])
+    for admin_id in admin_ids:
+        await db.add_admin(admin_id, BENCH_ADMIN_ID)
+
+
+def _split(items: list, parts: int) -> list:
+    return [items[index::parts] for index in range(parts)]
+
+
+async def prepare_registration(db, updates: UpdateFactory, base: int, users: int) -> list:
+    """Новые пользователи: /start и ввод ФИО"""
+    return [
+        [updates.message(user_id, '/start'), updates.message(user_id, _fio(user_id))]
+        for user_id in range(base, base + users)
+    ]
+
+
+async def prepare_assignment(db, updates: UpdateFactory, base: int, users: int) -> list:
+    """Администраторы выдают задания: кнопка, выбор работника, текст задания"""
+    workers = list(range(base + ID_RANGE // 2, base + ID_RANGE // 2 + users))
+    admins = list(range(base, base + max(1, users // ADMINS_PER_WORKERS)))
+    await _seed_workers(db, workers)
+    await _seed_admins(db, admins)
+
+    return [
+        [
+            update
+            for worker_id in admin_workers
+            for update in (
+                updates.message(admin_id, '📨 Отправить задание'),
+                updates.callback(admin_id, f'select_worker:{worker_id}'),
+                updates.message(admin_id, f'Залить бетон, секция {worker_id % 100}'),
+            )
+        ]
+        for admin_id, admin_workers in zip(admins, _split(workers, len(admins)))
+    ]
+
+
+async def prepare_accept_comment(db, updates: UpdateFactory, base: int, users: int) -> list:
+    """Работники открывают свои задания, одно принимают, к другому пишут комментарий"""
+    workers = list(range(base, base + users))
+    await _seed_workers(db, workers)
+    await _seed_admins(db, [base + ID_RANGE // 2])
+    tasks, _ = await db.add_admin_tasks_many(base + ID_RANGE // 2, [
+        (worker_id, f"Задание {number} для {worker_id}") for worker_id in workers for number in (1, 2)
+    ])
+
+    task_ids = {}
+    for task_id, worker_id, _ in tasks:
+        task_ids.setdefault(worker_id, []).append(task_id)
+
+    return [
+        [
+            updates.message(worker_id, '📋 Мои задания'),
+            updates.callback(worker_id, f'accept_task:{task_ids[worker_id][0]}'),
+            updates.callback(worker_id, f'comment_task:{task_ids[worker_id][1]}'),
+            updates.message(worker_id, 'Нет материала на объекте, нужен завоз'),
+        ]
+        for worker_id in workers
+    ]
+
+
+async def prepare_worker_requests(db, updates: UpdateFactory, base: int, users: int) -> list:
+    """Работники создают запрос на согласование и смотрят статус запросов"""
+    workers = list(range(base, base + users))
+    await _seed_workers(db, workers)
+
+    return [
+        [
+            updates.message(worker_id, '📝 Создать задание'),
+            updates.message(worker_id, f'Нужен кран к 9:00 на секцию {worker_id % 100}'),
+            updates.message(worker_id, '📊 Статус запросов'),
+        ]
+        for worker_id in workers
+    ]
+
+
+async def prepare_approvals(db, updates: UpdateFactory, base: int, users: int) -> list:
+    """Администраторы одобряют запросы работников"""
+    workers = list(range(base + ID_RANGE // 2, base + ID_RANGE // 2 + users))
+    admins = list(range(base, base + max(1, users // ADMINS_PER_WORKERS)))
+    await _seed_workers(db, workers)
+    await _seed_admins(db, admins)
+    # Параллельные записи попадают в один групповой коммит
+    task_ids = await asyncio.gather(*(
+        db.add_worker_task(worker_id, f"Нужны леса, секция {worker_id % 100}") for worker_id in workers
+    ))
+
+    return [
+        [updates.callback(admin_id, f'approve_task:{task_id}') for task_id in admin_tasks]
+        for admin_id, admin_tasks in zip(admins, _split(list(task_ids), len(admins)))
+    ]
+
+
+SCENARIOS = {
+    'registration': prepare_registration,
+    'assignment': prepare_assignment,
+    'accept_comment': prepare_accept_comment,
+    'worker_requests': prepare_worker_requests,
+    'approvals': prepare_approvals,
+}
+
+
+def percentile(values: list, fraction: float) -> float:
+    """Значение по рангу в отсортированном списке"""
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+async def wait_outbox(db, timeout: float) -> bool:
+    """Ждем, пока очередь уведомлений отправит все, что пора отправить"""
+    deadline = time.monotonic() + timeout
+    while await db.get_due_notifications(1):
+        if time.monotonic() > deadline:
+            return False
+        await asyncio.sleep(0.01)
+    return True
+
+
+async def run_scenario(dp, bot, session: FakeSession, db, name: str, sequences: list,
+                       concurrency: int, outbox_timeout: float) -> dict:
+    """Проигрываем апдейты: пользователи параллельно, апдейты одного пользователя - по очереди"""
+    latencies = []
+    errors = Counter()
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def play(sequence):
+        CALL_SOURCE.set('handler')
+        async with semaphore:
+            for update in sequence:
+                started = time.perf_counter()
+                try:
+                    await dp.feed_update(bot, update)
+                except Exception as e:
+                    errors[type(e).__name__] += 1
+                    if sum(errors.values()) == 1:
+                        logger.exception("%s: ошибка обработки апдейта: %s", name, e)
+                latencies.append(time.perf_counter() - started)
+
+    session.calls.clear()
+    started = time.perf_counter()
+    await asyncio.gather(*(play(sequence) for sequence in sequences))
+    elapsed = time.perf_counter() - started
+
+    drained = await wait_outbox(db, outbox_timeout)
+    handler_calls, notification_calls = Counter(), Counter()
+    for (source, method), count in session.calls.items():
+        (handler_calls if source == 'handler' else notification_calls)[method] += count
+
+    latencies.sort()
+    updates = len(latencies)
+    api_calls = sum(handler_calls.values())
+    return {
+        'scenario': name,
+        'users': len(sequences),
+        'updates': updates,
+        'errors': dict(errors),
+        'seconds': round(elapsed, 3),
+        'updates_per_second': round(updates / elapsed, 1) if elapsed else 0.0,
+        'p50_ms': round(percentile(latencies, 0.50) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 2),
+        'max_ms': round(latencies[-1] * 1000, 2) if latencies else 0.0,
+        'api_calls': api_calls,
+        'api_calls_per_update': round(api_calls / updates, 2) if updates else 0.0,
+        'api_calls_by_method': dict(handler_calls),
+        'notification_calls': sum(notification_calls.values()),
+        'outbox_drained': drained,
+    }
+
+
+def print_report(results: list):
+    header = (f"{'сценарий':<16} {'апдейтов':>8} {'апд/с':>8} {'p50 мс':>8} {'p99 мс':>8} "
+              f"{'API':>7} {'API/апд':>7} {'уведомл.':>8} {'ошибок':>6}")
+    print(header)
+    print('-' * len(header))
+    for result in results:
+        print(f"{result['scenario']:<16} {result['updates']:>8} {result['updates_per_second']:>8} "
+              f"{result['p50_ms']:>8} {result['p99_ms']:>8} {result['api_calls']:>7} "
+              f"{result['api_calls_per_update']:>7} {result['notification_calls']:>8} "
+              f"{sum(result['errors'].values()):>6}")
+        if not result['outbox_drained']:
+            print("  ⚠️ очередь уведомлений не разобрана до конца")
+
+
+async def run(args) -> list:
+    # Конфигурация читается при импорте, поэтому модули бота импортируются
+    # после настройки окружения в main()
+    from aiogram import Bot
+    from aiogram.client.default import DefaultBotProperties
+
+    from bot import create_dispatcher
+    from database import AsyncDatabase
+
+    session = FakeSession(latency=args.latency / 1000)
+    bot = Bot(BENCH_TOKEN, session=session, default=DefaultBotProperties(parse_mode='HTML'))
+    db = AsyncDatabase()
+    dp = create_dispatcher(db)
+    updates = UpdateFactory()
+
+    results = []
+    await dp.emit_startup(bot=bot)
+    try:
+        for index, name in enumerate(args.scenario or SCENARIOS):
+            base = ID_RANGE * (index + 1)
+            sequences = await SCENARIOS[name](db, updates, base, args.users)
+            results.append(await run_scenario(
+                dp, bot, session, db, name, sequences, args.concurrency, args.outbox_timeout
+            ))
+    finally:
+        await dp.emit_shutdown(bot=bot)
+    return results
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Нагрузочный тест диспетчера бота (офлайн)")
+    parser.add_argument('--scenario', action='append', choices=list(SCENARIOS),
+                        help="сценарий (можно несколько раз); по умолчанию все")
+    parser.add_argument('--users', type=int, default=100, help="пользователей в сценарии")
+    parser.add_argument('--concurrency', type=int, default=20, help="пользователей одновременно")
+    parser.add_argument('--latency', type=float, default=20, help="задержка ответа Bot API, мс")
+    parser.add_argument('--outbox-timeout', type=float, default=60,
+                        help="сколько ждать отправки очереди уведомлений после сценария, с")
+    parser.add_argument('--json', help="записать результаты в JSON-файл")
+    parser.add_argument('--keep-db', action='store_true', help="не удалять временную БД")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix='bot-bench-')
+    db_path = os.path.join(workdir, 'bench.db')
+    os.environ['DATABASE_URL'] = f'sqlite:///{db_path}'
+    os.environ['ADMIN_IDS'] = str(BENCH_ADMIN_ID)
+    os.environ['METRICS_PORT'] = '0'
+    os.environ.setdefault('BOT_TOKEN', BENCH_TOKEN)
+    os.environ.setdefault('LOG_LEVEL', 'WARNING')
+    # Лимиты рассылки меряют Telegram, а не бота: с ними очередь уведомлений
+    # разбиралась бы со скоростью 25 сообщений в секунду
+    os.environ.setdefault('BROADCAST_GLOBAL_RATE', '1000000')
+    os.environ.setdefault('BROADCAST_CHAT_RATE', '1000000')
+
+    try:
+        results = asyncio.run(run(args))
+    finally:
+        if args.keep_db:
+            print(f"БД: {db_path}")
+        else:
+            for suffix in ('', '-wal', '-shm'):
+                if os.path.exists(db_path + suffix):
+                    os.remove(db_path + suffix)
+            os.rmdir(workdir)
+
+    print_report(results)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as file:
+            json.dump({
+                'users': args.users,
+                'concurrency': args.concurrency,
+                'latency_ms': args.latency,
+                'results': results,
+            }, file, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
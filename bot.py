@@ -1,32 +1,173 @@
 # bot.py
+import argparse
 import asyncio
 import logging
+import signal
 import sys
-import os
+from contextlib import suppress
 
+from startup_profile import startup_profile
 
-sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+# Флаг проверяется до остальных импортов, иначе они не попадут в профиль
+if __name__ == "__main__" and "--startup-profile" in sys.argv[1:]:
+    startup_profile.enable()
 
 from aiogram import Bot, Dispatcher
-from aiogram.fsm.storage.memory import MemoryStorage
 from aiogram.client.default import DefaultBotProperties
 from config import Config
+from logging_setup import setup_logging
+from broadcaster import Broadcaster
+from database import AsyncDatabase
+from fsm_storage import SQLiteStorage
+from metrics import MetricsServer, fsm_states, user_cache_lookups
+from middlewares import (
+    DependencyMiddleware,
+    HandlerMetricsMiddleware,
+    RoleMiddleware,
+    TelegramMetricsMiddleware,
+    UpdateMetricsMiddleware
+)
+from outbox import OutboxDispatcher
 
 
-from handlers import common, admin, worker
+setup_logging(Config.LOG_LEVEL, Config.LOG_FORMAT)
+logger = logging.getLogger(__name__)
+startup_profile.mark("импорт модулей")
 
 
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
-logger = logging.getLogger(__name__)
+def create_dispatcher(db: AsyncDatabase = None) -> Dispatcher:
+    """Создаем диспетчер с хранилищем, зависимостями и роутерами"""
+    # Одна общая БД на все обработчики: открывается при старте, закрывается при остановке
+    if db is None:
+        db = AsyncDatabase()
+    # Состояния диалогов храним в той же БД, чтобы они переживали перезапуск
+    storage = SQLiteStorage(db)
+    dp = Dispatcher(storage=storage)
+
+    # Все уведомления идут через общий broadcaster с лимитами Telegram,
+    # а уведомления о заданиях - через очередь в БД (outbox)
+    broadcaster = Broadcaster()
+    outbox = OutboxDispatcher(db, broadcaster)
+
+    if startup_profile.enabled:
+        dp.update.outer_middleware(startup_profile.on_update)
+
+    # Метрики: апдейты по типам, время и ошибки каждого обработчика
+    dp.update.outer_middleware(UpdateMetricsMiddleware())
+    dp.message.middleware(HandlerMetricsMiddleware())
+    dp.callback_query.middleware(HandlerMetricsMiddleware())
+    fsm_states.set_function(storage.count_states)
+    user_cache_lookups.set_function(db.count_user_cache)
+
+    dp.update.outer_middleware(DependencyMiddleware(db=db, broadcaster=broadcaster, outbox=outbox))
+    # Роль отправителя (user, role) определяется один раз на апдейт
+    dp.update.outer_middleware(RoleMiddleware(db))
+    if startup_profile.enabled:
+        dp.startup.register(startup_profile.marker("Bot и веб-сервер"))
+    for stage, callback in (("db.connect", db.connect), ("storage.start", storage.start),
+                            ("outbox.start", outbox.start)):
+        dp.startup.register(callback)
+        if startup_profile.enabled:
+            dp.startup.register(startup_profile.marker(stage))
+    dp.shutdown.register(outbox.close)
+    dp.shutdown.register(storage.close)
+    dp.shutdown.register(db.close)
+
+    # Роутеры импортируются здесь, а не при импорте bot: скриптам и
+    # бенчмаркам, которым не нужен диспетчер, они не нужны
+    from handlers import admin, common, worker
+
+    # Подключаем роутеры
+    dp.include_router(common.router)
+    dp.include_router(worker.router)
+    dp.include_router(admin.router)
+    dp.include_router(admin.denied_router)
+
+    startup_profile.mark("диспетчер и роутеры")
+    return dp
+
+
+async def run_polling(bot: Bot, dp: Dispatcher):
+    """Запуск в режиме long polling"""
+    # Удаляем вебхук и запускаем поллинг
+    await bot.delete_webhook(drop_pending_updates=True)
+    if startup_profile.enabled:
+        dp.startup.register(startup_profile.ready)
+
+    logger.info("✅ Бот запущен и готов к работе (polling)!")
+    await dp.start_polling(bot)
+
+
+async def run_webhook(bot: Bot, dp: Dispatcher):
+    """Запуск в режиме вебхука на встроенном aiohttp-сервере"""
+    from aiohttp import web
+    from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
+
+    webhook_url = Config.get_webhook_url()
+
+    async def set_webhook(bot: Bot):
+        if not webhook_url:
+            # Локальный запуск: апдейты можно отправлять POST-запросами напрямую
+            logger.warning("⚠️ WEBHOOK_BASE_URL не задан, вебхук в Telegram не регистрируется")
+            return
+        # Апдейты, накопленные, пока сервис спал или перезапускался, не сбрасываем
+        await bot.set_webhook(
+            webhook_url,
+            secret_token=Config.WEBHOOK_SECRET,
+            allowed_updates=dp.resolve_used_update_types()
+        )
+        logger.info("🔗 Вебхук установлен: %s", webhook_url)
+
+    dp.startup.register(set_webhook)
+
+    async def health(request: web.Request) -> web.Response:
+        return web.Response(text="ok")
+
+    app = web.Application()
+    app.router.add_get("/", health)
+    # Отвечаем Telegram 200 сразу, апдейт обрабатывается в фоне
+    SimpleRequestHandler(
+        dispatcher=dp,
+        bot=bot,
+        secret_token=Config.WEBHOOK_SECRET,
+        handle_in_background=True
+    ).register(app, path=Config.WEBHOOK_PATH)
+    setup_application(app, dp, bot=bot)
+
+    # Render и другие хостинги останавливают сервис по SIGTERM: без обработчика
+    # процесс завершится без хуков dp.shutdown (сброс FSM, коммит, очередь)
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        with suppress(NotImplementedError):  # Windows
+            loop.add_signal_handler(sig, stop.set)
+
+    runner = web.AppRunner(app)
+    await runner.setup()
+    try:
+        site = web.TCPSite(runner, Config.WEBAPP_HOST, Config.WEBAPP_PORT)
+        await site.start()
+        await startup_profile.ready()
+
+        logger.info(
+            "✅ Бот запущен и готов к работе (webhook) на %s:%s%s",
+            Config.WEBAPP_HOST, Config.WEBAPP_PORT, Config.WEBHOOK_PATH
+        )
+        await stop.wait()
+        logger.info("🛑 Получен сигнал остановки, завершаем работу")
+    finally:
+        # Останавливает сервер и вызывает хуки dp.shutdown (setup_application)
+        await runner.cleanup()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            with suppress(NotImplementedError):
+                loop.remove_signal_handler(sig)
 
 
-async def main():
+async def main(mode: str = "polling"):
     """Главная функция запуска бота"""
 
     Config.validate_config()
+    startup_profile.mark("проверка конфигурации")
 
     # Проверяем токен бота
     if not Config.BOT_TOKEN:
@@ -40,30 +181,46 @@ async def main():
         token=Config.BOT_TOKEN,
         default=DefaultBotProperties(parse_mode="HTML")
     )
-    storage = MemoryStorage()
-    dp = Dispatcher(storage=storage)
+    bot.session.middleware(TelegramMetricsMiddleware())
+    dp = create_dispatcher()
 
-    # Подключаем роутеры
-    dp.include_router(common.router)
-    dp.include_router(worker.router)
-    dp.include_router(admin.router)
+    if Config.METRICS_PORT:
+        metrics_server = MetricsServer()
+        dp.startup.register(metrics_server.start)
+        dp.shutdown.register(metrics_server.close)
 
-    # Удаляем вебхук и запускаем поллинг
-    await bot.delete_webhook(drop_pending_updates=True)
-
-    logger.info("✅ Бот запущен и готов к работе!")
-    logger.info(f"👑 Администраторы: {Config.ADMIN_IDS}")
+    logger.info("👑 Администраторы: %s", Config.ADMIN_IDS)
 
     try:
-        await dp.start_polling(bot)
+        if mode == "webhook":
+            await run_webhook(bot, dp)
+        else:
+            await run_polling(bot, dp)
     except Exception as e:
-        logger.error(f"❌ Ошибка при запуске бота: {e}")
+        logger.error("❌ Ошибка при запуске бота: %s", e)
     finally:
         await bot.session.close()
 
 
+def parse_args():
+    parser = argparse.ArgumentParser(description="Construction Bot")
+    parser.add_argument(
+        "--mode",
+        choices=["polling", "webhook"],
+        default=Config.BOT_MODE,
+        help="способ получения апдейтов (по умолчанию BOT_MODE или polling)"
+    )
+    parser.add_argument(
+        "--startup-profile",
+        action="store_true",
+        help="вывести время импорта модулей и этапов запуска до первого апдейта"
+    )
+    return parser.parse_args()
+
+
 if __name__ == "__main__":
+    args = parse_args()
     try:
-        asyncio.run(main())
+        asyncio.run(main(args.mode))
     except KeyboardInterrupt:
-        logger.info("🛑 Бот остановлен пользователем")
\ No newline at end of file
+        logger.info("🛑 Бот остановлен пользователем")
@@ -0,0 +1,128 @@
+# broadcaster.py
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import Iterable, List, Optional
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramBadRequest, TelegramForbiddenError, TelegramRetryAfter
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """Ограничитель частоты: rate токенов в секунду, запас до capacity"""
+
+    def __init__(self, rate: float, capacity: float = 1):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = None
+
+    def _refill(self, now: float):
+        if self.updated_at is not None:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    @property
+    def is_full(self) -> bool:
+        self._refill(asyncio.get_running_loop().time())
+        return self.tokens >= self.capacity
+
+    async def acquire(self):
+        """Ждем, пока появится токен, и забираем его"""
+        loop = asyncio.get_running_loop()
+        while True:
+            self._refill(loop.time())
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def pause(self, seconds: float):
+        """Блокируем выдачу токенов хотя бы на seconds (после flood-ограничения Telegram).
+
+        Паузы не складываются: несколько одновременных ответов RetryAfter
+        останавливают выдачу до самого позднего из сроков.
+        """
+        self._refill(asyncio.get_running_loop().time())
+        self.tokens = min(self.tokens, -seconds * self.rate)
+
+
+@dataclass
+class DeliveryResult:
+    """Результат отправки одному получателю"""
+    chat_id: int
+    ok: bool
+    message_id: Optional[int] = None
+    error: Optional[str] = None
+    permanent: bool = False  # повтор не поможет: бот заблокирован, чат не найден
+
+
+class Broadcaster:
+    """Отправка сообщений с учетом лимитов Telegram.
+
+    Сообщения разным получателям уходят параллельно; общий и
+    поканальный лимиты соблюдаются через token bucket, а ответ
+    TelegramRetryAfter приостанавливает на указанное время всю отправку
+    (flood-ограничение Telegram действует на бота, а не на один чат)
+    и повторяет попытку.
+    """
+
+    MAX_CHAT_BUCKETS = 10000
+
+    def __init__(
+        self,
+        global_rate: float = None,
+        chat_rate: float = None,
+        max_retries: int = None
+    ):
+        self.global_bucket = TokenBucket(
+            global_rate or Config.BROADCAST_GLOBAL_RATE,
+            capacity=global_rate or Config.BROADCAST_GLOBAL_RATE
+        )
+        self.chat_rate = chat_rate or Config.BROADCAST_CHAT_RATE
+        self.max_retries = max_retries if max_retries is not None else Config.BROADCAST_MAX_RETRIES
+        self._chat_buckets = {}
+
+    def _chat_bucket(self, chat_id: int) -> TokenBucket:
+        bucket = self._chat_buckets.get(chat_id)
+        if bucket is None:
+            if len(self._chat_buckets) >= self.MAX_CHAT_BUCKETS:
+                # Полные корзины ничего не ограничивают - их можно забыть
+                self._chat_buckets = {
+                    key: value for key, value in self._chat_buckets.items() if not value.is_full
+                }
+            bucket = self._chat_buckets[chat_id] = TokenBucket(self.chat_rate)
+        return bucket
+
+    async def send(self, bot: Bot, chat_id: int, text: str, **kwargs) -> DeliveryResult:
+        """Отправляем одно сообщение с соблюдением лимитов и повторами"""
+        chat_bucket = self._chat_bucket(chat_id)
+
+        for attempt in range(self.max_retries + 1):
+            await chat_bucket.acquire()
+            await self.global_bucket.acquire()
+            try:
+                message = await bot.send_message(chat_id, text, **kwargs)
+                return DeliveryResult(chat_id, True, message_id=message.message_id)
+            except TelegramRetryAfter as e:
+                logger.warning("Flood control для chat_id=%s, ждем %s с", chat_id, e.retry_after)
+                chat_bucket.pause(e.retry_after)
+                self.global_bucket.pause(e.retry_after)
+                if attempt == self.max_retries:
+                    return DeliveryResult(chat_id, False, error=str(e))
+            except (TelegramForbiddenError, TelegramBadRequest) as e:
+                logger.warning("Не удалось отправить сообщение chat_id=%s: %s", chat_id, e)
+                return DeliveryResult(chat_id, False, error=str(e), permanent=True)
+            except Exception as e:
+                logger.warning("Ошибка отправки сообщения chat_id=%s: %s", chat_id, e)
+                return DeliveryResult(chat_id, False, error=str(e))
+
+    async def send_many(self, bot: Bot, messages: Iterable[tuple]) -> List[DeliveryResult]:
+        """Параллельно отправляем сообщения (chat_id, text, kwargs)"""
+        return list(await asyncio.gather(*(
+            self.send(bot, chat_id, text, **kwargs) for chat_id, text, kwargs in messages
+        )))
@@ -1,8 +1,12 @@
+import hashlib
+import logging
 import os
 from dotenv import load_dotenv
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 
 class Config:
     # Bot token
@@ -14,16 +18,102 @@ class Config:
     # Database
     DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///construction.db")
 
-    @classmethod
-    def is_admin(cls, user_id: int) -> bool:
-        """Check if user is admin"""
-        return user_id in cls.ADMIN_IDS
+    # Bot mode: polling or webhook
+    BOT_MODE = os.getenv("BOT_MODE", "polling")
+
+    # Webhook (Render provides RENDER_EXTERNAL_URL and PORT automatically)
+    WEBHOOK_BASE_URL = os.getenv("WEBHOOK_BASE_URL") or os.getenv("RENDER_EXTERNAL_URL")
+    WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "/webhook")
+    # Secret token checked in X-Telegram-Bot-Api-Secret-Token; derived from the bot token if not set
+    WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET") or (
+        hashlib.sha256(BOT_TOKEN.encode()).hexdigest()[:32] if BOT_TOKEN else None
+    )
+    WEBAPP_HOST = os.getenv("WEBAPP_HOST", "0.0.0.0")
+    WEBAPP_PORT = int(os.getenv("PORT", "8080"))
+
+    # SQLite storage profile (PRAGMA settings applied on connect)
+    SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+    SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+    SQLITE_CACHE_SIZE = int(os.getenv("SQLITE_CACHE_SIZE", "-16000"))  # < 0: size in KiB
+    SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(64 * 1024 * 1024)))
+    SQLITE_TEMP_STORE = os.getenv("SQLITE_TEMP_STORE", "MEMORY")
+
+    # Statements slower than this (ms) are logged with their query plan
+    DB_SLOW_QUERY_MS = float(os.getenv("DB_SLOW_QUERY_MS", "100"))
+
+    # Group commit window in milliseconds (0 - commit every write separately)
+    DB_GROUP_COMMIT_MS = int(os.getenv("DB_GROUP_COMMIT_MS", "5"))
+
+    # User profile cache: max entries and time to live in seconds
+    USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "10000"))
+    USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", "300"))
+
+    # Task cards per page in paginated task lists
+    TASKS_PAGE_SIZE = int(os.getenv("TASKS_PAGE_SIZE", "5"))
+    # Entries per page in the admin task timeline (fewer if they don't fit one message)
+    TIMELINE_PAGE_SIZE = int(os.getenv("TIMELINE_PAGE_SIZE", "10"))
+    # Workers per page / search results in the worker picker
+    WORKERS_PAGE_SIZE = int(os.getenv("WORKERS_PAGE_SIZE", "8"))
+    # Results per page of /search
+    SEARCH_PAGE_SIZE = int(os.getenv("SEARCH_PAGE_SIZE", "5"))
+
+    # CSV/XLSX import: rows validated and written per transaction
+    IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", "500"))
+    # Max size of an uploaded import file in bytes (Bot API download limit is 20 MB)
+    IMPORT_MAX_FILE_SIZE = int(os.getenv("IMPORT_MAX_FILE_SIZE", str(20 * 1024 * 1024)))
+    # Export: rows fetched from the read cursor and written per step
+    EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+
+    # Telegram rate limits for outgoing notifications (messages per second)
+    BROADCAST_GLOBAL_RATE = float(os.getenv("BROADCAST_GLOBAL_RATE", "25"))
+    BROADCAST_CHAT_RATE = float(os.getenv("BROADCAST_CHAT_RATE", "1"))
+    BROADCAST_MAX_RETRIES = int(os.getenv("BROADCAST_MAX_RETRIES", "3"))
+
+    # Notification outbox: batch size, idle poll interval (s), retries with
+    # exponential backoff starting at OUTBOX_RETRY_BASE seconds
+    OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", "50"))
+    OUTBOX_POLL_INTERVAL = float(os.getenv("OUTBOX_POLL_INTERVAL", "5"))
+    OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "8"))
+    OUTBOX_RETRY_BASE = int(os.getenv("OUTBOX_RETRY_BASE", "5"))
+
+    # FSM storage: idle conversations expire after FSM_STATE_TTL seconds,
+    # changes are written to the database every FSM_FLUSH_INTERVAL seconds
+    FSM_STATE_TTL = int(os.getenv("FSM_STATE_TTL", str(3 * 24 * 3600)))
+    FSM_FLUSH_INTERVAL = float(os.getenv("FSM_FLUSH_INTERVAL", "2"))
+    FSM_CACHE_SIZE = int(os.getenv("FSM_CACHE_SIZE", "10000"))
+
+    # Prometheus metrics endpoint (METRICS_PORT=0 disables the server)
+    METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+    METRICS_PORT = int(os.getenv("METRICS_PORT", "9100"))
+    METRICS_PATH = os.getenv("METRICS_PATH", "/metrics")
+
+    # Logging
+    LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+    LOG_FORMAT = os.getenv("LOG_FORMAT", "text")  # text или json
 
     @classmethod
     def get_admin_ids(cls) -> list:
         """Get list of admin IDs"""
         return cls.ADMIN_IDS
 
+    @classmethod
+    def get_webhook_url(cls):
+        """Get full webhook URL (None if the base URL is not configured)"""
+        if not cls.WEBHOOK_BASE_URL:
+            return None
+        return cls.WEBHOOK_BASE_URL.rstrip("/") + cls.WEBHOOK_PATH
+
+    @classmethod
+    def get_sqlite_pragmas(cls) -> dict:
+        """Get SQLite PRAGMA settings of the storage profile"""
+        return {
+            'journal_mode': cls.SQLITE_JOURNAL_MODE,
+            'synchronous': cls.SQLITE_SYNCHRONOUS,
+            'cache_size': cls.SQLITE_CACHE_SIZE,
+            'mmap_size': cls.SQLITE_MMAP_SIZE,
+            'temp_store': cls.SQLITE_TEMP_STORE,
+        }
+
     @classmethod
     def validate_config(cls):
         """Validate configuration"""
@@ -31,9 +121,7 @@ class Config:
             raise ValueError("BOT_TOKEN не указан в .env файле!")
 
         if not cls.ADMIN_IDS:
-            print("⚠️  ADMIN_IDS не указаны в .env файле!")
+            logger.warning("⚠️  ADMIN_IDS не указаны в .env файле!")
 
-        print(f"✅ Конфигурация загружена:")
-        print(f"   Bot Token: {'✅' if cls.BOT_TOKEN else '❌'}")
-        print(f"   Admin IDs: {cls.ADMIN_IDS}")
-        print(f"   Database: {cls.DATABASE_URL}")
\ No newline at end of file
+        logger.info("✅ Конфигурация загружена: Bot Token: %s, Admin IDs: %s, Database: %s",
+                    '✅' if cls.BOT_TOKEN else '❌', cls.ADMIN_IDS, cls.DATABASE_URL)
\ No newline at end of file
@@ -1,146 +1,424 @@
 # database.py
+import asyncio
+import functools
+import logging
+import re
 import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from datetime import datetime
+from pathlib import Path
+from cache import MISSING, TTLCache
+import metrics
 from config import Config
+from migrations import LATENCY_BUCKETS, LATENCY_OVERFLOW, migrate
+from profiler import ProfilingConnection, QueryProfiler
 
+logger = logging.getLogger(__name__)
+
+# Границы совпадений во фрагментах поиска: управляющие символы, которых
+# нет в текстах, - обработчик экранирует фрагмент и заменяет их разметкой
+SNIPPET_START, SNIPPET_END = '\x02', '\x03'
 
 class Database:
-    def __init__(self, db_path: str = None):
+    def __init__(self, db_path: str = None, group_commit: bool = False):
         if db_path is None:
             # Убираем префикс sqlite:/// для пути к файлу
             db_path = Config.DATABASE_URL.replace('sqlite:///', '')
-            print(f"🔍 DATABASE: Используем БД: {db_path}")
+            logger.info("Используем БД: %s", db_path)
+        self.db_path = db_path
+
+        # В режиме группового коммита методы не фиксируют транзакцию сами,
+        # это делает вызывающий код через commit() (см. AsyncDatabase)
+        self.group_commit = group_commit
+
+        # Профили пользователей читаются почти на каждом апдейте, а меняются
+        # редко: держим их в кэше, любая запись в users сбрасывает запись кэша
+        self.user_cache = TTLCache(Config.USER_CACHE_SIZE, Config.USER_CACHE_TTL)
+        # Версия списка пользователей: растет при каждом изменении users,
+        # по ней сбрасываются закэшированные клавиатуры выбора работника
+        self.roster_version = 0
 
-        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        # Все запросы идут через профилировщик: статистика для /dbprofile
+        # и лог медленных запросов с планом выполнения
+        self.profiler = QueryProfiler(Config.DB_SLOW_QUERY_MS)
+        self.conn = self._connect(db_path)
         self.conn.row_factory = sqlite3.Row  # Для доступа по имени столбца
+        self.apply_pragmas()
         self.create_tables()
 
-    def create_tables(self):
-        """Создаем таблицы в базе данных"""
-        cursor = self.conn.cursor()
+        # Множество администраторов держим в памяти целиком: оно маленькое,
+        # а роль нужна на каждом апдейте. Заменяется при каждом изменении
+        self.admin_ids = frozenset()
+        self.seed_admins(Config.ADMIN_IDS)
 
-        # Таблица пользователей
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS users (
-            user_id INTEGER PRIMARY KEY,
-            username TEXT,
-            fio TEXT NOT NULL,
-            role TEXT DEFAULT 'worker',
-            registered_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-        ''')
+    def _connect(self, database: str, **kwargs) -> sqlite3.Connection:
+        conn = sqlite3.connect(database, check_same_thread=False, factory=ProfilingConnection, **kwargs)
+        conn.profiler = self.profiler
+        return conn
 
-        # Таблица заданий от администратора
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS admin_tasks (
-            task_id INTEGER PRIMARY KEY AUTOINCREMENT,
-            from_admin_id INTEGER NOT NULL,
-            to_worker_id INTEGER NOT NULL,
-            task_text TEXT NOT NULL,
-            status TEXT DEFAULT 'pending', -- pending, accepted, completed, commented
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            read_at TIMESTAMP,
-            completed_at TIMESTAMP,
-            worker_comment TEXT,
-            FOREIGN KEY (to_worker_id) REFERENCES users (user_id),
-            FOREIGN KEY (from_admin_id) REFERENCES users (user_id)
-        )
-        ''')
+    def apply_pragmas(self, pragmas: dict = None):
+        """Применяем профиль хранения SQLite (WAL, synchronous, кэш, mmap)"""
+        if pragmas is None:
+            pragmas = Config.get_sqlite_pragmas()
 
-        # Таблица заданий от работников
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS worker_tasks (
-            task_id INTEGER PRIMARY KEY AUTOINCREMENT,
-            from_worker_id INTEGER NOT NULL,
-            task_text TEXT NOT NULL,
-            status TEXT DEFAULT 'pending', -- pending, approved, rejected
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            admin_comment TEXT,
-            reviewed_at TIMESTAMP,
-            reviewed_by INTEGER,
-            FOREIGN KEY (from_worker_id) REFERENCES users (user_id),
-            FOREIGN KEY (reviewed_by) REFERENCES users (user_id)
-        )
-        ''')
+        for name, value in pragmas.items():
+            self.conn.execute(f'PRAGMA {name} = {value}')
 
-        # Таблица уведомлений
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS notifications (
-            notification_id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER NOT NULL,
-            message TEXT NOT NULL,
-            is_read INTEGER DEFAULT 0,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (user_id) REFERENCES users (user_id)
-        )
-        ''')
+        journal_mode = self.conn.execute('PRAGMA journal_mode').fetchone()[0]
+        logger.info("PRAGMA применены, journal_mode=%s", journal_mode)
 
+    def commit(self):
+        """Фиксируем текущую транзакцию"""
         self.conn.commit()
-        print("🔍 DATABASE: Таблицы созданы/проверены")
+
+    def _commit(self):
+        """Фиксируем запись, если групповой коммит выключен"""
+        if not self.group_commit:
+            self.conn.commit()
+
+    @contextmanager
+    def atomic(self):
+        """Блок записей как одно целое: при ошибке его записи откатываются.
+
+        Если транзакция уже открыта (записи других вызовов ждут группового
+        коммита), блок идет внутри SAVEPOINT и откатывается только он сам.
+        Иначе при ошибке откатывается вся транзакция - в ней только этот блок.
+        """
+        if not self.conn.in_transaction:
+            try:
+                yield
+            except BaseException:
+                if self.conn.in_transaction:
+                    self.conn.rollback()
+                raise
+            return
+
+        # Служебные команды - мимо профилировщика SQL
+        execute = functools.partial(sqlite3.Connection.execute, self.conn)
+        execute('SAVEPOINT db_call')
+        try:
+            yield
+        except BaseException:
+            if self.conn.in_transaction:
+                execute('ROLLBACK TO db_call')
+                execute('RELEASE db_call')
+            raise
+        # Блок мог сам зафиксировать транзакцию вместе с точкой сохранения
+        if self.conn.in_transaction:
+            execute('RELEASE db_call')
+
+    def call(self, func, *args, **kwargs):
+        """Вызов метода как одно целое (см. atomic)"""
+        with self.atomic():
+            return func(*args, **kwargs)
+
+    def create_tables(self):
+        """Создаем/обновляем схему БД через миграции"""
+        version = migrate(self.conn)
+        logger.info("Таблицы созданы/проверены, версия схемы %s", version)
+
+    def explain_query_plan(self, sql: str, params: tuple = ()) -> list:
+        """План выполнения запроса (EXPLAIN QUERY PLAN) - для проверки индексов"""
+        cursor = self.conn.cursor()
+        cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+        return [row['detail'] for row in cursor.fetchall()]
 
     def add_user(self, user_id: int, username: str, fio: str):
         """Добавляем пользователя в БД"""
         cursor = self.conn.cursor()
 
         # Проверяем, админ ли это
-        role = 'admin' if Config.is_admin(user_id) else 'worker'
-        print(f"🔍 DATABASE: add_user - user_id={user_id}, fio={fio}, role={role}")
+        role = 'admin' if self.is_admin(user_id) else 'worker'
+        logger.debug("add_user - user_id=%s, fio=%s, role=%s", user_id, fio, role)
 
+        # UPSERT, а не INSERT OR REPLACE: замена удаляет строку без триггеров,
+        # и поисковый индекс users_fts остался бы со старым ФИО
         cursor.execute('''
-        INSERT OR REPLACE INTO users (user_id, username, fio, role)
+        INSERT INTO users (user_id, username, fio, role)
         VALUES (?, ?, ?, ?)
+        ON CONFLICT (user_id) DO UPDATE SET
+            username = excluded.username, fio = excluded.fio, role = excluded.role
         ''', (user_id, username, fio, role))
 
-        self.conn.commit()
-        print(f"🔍 DATABASE: Пользователь {fio} добавлен с ролью {role}")
+        self._commit()
+        self.user_cache.invalidate(user_id)
+        self.roster_version += 1
+        logger.debug("Пользователь %s добавлен с ролью %s", fio, role)
+        return role
 
     def get_user(self, user_id: int):
-        """Получаем данные пользователя"""
+        """Получаем данные пользователя (через кэш профилей)"""
+        user = self.user_cache.get(user_id)
+        if user is MISSING:
+            user = self.load_user(user_id)
+        return user
+
+    def load_user(self, user_id: int):
+        """Читаем пользователя из БД и кладем в кэш"""
         cursor = self.conn.cursor()
         cursor.execute('SELECT * FROM users WHERE user_id = ?', (user_id,))
         user = cursor.fetchone()
 
         if user:
-            print(f"🔍 DATABASE: get_user найден: user_id={user_id}, fio={user['fio']}, role={user['role']}")
+            logger.debug("get_user найден: user_id=%s, fio=%s, role=%s", user_id, user['fio'], user['role'])
         else:
-            print(f"🔍 DATABASE: get_user не найден: user_id={user_id}")
+            logger.debug("get_user не найден: user_id=%s", user_id)
 
+        self.user_cache.set(user_id, user)
         return user
 
+    # --- Администраторы ---
+    def _load_admin_ids(self):
+        cursor = self.conn.cursor()
+        cursor.execute('SELECT user_id FROM admins')
+        self.admin_ids = frozenset(row[0] for row in cursor.fetchall())
+
+    def seed_admins(self, admin_ids: list):
+        """Добавляем администраторов из ADMIN_IDS и загружаем множество администраторов"""
+        self._load_admin_ids()
+        # При обычном перезапуске все уже в таблице - обходимся без записи
+        missing = [(admin_id,) for admin_id in admin_ids if admin_id not in self.admin_ids]
+        if missing:
+            cursor = self.conn.cursor()
+            cursor.executemany('INSERT OR IGNORE INTO admins (user_id) VALUES (?)', missing)
+            cursor.executemany("UPDATE users SET role = 'admin' WHERE user_id = ?", missing)
+            self.conn.commit()
+            self._load_admin_ids()
+        logger.info("Администраторов: %s", len(self.admin_ids))
+
+    def is_admin(self, user_id: int) -> bool:
+        return user_id in self.admin_ids
+
+    def add_admin(self, user_id: int, added_by: int) -> bool:
+        """Назначаем администратора; False, если он уже администратор"""
+        cursor = self.conn.cursor()
+        cursor.execute('INSERT OR IGNORE INTO admins (user_id, added_by) VALUES (?, ?)', (user_id, added_by))
+        added = cursor.rowcount > 0
+        cursor.execute("UPDATE users SET role = 'admin' WHERE user_id = ?", (user_id,))
+        self._commit()
+
+        self._load_admin_ids()
+        self.user_cache.invalidate(user_id)
+        self.roster_version += 1
+        logger.info("add_admin - user_id=%s, назначил %s, добавлен=%s", user_id, added_by, added)
+        return added
+
+    def remove_admin(self, user_id: int) -> bool:
+        """Снимаем права администратора; False, если он не был администратором"""
+        cursor = self.conn.cursor()
+        cursor.execute('DELETE FROM admins WHERE user_id = ?', (user_id,))
+        removed = cursor.rowcount > 0
+        cursor.execute("UPDATE users SET role = 'worker' WHERE user_id = ?", (user_id,))
+        self._commit()
+
+        self._load_admin_ids()
+        self.user_cache.invalidate(user_id)
+        self.roster_version += 1
+        logger.info("remove_admin - user_id=%s, удален=%s", user_id, removed)
+        return removed
+
     def get_all_workers(self):
         """Получаем всех работников (не админов)"""
         cursor = self.conn.cursor()
         cursor.execute('SELECT user_id, fio FROM users WHERE role = ? ORDER BY fio', ('worker',))
         workers = cursor.fetchall()
 
-        print(f"🔍 DATABASE: get_all_workers вернул {len(workers)} работников")
-        for worker in workers:
-            print(f"  - ID: {worker[0]}, ФИО: {worker[1]}")
+        logger.debug("get_all_workers вернул %s работников", len(workers))
+
+        return workers
+
+    def get_workers_page(self, limit: int, anchor_id: int = None, direction: str = 'next'):
+        """Страница работников по алфавиту (keyset по fio, user_id по индексу (role, fio)).
+
+        direction: 'next' - после anchor_id, 'prev' - перед ним,
+        'at' - начиная с anchor_id включительно.
+        Возвращает (workers, has_prev, has_next).
+        """
+        cursor = self.conn.cursor()
+        anchor = '(SELECT fio, user_id FROM users WHERE user_id = ?)'
+
+        if anchor_id is None:
+            cursor.execute('''
+            SELECT user_id, fio FROM users
+            WHERE role = 'worker'
+            ORDER BY fio, user_id
+            LIMIT ?
+            ''', (limit,))
+            workers = cursor.fetchall()
+        elif direction == 'prev':
+            cursor.execute(f'''
+            SELECT user_id, fio FROM users
+            WHERE role = 'worker' AND (fio, user_id) < {anchor}
+            ORDER BY fio DESC, user_id DESC
+            LIMIT ?
+            ''', (anchor_id, limit))
+            workers = cursor.fetchall()[::-1]
+        else:
+            operator = '>=' if direction == 'at' else '>'
+            cursor.execute(f'''
+            SELECT user_id, fio FROM users
+            WHERE role = 'worker' AND (fio, user_id) {operator} {anchor}
+            ORDER BY fio, user_id
+            LIMIT ?
+            ''', (anchor_id, limit))
+            workers = cursor.fetchall()
+
+        has_prev = has_next = False
+        if workers:
+            cursor.execute(f'''
+            SELECT EXISTS (
+                SELECT 1 FROM users WHERE role = 'worker' AND (fio, user_id) < {anchor}
+            ), EXISTS (
+                SELECT 1 FROM users WHERE role = 'worker' AND (fio, user_id) > {anchor}
+            )
+            ''', (workers[0]['user_id'], workers[-1]['user_id']))
+            has_prev, has_next = (bool(value) for value in cursor.fetchone())
+
+        return workers, has_prev, has_next
+
+    def search_workers(self, query: str, limit: int):
+        """Поиск работников по ФИО.
+
+        От 3 символов - подстрока в любом месте ФИО через триграммный
+        индекс users_fts; короче - начало ФИО по индексу (role, fio).
+        Возвращает не больше limit работников по алфавиту.
+        """
+        query = ' '.join(query.split())
+        cursor = self.conn.cursor()
+
+        if len(query) >= 3:
+            cursor.execute('''
+            SELECT u.user_id, u.fio
+            FROM users_fts
+            JOIN users u ON u.user_id = users_fts.rowid
+            WHERE users_fts MATCH ? AND u.role = 'worker'
+            ORDER BY u.fio, u.user_id
+            LIMIT ?
+            ''', ('"' + query.replace('"', '""') + '"', limit))
+        else:
+            # ФИО обычно с заглавной буквы, а сравнение по индексу - с учетом регистра
+            prefix = query[:1].upper() + query[1:]
+            cursor.execute('''
+            SELECT user_id, fio FROM users
+            WHERE role = 'worker' AND fio >= ? AND fio < ?
+            ORDER BY fio, user_id
+            LIMIT ?
+            ''', (prefix, prefix + '\U0010ffff', limit))
 
+        workers = cursor.fetchall()
+        logger.debug("search_workers(%r) вернул %s работников", query, len(workers))
         return workers
 
+    def get_all_worker_ids(self) -> list:
+        """ID всех работников"""
+        cursor = self.conn.cursor()
+        cursor.execute("SELECT user_id FROM users WHERE role = 'worker'")
+        return [row[0] for row in cursor.fetchall()]
+
     def get_all_users(self):
         """Получаем всех пользователей"""
         cursor = self.conn.cursor()
         cursor.execute('SELECT user_id, fio, role FROM users ORDER BY role, fio')
         users = cursor.fetchall()
 
-        print(f"🔍 DATABASE: get_all_users вернул {len(users)} пользователей")
+        logger.debug("get_all_users вернул %s пользователей", len(users))
         return users
 
-    def add_admin_task(self, from_admin_id: int, to_worker_id: int, task_text: str):
-        """Добавляем задание от администратора"""
-        cursor = self.conn.cursor()
-        cursor.execute('''
-        INSERT INTO admin_tasks (from_admin_id, to_worker_id, task_text)
-        VALUES (?, ?, ?)
-        ''', (from_admin_id, to_worker_id, task_text))
-        self.conn.commit()
-        task_id = cursor.lastrowid
+    def add_admin_task(self, from_admin_id: int, to_worker_id: int, task_text: str, notify=None):
+        """Добавляем задание от администратора.
 
-        print(f"🔍 DATABASE: add_admin_task - task_id={task_id}, от админа {from_admin_id} работнику {to_worker_id}")
+        notify(task_id) возвращает уведомления (user_id, message, reply_markup),
+        которые ставятся в очередь в той же транзакции.
+        """
+        # Запись и уведомления о ней - вместе или никак
+        with self.atomic():
+            cursor = self.conn.cursor()
+            cursor.execute('''
+            INSERT INTO admin_tasks (from_admin_id, to_worker_id, task_text)
+            VALUES (?, ?, ?)
+            ''', (from_admin_id, to_worker_id, task_text))
+            task_id = cursor.lastrowid
+            if notify:
+                self._add_notifications(cursor, notify(task_id))
+        self._commit()
+
+        logger.debug("add_admin_task - task_id=%s, от админа %s работнику %s", task_id, from_admin_id, to_worker_id)
         return task_id
 
+    def add_admin_tasks_bulk(self, from_admin_id: int, worker_ids: list, task_text: str, notify=None,
+                             hold: int = 0):
+        """Одно задание сразу нескольким работникам - одной транзакцией (см. add_admin_tasks_many)"""
+        return self.add_admin_tasks_many(
+            from_admin_id, [(worker_id, task_text) for worker_id in worker_ids], notify, hold
+        )
+
+    def add_admin_tasks_many(self, from_admin_id: int, tasks: list, notify=None, hold: int = 0):
+        """Пачка заданий (worker_id, task_text) - одной транзакцией.
+
+        notify(task_id, worker_id, task_text) возвращает уведомления для
+        очереди, hold - задержка их фоновой отправки (см. _add_notifications).
+        Возвращает (tasks, notifications): строки (task_id, to_worker_id, task_text)
+        и строки очереди в формате get_due_notifications.
+        """
+        with self.atomic():
+            cursor = self.conn.cursor()
+            created = []
+            # Только тем, кто все еще работник (список мог измениться, пока шел выбор)
+            for worker_id, task_text in tasks:
+                cursor.execute('''
+                INSERT INTO admin_tasks (from_admin_id, to_worker_id, task_text)
+                SELECT ?, user_id, ? FROM users WHERE user_id = ? AND role = 'worker'
+                RETURNING task_id, to_worker_id, task_text
+                ''', (from_admin_id, task_text, worker_id))
+                created.extend(cursor.fetchall())
+
+            notifications = []
+            if notify:
+                notifications = self._add_notifications(cursor, [
+                    notification
+                    for task in created
+                    for notification in notify(task['task_id'], task['to_worker_id'], task['task_text'])
+                ], hold, returning=True)
+
+        self._commit()
+        logger.debug("add_admin_tasks_many - %s заданий от админа %s", len(created), from_admin_id)
+        return created, notifications
+
+    def import_workers(self, workers: list) -> int:
+        """Пачка работников (user_id, username, fio) из файла - одной транзакцией.
+
+        Новые пользователи получают роль по таблице admins, у существующих
+        обновляются ФИО и username, роль не меняется. Возвращает число строк.
+        """
+        cursor = self.conn.cursor()
+        cursor.executemany('''
+        INSERT INTO users (user_id, username, fio, role)
+        VALUES (?, ?, ?, ?)
+        ON CONFLICT (user_id) DO UPDATE SET
+            username = COALESCE(excluded.username, users.username), fio = excluded.fio
+        ''', [
+            (user_id, username, fio, 'admin' if self.is_admin(user_id) else 'worker')
+            for user_id, username, fio in workers
+        ])
+        self._commit()
+
+        for user_id, _, _ in workers:
+            self.user_cache.invalidate(user_id)
+        self.roster_version += 1
+        logger.debug("import_workers - %s пользователей", len(workers))
+        return len(workers)
+
+    def get_existing_worker_ids(self, user_ids: list) -> set:
+        """Какие из user_ids - зарегистрированные работники"""
+        cursor = self.conn.cursor()
+        cursor.execute(
+            f"SELECT user_id FROM users WHERE role = 'worker' AND user_id IN ({','.join('?' * len(user_ids))})",
+            list(user_ids)
+        )
+        return {row[0] for row in cursor.fetchall()}
+
     def get_worker_tasks(self, worker_id: int, status: str = None):
         """Получаем задания для работника"""
         cursor = self.conn.cursor()
@@ -158,40 +436,99 @@ class Database:
             ''', (worker_id,))
 
         tasks = cursor.fetchall()
-        print(f"🔍 DATABASE: get_worker_tasks для worker_id={worker_id} вернул {len(tasks)} заданий")
+        logger.debug("get_worker_tasks для worker_id=%s вернул %s заданий", worker_id, len(tasks))
         return tasks
 
-    def update_task_status(self, task_id: int, status: str, comment: str = None):
-        """Обновляем статус задания"""
+    def get_worker_tasks_page(self, worker_id: int, limit: int, anchor_id: int = None, direction: str = 'next'):
+        """Страница заданий работника, от новых к старым (keyset по created_at, task_id).
+
+        direction: 'next' - задания старше anchor_id, 'prev' - новее anchor_id,
+        'at' - начиная с anchor_id включительно. Без anchor_id - первая страница.
+        Возвращает (tasks, has_newer, has_older).
+        """
         cursor = self.conn.cursor()
-        if comment:
+        anchor = '(SELECT created_at, task_id FROM admin_tasks WHERE task_id = ?)'
+
+        if anchor_id is None:
             cursor.execute('''
-            UPDATE admin_tasks 
-            SET status = ?, worker_comment = ?, read_at = CURRENT_TIMESTAMP
-            WHERE task_id = ?
-            ''', (status, comment, task_id))
-            print(f"🔍 DATABASE: update_task_status task_id={task_id} -> {status} с комментарием")
+            SELECT * FROM admin_tasks
+            WHERE to_worker_id = ?
+            ORDER BY created_at DESC, task_id DESC
+            LIMIT ?
+            ''', (worker_id, limit))
+            tasks = cursor.fetchall()
+        elif direction == 'prev':
+            cursor.execute(f'''
+            SELECT * FROM admin_tasks
+            WHERE to_worker_id = ? AND (created_at, task_id) > {anchor}
+            ORDER BY created_at ASC, task_id ASC
+            LIMIT ?
+            ''', (worker_id, anchor_id, limit))
+            tasks = cursor.fetchall()[::-1]
         else:
-            cursor.execute('''
-            UPDATE admin_tasks 
-            SET status = ?, read_at = CURRENT_TIMESTAMP
-            WHERE task_id = ?
-            ''', (status, task_id))
-            print(f"🔍 DATABASE: update_task_status task_id={task_id} -> {status}")
+            operator = '<=' if direction == 'at' else '<'
+            cursor.execute(f'''
+            SELECT * FROM admin_tasks
+            WHERE to_worker_id = ? AND (created_at, task_id) {operator} {anchor}
+            ORDER BY created_at DESC, task_id DESC
+            LIMIT ?
+            ''', (worker_id, anchor_id, limit))
+            tasks = cursor.fetchall()
 
-        self.conn.commit()
+        has_newer = has_older = False
+        if tasks:
+            cursor.execute(f'''
+            SELECT EXISTS (
+                SELECT 1 FROM admin_tasks WHERE to_worker_id = ? AND (created_at, task_id) > {anchor}
+            ), EXISTS (
+                SELECT 1 FROM admin_tasks WHERE to_worker_id = ? AND (created_at, task_id) < {anchor}
+            )
+            ''', (worker_id, tasks[0]['task_id'], worker_id, tasks[-1]['task_id']))
+            has_newer, has_older = (bool(value) for value in cursor.fetchone())
 
-    def add_worker_task(self, from_worker_id: int, task_text: str):
-        """Добавляем задание от работника"""
-        cursor = self.conn.cursor()
-        cursor.execute('''
-        INSERT INTO worker_tasks (from_worker_id, task_text)
-        VALUES (?, ?)
-        ''', (from_worker_id, task_text))
-        self.conn.commit()
-        task_id = cursor.lastrowid
+        logger.debug("get_worker_tasks_page для worker_id=%s вернул %s заданий", worker_id, len(tasks))
+        return tasks, has_newer, has_older
+
+    def update_task_status(self, task_id: int, status: str, comment: str = None, notifications: list = None):
+        """Обновляем статус задания (и ставим уведомления в очередь в той же транзакции).
+
+        read_at - время первого ответа работника, повторные ответы его не меняют.
+        """
+        with self.atomic():
+            cursor = self.conn.cursor()
+            if comment:
+                cursor.execute('''
+                UPDATE admin_tasks 
+                SET status = ?, worker_comment = ?, read_at = COALESCE(read_at, CURRENT_TIMESTAMP)
+                WHERE task_id = ?
+                ''', (status, comment, task_id))
+                logger.debug("update_task_status task_id=%s -> %s с комментарием", task_id, status)
+            else:
+                cursor.execute('''
+                UPDATE admin_tasks 
+                SET status = ?, read_at = COALESCE(read_at, CURRENT_TIMESTAMP)
+                WHERE task_id = ?
+                ''', (status, task_id))
+                logger.debug("update_task_status task_id=%s -> %s", task_id, status)
+
+            if notifications:
+                self._add_notifications(cursor, notifications)
+        self._commit()
 
-        print(f"🔍 DATABASE: add_worker_task - task_id={task_id}, от работника {from_worker_id}")
+    def add_worker_task(self, from_worker_id: int, task_text: str, notify=None):
+        """Добавляем задание от работника (notify - как в add_admin_task)"""
+        with self.atomic():
+            cursor = self.conn.cursor()
+            cursor.execute('''
+            INSERT INTO worker_tasks (from_worker_id, task_text)
+            VALUES (?, ?)
+            ''', (from_worker_id, task_text))
+            task_id = cursor.lastrowid
+            if notify:
+                self._add_notifications(cursor, notify(task_id))
+        self._commit()
+
+        logger.debug("add_worker_task - task_id=%s, от работника %s", task_id, from_worker_id)
         return task_id
 
     def get_pending_worker_tasks(self):
@@ -206,33 +543,422 @@ class Database:
         ''')
 
         tasks = cursor.fetchall()
-        print(f"🔍 DATABASE: get_pending_worker_tasks вернул {len(tasks)} заданий на рассмотрении")
+        logger.debug("get_pending_worker_tasks вернул %s заданий на рассмотрении", len(tasks))
         return tasks
 
-    def update_worker_task_status(self, task_id: int, status: str, admin_id: int, comment: str = None):
-        """Обновляем статус задания от работника"""
+    def get_admin_task_details(self, task_id: int):
+        """Получаем задание администратора вместе с ФИО работника и администратора"""
         cursor = self.conn.cursor()
-        if comment:
-            cursor.execute('''
-            UPDATE worker_tasks 
-            SET status = ?, reviewed_by = ?, reviewed_at = CURRENT_TIMESTAMP, admin_comment = ?
-            WHERE task_id = ?
-            ''', (status, admin_id, comment, task_id))
-            print(f"🔍 DATABASE: update_worker_task_status task_id={task_id} -> {status} с комментарием")
+        cursor.execute('''
+        SELECT at.*, u.fio as worker_fio, admin_user.fio as admin_fio
+        FROM admin_tasks at
+        JOIN users u ON at.to_worker_id = u.user_id
+        JOIN users admin_user ON at.from_admin_id = admin_user.user_id
+        WHERE at.task_id = ?
+        ''', (task_id,))
+        return cursor.fetchone()
+
+    # Ветки ленты заданий: (тип записи, таблица, столбец работника, столбец администратора)
+    TIMELINE_SOURCES = (
+        ('a', 'admin_tasks', 'to_worker_id', 'from_admin_id'),
+        ('w', 'worker_tasks', 'from_worker_id', 'reviewed_by'),
+    )
+
+    def _timeline_filters(self, worker_column: str, status: str = None, worker_id: int = None,
+                          date_from: str = None, date_to: str = None):
+        """Условия WHERE ветки ленты и их параметры"""
+        conditions, params = [], []
+        if status:
+            conditions.append('status = ?')
+            params.append(status)
+        if worker_id:
+            conditions.append(f'{worker_column} = ?')
+            params.append(worker_id)
+        if date_from:
+            conditions.append('created_at >= ?')
+            params.append(date_from)
+        if date_to:
+            conditions.append('created_at < ?')
+            params.append(date_to)
+        return conditions, params
+
+    def get_timeline_page(self, limit: int, anchor: tuple = None, direction: str = 'next', **filters):
+        """Страница общей ленты заданий администраторов и работников, от новых к старым.
+
+        Ветки UNION ALL читаются по индексам (..., created_at) уже в нужном
+        порядке, и SQLite сливает их без сортировки, останавливаясь на
+        LIMIT, поэтому запрос не зависит от размера таблиц. Порядок -
+        keyset по (created_at, task_id, kind), где kind: 'a' - задание
+        администратора, 'w' - запрос работника.
+        anchor - (kind, task_id) записи, от которой листаем: 'next' - старше
+        нее, 'prev' - новее. filters: status, worker_id, date_from, date_to.
+        Возвращает (entries, has_newer, has_older).
+        """
+        cursor = self.conn.cursor()
+
+        key = None
+        if anchor is not None:
+            kind, task_id = anchor
+            table = dict((source[0], source[1]) for source in self.TIMELINE_SOURCES)[kind]
+            cursor.execute(f'SELECT created_at FROM {table} WHERE task_id = ?', (task_id,))
+            row = cursor.fetchone()
+            if row is None:
+                return [], False, False
+            key = (row['created_at'], task_id, kind)
+
+        newer = direction == 'prev' and key is not None
+        operator, order = ('>', 'ASC') if newer else ('<', 'DESC')
+
+        branches, params = [], []
+        for kind, table, worker_column, admin_column in self.TIMELINE_SOURCES:
+            conditions, branch_params = self._timeline_filters(worker_column, **filters)
+            if key is not None:
+                # Граница по created_at отдельно - чтобы SQLite взял диапазон индекса
+                conditions.append(f'created_at {operator}= ?')
+                conditions.append(f"(created_at, task_id, '{kind}') {operator} (?, ?, ?)")
+                branch_params += [key[0], *key]
+            where = 'WHERE ' + ' AND '.join(conditions) if conditions else ''
+            # ФИО подтягиваются в самой ветке: слияние по индексу сохраняется
+            branches.append(f'''
+            SELECT '{kind}' AS kind, t.task_id AS task_id, t.task_text AS task_text, t.status AS status,
+                   t.created_at AS created_at, t.{worker_column} AS worker_id, t.{admin_column} AS admin_id,
+                   worker_user.fio AS worker_fio, admin_user.fio AS admin_fio
+            FROM {table} t
+            LEFT JOIN users worker_user ON t.{worker_column} = worker_user.user_id
+            LEFT JOIN users admin_user ON t.{admin_column} = admin_user.user_id
+            {where}''')
+            params += branch_params
+
+        # kind в конце ключа: (created_at, task_id) уже уникален в ветке, и сортировка не нужна
+        cursor.execute(f'''
+        {' UNION ALL '.join(branches)}
+        ORDER BY created_at {order}, task_id {order}, kind {order}
+        LIMIT ?
+        ''', params + [limit])
+        entries = cursor.fetchall()
+        if newer:
+            entries = entries[::-1]
+
+        has_newer = has_older = False
+        if entries:
+            first, last = entries[0], entries[-1]
+            has_newer = self._timeline_exists('>', (first['created_at'], first['task_id'], first['kind']), filters)
+            has_older = self._timeline_exists('<', (last['created_at'], last['task_id'], last['kind']), filters)
+
+        logger.debug("get_timeline_page вернул %s записей, фильтры %s", len(entries), filters)
+        return entries, has_newer, has_older
+
+    def _timeline_exists(self, operator: str, key: tuple, filters: dict) -> bool:
+        """Есть ли в ленте записи новее ('>') или старше ('<') ключа"""
+        probes, params = [], []
+        for kind, table, worker_column, _ in self.TIMELINE_SOURCES:
+            conditions, branch_params = self._timeline_filters(worker_column, **filters)
+            conditions.append(f'created_at {operator}= ?')
+            conditions.append(f"(created_at, task_id, '{kind}') {operator} (?, ?, ?)")
+            probes.append(f"EXISTS (SELECT 1 FROM {table} WHERE {' AND '.join(conditions)})")
+            params += branch_params + [key[0], *key]
+
+        cursor = self.conn.cursor()
+        cursor.execute(f"SELECT {' OR '.join(probes)}", params)
+        return bool(cursor.fetchone()[0])
+
+    def open_reader(self) -> sqlite3.Connection:
+        """Отдельное соединение только для чтения - для выгрузок.
+
+        В режиме WAL читатель видит снимок БД и не мешает записи, поэтому
+        долгая выгрузка не занимает поток БД и не задерживает остальных.
+        """
+        uri = Path(self.db_path).resolve().as_uri() + '?mode=ro'
+        conn = self._connect(uri, uri=True)
+        conn.execute(f'PRAGMA mmap_size = {Config.SQLITE_MMAP_SIZE}')
+        return conn
+
+    def get_export_queries(self, **filters) -> list:
+        """Запросы выгрузки заданий: [(kind, sql, params)] по веткам ленты.
+
+        Каждая ветка читается по индексу (..., created_at) в порядке
+        создания, без сортировки всей таблицы, так что строки можно
+        забирать курсором по частям. filters - как у get_timeline_page.
+        Столбцы: kind, task_id, created_at, status, worker_fio, admin_fio,
+        task_text, comment, closed_at.
+        """
+        queries = []
+        for kind, table, worker_column, admin_column in self.TIMELINE_SOURCES:
+            conditions, params = self._timeline_filters(worker_column, **filters)
+            where = 'WHERE ' + ' AND '.join(conditions) if conditions else ''
+            comment, closed_at = (
+                ('t.worker_comment', 'COALESCE(t.completed_at, t.read_at)') if kind == 'a'
+                else ('t.admin_comment', 't.reviewed_at')
+            )
+            queries.append((kind, f'''
+            SELECT '{kind}', t.task_id, t.created_at, t.status, worker_user.fio, admin_user.fio,
+                   t.task_text, {comment}, {closed_at}
+            FROM {table} t
+            LEFT JOIN users worker_user ON t.{worker_column} = worker_user.user_id
+            LEFT JOIN users admin_user ON t.{admin_column} = admin_user.user_id
+            {where}
+            ORDER BY t.created_at, t.task_id
+            ''', params))
+        return queries
+
+    def get_stats(self, top: int = 10) -> dict:
+        """Сводная статистика из таблиц, которые ведут триггеры (миграция 9).
+
+        Читаются только счетчики и гистограмма, поэтому время ответа не
+        зависит от объема истории заданий.
+        Возвращает {'counters': {(kind, status): count}, 'latency':
+        [(bucket, count)] (bucket None - дольше latency_limit секунд),
+        'latency_limit', 'top_workers': [(worker_id, fio, {(kind, status): count})]}.
+        """
+        cursor = self.conn.cursor()
+        cursor.execute('SELECT kind, status, count FROM stat_counters')
+        counters = {(row['kind'], row['status']): row['count'] for row in cursor.fetchall()}
+
+        cursor.execute('SELECT bucket, count FROM read_latency_hist ORDER BY bucket')
+        latency = [
+            (None if row['bucket'] == LATENCY_OVERFLOW else row['bucket'], row['count'])
+            for row in cursor.fetchall()
+        ]
+
+        # Лучшие по числу принятых заданий - по индексу (kind, status, count)
+        cursor.execute('''
+        SELECT wc.worker_id, u.fio
+        FROM worker_counters wc
+        LEFT JOIN users u ON wc.worker_id = u.user_id
+        WHERE wc.kind = 'a' AND wc.status = 'accepted' AND wc.count > 0
+        ORDER BY wc.count DESC
+        LIMIT ?
+        ''', (top,))
+        top_workers = [(row['worker_id'], row['fio'], {}) for row in cursor.fetchall()]
+
+        if top_workers:
+            by_worker = {worker_id: worker_counters for worker_id, _, worker_counters in top_workers}
+            cursor.execute(
+                f"SELECT worker_id, kind, status, count FROM worker_counters "
+                f"WHERE worker_id IN ({','.join('?' * len(by_worker))})",
+                list(by_worker)
+            )
+            for row in cursor.fetchall():
+                by_worker[row['worker_id']][(row['kind'], row['status'])] = row['count']
+
+        return {
+            'counters': counters,
+            'latency': latency,
+            'latency_limit': LATENCY_BUCKETS[-1],
+            'top_workers': top_workers,
+        }
+
+    def search_tasks(self, query: str, limit: int, offset: int = 0, worker_id: int = None):
+        """Полнотекстовый поиск по заданиям и запросам (тексты и комментарии).
+
+        Каждое слово запроса ищется как префикс ("бетон" найдет и "бетона"),
+        результаты упорядочены по релевантности (bm25). worker_id - только
+        задания этого работника. Возвращает (results, has_more).
+        Совпадения в snippet обрамлены SNIPPET_START и SNIPPET_END.
+        """
+        tokens = re.findall(r'\w+', query)
+        if not tokens:
+            return [], False
+        # Простая замена стемминга: у длинных слов отрезаем окончание-гласную,
+        # чтобы "секция" находила и "секции", "секцию"
+        tokens = [
+            token[:-1] if len(token) >= 5 and token[-1].lower() in 'аеёиоуыэюяьй' else token
+            for token in tokens
+        ]
+        match = ' '.join('"' + token + '"*' for token in tokens)
+
+        scope, params = '', [SNIPPET_START, SNIPPET_END, match]
+        if worker_id is not None:
+            scope = 'AND worker_id = ?'
+            params.append(worker_id)
+
+        cursor = self.conn.cursor()
+        cursor.execute(f'''
+        SELECT m.kind, m.task_id, m.snippet,
+               COALESCE(at.status, wt.status) AS status,
+               COALESCE(at.created_at, wt.created_at) AS created_at,
+               worker_user.fio AS worker_fio
+        FROM (
+            SELECT rowid AS fts_rowid,
+                   CASE rowid % 2 WHEN 0 THEN 'a' ELSE 'w' END AS kind,
+                   rowid / 2 AS task_id,
+                   worker_id,
+                   snippet(tasks_fts, -1, ?, ?, '…', 16) AS snippet,
+                   bm25(tasks_fts, 1.0, 0.5) AS score
+            FROM tasks_fts
+            WHERE tasks_fts MATCH ? {scope}
+            ORDER BY score, fts_rowid
+            LIMIT ? OFFSET ?
+        ) m
+        LEFT JOIN admin_tasks at ON m.kind = 'a' AND at.task_id = m.task_id
+        LEFT JOIN worker_tasks wt ON m.kind = 'w' AND wt.task_id = m.task_id
+        LEFT JOIN users worker_user ON worker_user.user_id = m.worker_id
+        ORDER BY m.score, m.fts_rowid
+        ''', params + [limit + 1, offset])
+        results = cursor.fetchall()
+
+        logger.debug("search_tasks(%r) вернул %s результатов", match, len(results))
+        return results[:limit], len(results) > limit
+
+    def get_worker_requests(self, worker_id: int):
+        """Получаем задания, отправленные работником, с ФИО рассмотревшего"""
+        cursor = self.conn.cursor()
+        cursor.execute('''
+        SELECT wt.*, u.fio as reviewer_fio
+        FROM worker_tasks wt
+        LEFT JOIN users u ON wt.reviewed_by = u.user_id
+        WHERE wt.from_worker_id = ?
+        ORDER BY wt.created_at DESC
+        ''', (worker_id,))
+        tasks = cursor.fetchall()
+        logger.debug("get_worker_requests для worker_id=%s вернул %s заданий", worker_id, len(tasks))
+        return tasks
+
+    def get_worker_task_details(self, task_id: int):
+        """Получаем задание работника вместе с его ФИО"""
+        cursor = self.conn.cursor()
+        cursor.execute('''
+        SELECT wt.*, u.user_id as worker_id, u.fio as worker_fio
+        FROM worker_tasks wt
+        JOIN users u ON wt.from_worker_id = u.user_id
+        WHERE wt.task_id = ?
+        ''', (task_id,))
+        return cursor.fetchone()
+
+    def update_worker_task_status(self, task_id: int, status: str, admin_id: int, comment: str = None,
+                                  notifications: list = None):
+        """Обновляем статус задания от работника (и ставим уведомления в очередь)"""
+        with self.atomic():
+            cursor = self.conn.cursor()
+            if comment:
+                cursor.execute('''
+                UPDATE worker_tasks 
+                SET status = ?, reviewed_by = ?, reviewed_at = CURRENT_TIMESTAMP, admin_comment = ?
+                WHERE task_id = ?
+                ''', (status, admin_id, comment, task_id))
+                logger.debug("update_worker_task_status task_id=%s -> %s с комментарием", task_id, status)
+            else:
+                cursor.execute('''
+                UPDATE worker_tasks 
+                SET status = ?, reviewed_by = ?, reviewed_at = CURRENT_TIMESTAMP
+                WHERE task_id = ?
+                ''', (status, admin_id, task_id))
+                logger.debug("update_worker_task_status task_id=%s -> %s", task_id, status)
+
+            if notifications:
+                self._add_notifications(cursor, notifications)
+        self._commit()
+
+    def _add_notifications(self, cursor, notifications: list, hold: int = 0, returning: bool = False):
+        """Ставим уведомления (user_id, message, reply_markup) в очередь без commit.
+
+        hold - через сколько секунд фоновая отправка может их забрать
+        (если вызывающий код отправляет их сам, сразу после commit).
+        returning - вернуть добавленные строки в формате get_due_notifications.
+        """
+        sql = f'''
+        INSERT INTO notifications (user_id, message, reply_markup, status, next_attempt_at)
+        VALUES (?, ?, ?, 'pending', datetime('now', '+{int(hold)} seconds'))
+        '''
+        rows = None
+        if returning:
+            rows = []
+            for notification in notifications:
+                cursor.execute(sql + 'RETURNING notification_id, user_id, message, reply_markup, attempts', notification)
+                rows.extend(cursor.fetchall())
         else:
-            cursor.execute('''
-            UPDATE worker_tasks 
-            SET status = ?, reviewed_by = ?, reviewed_at = CURRENT_TIMESTAMP
-            WHERE task_id = ?
-            ''', (status, admin_id, task_id))
-            print(f"🔍 DATABASE: update_worker_task_status task_id={task_id} -> {status}")
+            cursor.executemany(sql, notifications)
+        logger.debug("В очередь добавлено %s уведомлений", len(notifications))
+        return rows
 
-        self.conn.commit()
+    def add_notifications(self, notifications: list):
+        """Ставим уведомления (user_id, message, reply_markup) в очередь"""
+        cursor = self.conn.cursor()
+        self._add_notifications(cursor, notifications)
+        self._commit()
+
+    def get_due_notifications(self, limit: int = 50, exclude_ids: list = ()):
+        """Получаем уведомления, которые пора отправить"""
+        cursor = self.conn.cursor()
+        cursor.execute(f'''
+        SELECT notification_id, user_id, message, reply_markup, attempts
+        FROM notifications
+        WHERE status = 'pending' AND next_attempt_at <= CURRENT_TIMESTAMP
+          AND notification_id NOT IN ({','.join('?' * len(exclude_ids))})
+        ORDER BY next_attempt_at
+        LIMIT ?
+        ''', (*exclude_ids, limit))
+        return cursor.fetchall()
+
+    def mark_notifications_sent(self, notification_ids: list):
+        """Отмечаем уведомления как отправленные"""
+        cursor = self.conn.cursor()
+        cursor.executemany('''
+        UPDATE notifications
+        SET status = 'sent', sent_at = CURRENT_TIMESTAMP, attempts = attempts + 1
+        WHERE notification_id = ?
+        ''', [(notification_id,) for notification_id in notification_ids])
+        self._commit()
+
+    def mark_notifications_failed(self, failures: list):
+        """Фиксируем неудачные отправки: (notification_id, error, retry_delay).
+
+        retry_delay - через сколько секунд повторить; None - больше не пытаться.
+        """
+        cursor = self.conn.cursor()
+        cursor.executemany('''
+        UPDATE notifications
+        SET attempts = attempts + 1,
+            last_error = ?,
+            status = CASE WHEN ? IS NULL THEN 'failed' ELSE 'pending' END,
+            next_attempt_at = datetime('now', '+' || COALESCE(?, 0) || ' seconds')
+        WHERE notification_id = ?
+        ''', [(error, delay, delay, notification_id) for notification_id, error, delay in failures])
+        self._commit()
+
+    def get_fsm_record(self, key: str):
+        """Получаем сохраненное состояние FSM по ключу"""
+        cursor = self.conn.cursor()
+        cursor.execute('SELECT state, data, updated_at FROM fsm_storage WHERE key = ?', (key,))
+        return cursor.fetchone()
+
+    def save_fsm_records(self, records: list):
+        """Сохраняем пачку состояний FSM: (key, state, data, updated_at).
+
+        Записи без состояния и данных удаляются.
+        """
+        cursor = self.conn.cursor()
+        cursor.executemany('''
+        INSERT OR REPLACE INTO fsm_storage (key, state, data, updated_at)
+        VALUES (?, ?, ?, ?)
+        ''', [record for record in records if record[1] is not None or record[2] is not None])
+        cursor.executemany(
+            'DELETE FROM fsm_storage WHERE key = ?',
+            [(record[0],) for record in records if record[1] is None and record[2] is None]
+        )
+        self._commit()
+        logger.debug("save_fsm_records - сохранено %s записей", len(records))
+
+    def delete_expired_fsm_records(self, updated_before: float) -> int:
+        """Удаляем состояния FSM, к которым не обращались с указанного времени"""
+        cursor = self.conn.cursor()
+        cursor.execute('DELETE FROM fsm_storage WHERE updated_at < ?', (updated_before,))
+        self._commit()
+        logger.debug("delete_expired_fsm_records - удалено %s записей", cursor.rowcount)
+        return cursor.rowcount
+
+    def get_query_profile(self, limit: int = 10) -> list:
+        """Запросы с наибольшим суммарным временем (см. QueryProfiler.top)"""
+        return self.profiler.top(limit)
+
+    def reset_query_profile(self):
+        """Сбрасываем накопленную статистику запросов"""
+        self.profiler.reset()
 
     def close(self):
         """Закрываем соединение с БД"""
         self.conn.close()
-        print("🔍 DATABASE: Соединение закрыто")
+        logger.info("Соединение закрыто, кэш пользователей: %s", self.user_cache.stats())
 
     # Дополнительный метод для отладки
     def print_all_users(self):
@@ -257,4 +983,160 @@ class Database:
                 print("-" * 30)
 
         print(f"Всего пользователей: {len(users)}")
-        print("=" * 50)
\ No newline at end of file
+        print("=" * 50)
+
+
+class AsyncDatabase:
+    """Асинхронный доступ к Database.
+
+    Все обращения к SQLite выполняются в одном выделенном потоке БД:
+    запросы встают в очередь его executor'а, а обработчики только ждут
+    результат, не блокируя цикл событий. Любой публичный метод Database
+    доступен здесь как корутина с теми же аргументами.
+
+    При group_commit_ms > 0 записи, пришедшие в пределах этого окна,
+    фиксируются одной транзакцией (групповой коммит): вызов записи
+    завершается только после общего commit, так что гарантия сохранности
+    для обработчика та же, а fsync на диск - один на всю группу.
+    """
+
+    def __init__(self, db_path: str = None, group_commit_ms: int = None):
+        if group_commit_ms is None:
+            group_commit_ms = Config.DB_GROUP_COMMIT_MS
+
+        self.db_path = db_path
+        self.group_commit_ms = group_commit_ms
+        self.db = None
+        self._executor = None
+        self._commit_waiter = None
+        self._commit_timer = None
+        self._commit_tasks = set()
+        self._final_commit = None  # пока идет close: его коммит, который ждут последние записи
+
+    async def connect(self):
+        """Открываем соединение с БД (вызывается при старте бота)"""
+        if self.db is not None:
+            return
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="database")
+        # Соединение создаем в потоке БД, чтобы все операции шли из одного потока
+        self.db = await self.run(Database, self.db_path, self.group_commit_ms > 0)
+
+    async def run(self, func, *args, **kwargs):
+        """Выполняем функцию в потоке БД и ждем результат"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(func, *args, **kwargs))
+
+    def _call(self, func, args, kwargs):
+        """Вызов метода в потоке БД: результат и признак незафиксированной записи.
+
+        Записи метода, завершившегося ошибкой, откатываются (Database.call)
+        и не попадают в общий групповой коммит. Время выполнения (без
+        ожидания в очереди потока) и ошибки попадают в метрики по имени метода.
+        """
+        started = time.perf_counter()
+        try:
+            return self.db.call(func, *args, **kwargs), self.db.conn.in_transaction
+        except Exception:
+            metrics.db_errors_total.inc(func.__name__)
+            raise
+        finally:
+            metrics.db_query_duration.observe(time.perf_counter() - started, func.__name__)
+
+    async def _wait_group_commit(self):
+        """Присоединяемся к ближайшему групповому коммиту"""
+        if self._final_commit is not None:
+            # Соединение закрывается: запись фиксирует коммит close
+            await asyncio.shield(self._final_commit)
+            return
+        if self._commit_waiter is None:
+            loop = asyncio.get_running_loop()
+            self._commit_waiter = loop.create_future()
+            self._commit_timer = loop.call_later(self.group_commit_ms / 1000, self._flush_group_commit)
+        await asyncio.shield(self._commit_waiter)
+
+    def _flush_group_commit(self):
+        self._commit_timer = None
+        waiter, self._commit_waiter = self._commit_waiter, None
+        task = asyncio.ensure_future(self._commit_group(waiter))
+        self._commit_tasks.add(task)
+        task.add_done_callback(self._commit_tasks.discard)
+
+    async def _commit_group(self, *waiters):
+        """Фиксируем транзакцию и сообщаем результат всем, кто ее ждет"""
+        try:
+            await self.run(self._call, self.db.commit, (), {})
+        except Exception as e:
+            for waiter in waiters:
+                if waiter is not None:
+                    waiter.set_exception(e)
+        else:
+            for waiter in waiters:
+                if waiter is not None:
+                    waiter.set_result(None)
+
+    async def get_user(self, user_id: int):
+        """Пользователь из кэша без обращения к потоку БД, при промахе - из БД"""
+        if self.db is None or self._final_commit is not None:
+            raise AttributeError('get_user')
+        user = self.db.user_cache.get(user_id)
+        if user is MISSING:
+            user, _ = await self.run(self._call, self.db.load_user, (user_id,), {})
+        return user
+
+    async def is_admin(self, user_id: int) -> bool:
+        """Проверка по множеству администраторов в памяти, без обращения к потоку БД"""
+        if self.db is None:
+            raise AttributeError('is_admin')
+        return self.db.is_admin(user_id)
+
+    def count_user_cache(self) -> dict:
+        """Попадания и промахи кэша пользователей - для метрик"""
+        if self.db is None:
+            return {}
+        stats = self.db.user_cache.stats()
+        return {('hit',): stats['hits'], ('miss',): stats['misses']}
+
+    def __getattr__(self, name):
+        if name.startswith('_') or self.db is None or self._final_commit is not None:
+            raise AttributeError(name)
+        attr = getattr(self.db, name)
+        if not callable(attr):
+            return attr
+
+        @functools.wraps(attr)
+        async def method(*args, **kwargs):
+            if self._final_commit is not None:
+                raise AttributeError(name)
+            result, pending_write = await self.run(self._call, attr, args, kwargs)
+            if pending_write:
+                await self._wait_group_commit()
+            return result
+
+        return method
+
+    async def close(self):
+        """Фиксируем ожидающие записи, закрываем соединение и останавливаем поток БД.
+
+        Новые вызовы с начала закрытия не принимаются. Таймер группового
+        коммита отменяется: ожидающая группа и все записи, уже стоящие в
+        очереди потока, фиксируются здесь, до закрытия соединения.
+        """
+        if self.db is None or self._final_commit is not None:
+            return
+        self._final_commit = asyncio.get_running_loop().create_future()
+        if self._commit_timer is not None:
+            self._commit_timer.cancel()
+            self._commit_timer = None
+        waiter, self._commit_waiter = self._commit_waiter, None
+        # Коммиты групп, запущенные таймером раньше, должны дойти до потока БД при открытом соединении
+        if self._commit_tasks:
+            await asyncio.gather(*self._commit_tasks, return_exceptions=True)
+
+        await self._commit_group(waiter, self._final_commit)
+        if self._final_commit.exception() is not None:
+            logger.error("Ошибка фиксации записей при закрытии БД: %s", self._final_commit.exception())
+        await self.run(self.db.close)
+        self._executor.shutdown(wait=True)
+        self.db = None
+        self._executor = None
+        self._final_commit = None
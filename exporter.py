@@ -0,0 +1,124 @@
+# exporter.py
+"""Выгрузка заданий в CSV (gzip) или XLSX.
+
+Строки читаются курсором отдельного соединения только для чтения
+(Database.open_reader) пачками по batch_size и сразу пишутся в файл:
+CSV сжимается потоком и записывается через aiofiles, XLSX собирается
+openpyxl в режиме write_only. В памяти держится одна пачка, а поток БД
+выгрузка не занимает.
+"""
+import asyncio
+import csv
+import io
+import logging
+import zlib
+
+import aiofiles
+
+from config import Config
+from database import AsyncDatabase
+
+logger = logging.getLogger(__name__)
+
+EXPORT_FORMATS = ('csv', 'xlsx')
+EXPORT_HEADER = ['Тип', 'Номер', 'Создано', 'Статус', 'Работник', 'Администратор', 'Текст', 'Комментарий', 'Закрыто']
+KIND_LABELS = {'a': 'Задание администратора', 'w': 'Запрос работника'}
+SHEET_TITLES = {'a': 'Задания', 'w': 'Запросы работников'}
+
+
+class ExportError(Exception):
+    """Выгрузку в этом формате сделать нельзя"""
+
+
+def _export_query(conn, sql: str, params: list):
+    # Отдельная функция - чтобы запрос выгрузки был подписан в профиле SQL
+    return conn.execute(sql, params)
+
+
+async def iter_export_batches(db: AsyncDatabase, batch_size: int = None, **filters):
+    """Пачки строк выгрузки (см. Database.get_export_queries)"""
+    batch_size = batch_size or Config.EXPORT_BATCH_SIZE
+    queries = await db.get_export_queries(**filters)
+    conn = await db.open_reader()
+    try:
+        for _, sql, params in queries:
+            cursor = await asyncio.to_thread(_export_query, conn, sql, params)
+            while True:
+                rows = await asyncio.to_thread(cursor.fetchmany, batch_size)
+                if not rows:
+                    break
+                yield rows
+    finally:
+        conn.close()
+
+
+def _labeled(row) -> tuple:
+    """Строка выгрузки с подписью типа вместо kind"""
+    return (KIND_LABELS.get(row[0], row[0]), *row[1:])
+
+
+def _compress_rows(compressor, rows: list) -> bytes:
+    buffer = io.StringIO()
+    csv.writer(buffer, delimiter=';').writerows(map(_labeled, rows))
+    return compressor.compress(buffer.getvalue().encode('utf-8'))
+
+
+async def write_csv_gz(batches, path: str) -> int:
+    """CSV в кодировке UTF-8 с BOM (для Excel), сжатый gzip; возвращает число строк"""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)  # заголовок gzip
+    count = 0
+
+    async with aiofiles.open(path, 'wb') as file:
+        await file.write(compressor.compress('\ufeff'.encode('utf-8')))
+        await file.write(_compress_rows(compressor, [EXPORT_HEADER]))
+        async for rows in batches:
+            await file.write(await asyncio.to_thread(_compress_rows, compressor, rows))
+            count += len(rows)
+        await file.write(compressor.flush())
+
+    return count
+
+
+async def write_xlsx(batches, path: str) -> int:
+    """XLSX: задания администраторов и запросы работников - на отдельных листах"""
+    try:
+        from openpyxl import Workbook
+    except ImportError:
+        raise ExportError("Для XLSX нужен пакет openpyxl, выгрузите в CSV")
+
+    # write_only: строки сразу уходят во временный файл, а не копятся в памяти
+    workbook = Workbook(write_only=True)
+    sheets = {}
+    count = 0
+
+    def append_rows(rows):
+        for row in rows:
+            sheet = sheets.get(row[0])
+            if sheet is None:
+                sheet = sheets[row[0]] = workbook.create_sheet(title=SHEET_TITLES[row[0]])
+                sheet.append(EXPORT_HEADER)
+            sheet.append(_labeled(row))
+
+    async for rows in batches:
+        await asyncio.to_thread(append_rows, rows)
+        count += len(rows)
+
+    if not sheets:
+        workbook.create_sheet(title=SHEET_TITLES['a']).append(EXPORT_HEADER)
+    await asyncio.to_thread(workbook.save, path)
+    return count
+
+
+async def export_tasks(db: AsyncDatabase, path: str, export_format: str = 'csv', **filters) -> int:
+    """Выгружаем задания в файл path; возвращает число строк"""
+    batches = iter_export_batches(db, **filters)
+    try:
+        if export_format == 'xlsx':
+            count = await write_xlsx(batches, path)
+        else:
+            count = await write_csv_gz(batches, path)
+    finally:
+        await batches.aclose()
+
+    logger.info("Выгрузка %s: %s строк, фильтры %s", export_format, count, filters)
+    return count
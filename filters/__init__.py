@@ -0,0 +1,4 @@
+# Filters package
+from .role import IsAdmin
+
+__all__ = ['IsAdmin']
@@ -0,0 +1,12 @@
+# filters/role.py
+from typing import Optional
+
+from aiogram.filters import BaseFilter
+from aiogram.types import TelegramObject
+
+
+class IsAdmin(BaseFilter):
+    """Пропускает только апдейты администраторов (роль из RoleMiddleware)"""
+
+    async def __call__(self, event: TelegramObject, role: Optional[str] = None) -> bool:
+        return role == 'admin'
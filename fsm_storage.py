@@ -0,0 +1,164 @@
+# fsm_storage.py
+import asyncio
+import json
+import logging
+import time
+from collections import OrderedDict
+from contextlib import suppress
+from typing import Any, Dict, Optional
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, StateType, StorageKey
+
+from config import Config
+from database import AsyncDatabase
+
+logger = logging.getLogger(__name__)
+
+
+class _Record:
+    """Состояние одного диалога в кэше"""
+    __slots__ = ('state', 'data', 'touched')
+
+    def __init__(self, state: Optional[str], data: Dict[str, Any], touched: float):
+        self.state = state
+        self.data = data
+        self.touched = touched
+
+
+class SQLiteStorage(BaseStorage):
+    """FSM-хранилище в таблице fsm_storage основной БД бота.
+
+    Чтение и запись идут через кэш в памяти, изменения сбрасываются
+    в БД пачкой раз в flush_interval секунд (write-behind) и при остановке.
+    Диалоги, к которым не обращались дольше ttl секунд, удаляются из кэша
+    и из БД; размер кэша ограничен max_entries записями.
+    """
+
+    def __init__(
+        self,
+        db: AsyncDatabase,
+        ttl: int = None,
+        flush_interval: float = None,
+        max_entries: int = None
+    ):
+        self.db = db
+        self.ttl = ttl if ttl is not None else Config.FSM_STATE_TTL
+        self.flush_interval = flush_interval if flush_interval is not None else Config.FSM_FLUSH_INTERVAL
+        self.max_entries = max_entries if max_entries is not None else Config.FSM_CACHE_SIZE
+
+        self._cache: 'OrderedDict[str, _Record]' = OrderedDict()
+        self._dirty = set()
+        self._flush_task = None
+
+    @staticmethod
+    def _build_key(key: StorageKey) -> str:
+        parts = [key.bot_id, key.chat_id, key.user_id, key.thread_id or '', key.business_connection_id or '']
+        if key.destiny != 'default':
+            parts.append(key.destiny)
+        return ':'.join(str(part) for part in parts)
+
+    async def _get_record(self, key: StorageKey) -> _Record:
+        """Запись из кэша, при промахе - из БД"""
+        cache_key = self._build_key(key)
+        record = self._cache.get(cache_key)
+
+        if record is None:
+            row = await self.db.get_fsm_record(cache_key)
+            # Пока ждали БД, запись мог загрузить другой апдейт
+            record = self._cache.get(cache_key)
+            if record is None:
+                if row is not None and row['updated_at'] >= time.time() - self.ttl:
+                    record = _Record(row['state'], json.loads(row['data']) if row['data'] else {}, row['updated_at'])
+                else:
+                    record = _Record(None, {}, time.time())
+                self._cache[cache_key] = record
+
+        self._cache.move_to_end(cache_key)
+        record.touched = time.time()
+        return record
+
+    def _mark_dirty(self, key: StorageKey):
+        self._dirty.add(self._build_key(key))
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        record = await self._get_record(key)
+        record.state = state.state if isinstance(state, State) else state
+        self._mark_dirty(key)
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        record = await self._get_record(key)
+        return record.state
+
+    async def set_data(self, key: StorageKey, data: Dict[str, Any]) -> None:
+        record = await self._get_record(key)
+        record.data = data.copy()
+        self._mark_dirty(key)
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        record = await self._get_record(key)
+        return record.data.copy()
+
+    def count_states(self) -> Dict[tuple, int]:
+        """Число диалогов в кэше по состояниям - для метрик"""
+        counts = {}
+        for record in list(self._cache.values()):
+            if record.state is not None:
+                counts[(record.state,)] = counts.get((record.state,), 0) + 1
+        return counts
+
+    async def flush(self):
+        """Сбрасываем измененные записи в БД и вытесняем устаревшие из кэша"""
+        if self._dirty:
+            # Изменения во время записи попадают в новый набор и уйдут следующим сбросом
+            dirty, self._dirty = self._dirty, set()
+            records = []
+            for cache_key in dirty:
+                record = self._cache.get(cache_key)
+                if record is None:
+                    continue
+                data = json.dumps(record.data, ensure_ascii=False, separators=(',', ':')) if record.data else None
+                records.append((cache_key, record.state, data, record.touched))
+            try:
+                await self.db.save_fsm_records(records)
+            except BaseException:
+                # Не записали - ключи снова ждут сброса и не вытесняются из кэша
+                self._dirty |= dirty
+                raise
+
+        expired_before = time.time() - self.ttl
+        while self._cache:
+            cache_key, record = next(iter(self._cache.items()))
+            if record.touched >= expired_before and len(self._cache) <= self.max_entries:
+                break
+            if cache_key in self._dirty:
+                break
+            del self._cache[cache_key]
+
+    async def _flush_loop(self):
+        purge_every = max(1, int(3600 / self.flush_interval))
+        iteration = 0
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+                iteration += 1
+                if iteration % purge_every == 0:
+                    await self.db.delete_expired_fsm_records(time.time() - self.ttl)
+            except Exception as e:
+                logger.error("Ошибка сохранения состояний FSM: %s", e)
+
+    async def start(self):
+        """Запускаем фоновый сброс изменений (вызывается при старте бота)"""
+        await self.db.delete_expired_fsm_records(time.time() - self.ttl)
+        if self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush_loop())
+
+    async def close(self) -> None:
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            # Отмена могла прервать запись: ждем, пока ее ключи вернутся в _dirty
+            with suppress(asyncio.CancelledError):
+                await self._flush_task
+            self._flush_task = None
+        await self.flush()
@@ -1,50 +1,128 @@
 # handlers/admin.py - УПРОЩЕННАЯ ВЕРСИЯ БЕЗ ДЕКОРАТОРА
-import sys
+import html
+import logging
 import os
+import tempfile
 
-# Добавляем корень проекта в путь Python
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-
-from aiogram import Router, types, F
+from aiogram import Bot, Router, types, F
 from aiogram.fsm.context import FSMContext
-from aiogram.filters import Command
-from database import Database
+from aiogram.types import FSInputFile, InlineKeyboardButton
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.filters import Command, CommandObject
+from database import AsyncDatabase
 from keyboards import (
     get_main_keyboard,
     get_workers_keyboard,
+    get_bulk_workers_keyboard,
+    get_task_actions_keyboard,
     get_worker_task_review_keyboard,
-    get_back_to_menu_keyboard
+    get_timeline_keyboard,
+    get_timeline_filter_keyboard,
+    get_back_to_menu_keyboard,
+    workers_keyboard_cache
 )
+from filters import IsAdmin
+from outbox import OutboxDispatcher, make_notification
 from states.admin_states import AdminStates
 from config import Config
-from datetime import datetime
+from utils import fit_cards, format_duration, get_status_emoji, histogram_percentile, truncate_text
+from datetime import datetime, timedelta, timezone
 
 router = Router()
-db = Database()
+logger = logging.getLogger(__name__)
 
 
-# --- Вспомогательная функция для проверки админа ---
-def check_admin(user_id: int) -> bool:
-    """Проверяет, является ли пользователь администратором"""
-    is_admin = Config.is_admin(user_id)
-    print(f"🔍 CHECK ADMIN: user_id={user_id}, is_admin={is_admin}")
-    return is_admin
+# Апдейты не-администраторов до обработчиков этого модуля не доходят
+# (роль определяет RoleMiddleware)
+router.message.filter(IsAdmin())
+router.callback_query.filter(IsAdmin())
 
+# Ответ на попытку воспользоваться функциями администратора без прав,
+# а администратору - на кнопки, которые уже ничего не делают (например,
+# выбор работника после завершения диалога); подключается после router
+denied_router = Router()
 
-# --- Список работников ---
-@router.message(F.text == "👥 Работники")
-async def show_workers(message: types.Message):
-    """Показать список всех работников"""
-    user_id = message.from_user.id
+ADMIN_BUTTONS = ("👥 Работники", "📨 Отправить задание", "✅ Запросы от работников", "📊 Все задания", "🔄 Тест")
+ADMIN_CALLBACK_PREFIXES = (
+    "select_worker:", "workers:", "bulk:", "approve_task:", "reject_task:", "tl:", "tl_filter:", "tl_set:", "tlw:"
+)
+
+
+@denied_router.message(~IsAdmin(), F.text.in_(ADMIN_BUTTONS))
+@denied_router.message(
+    ~IsAdmin(), Command("tasks", "stats", "dbprofile", "import", "export", "addadmin", "removeadmin")
+)
+async def admin_only(message: types.Message):
+    await message.answer("⛔ У вас нет прав администратора!")
+
+
+@denied_router.callback_query(~IsAdmin(), F.data.startswith(ADMIN_CALLBACK_PREFIXES))
+async def admin_only_callback(callback: types.CallbackQuery):
+    await callback.answer("⛔ У вас нет прав администратора!", show_alert=True)
+
+
+@denied_router.callback_query(IsAdmin(), F.data.startswith(ADMIN_CALLBACK_PREFIXES))
+async def stale_admin_callback(callback: types.CallbackQuery):
+    await callback.answer("⌛ Выбор устарел, начните заново из меню.", show_alert=True)
+
+
+# --- Управление администраторами ---
+def parse_user_id(command: CommandObject):
+    """ID пользователя из аргумента команды (None, если аргумент неверный)"""
+    args = (command.args or "").strip()
+    return int(args) if args.isdigit() else None
 
-    # Проверка админа внутри функции
-    if not check_admin(user_id):
-        await message.answer("⛔ У вас нет прав администратора!")
+
+@router.message(Command("addadmin"))
+async def cmd_add_admin(message: types.Message, command: CommandObject, db: AsyncDatabase):
+    """Назначить администратора: /addadmin <ID пользователя>"""
+    target_id = parse_user_id(command)
+    if target_id is None:
+        await message.answer("❌ Формат: /addadmin <ID пользователя>")
+        return
+
+    added = await db.add_admin(target_id, message.from_user.id)
+    target = await db.get_user(target_id)
+    name = target['fio'] if target else target_id
+
+    if added:
+        await message.answer(f"👑 {name} назначен администратором. Меню администратора появится после /start")
+    else:
+        await message.answer(f"ℹ️ {name} уже администратор")
+
+
+@router.message(Command("removeadmin"))
+async def cmd_remove_admin(message: types.Message, command: CommandObject, db: AsyncDatabase):
+    """Снять права администратора: /removeadmin <ID пользователя>"""
+    target_id = parse_user_id(command)
+    if target_id is None:
+        await message.answer("❌ Формат: /removeadmin <ID пользователя>")
+        return
+
+    if target_id == message.from_user.id:
+        await message.answer("❌ Нельзя снять права администратора с самого себя")
+        return
+    if target_id in Config.get_admin_ids():
+        await message.answer("❌ Этот администратор задан в ADMIN_IDS, права снимаются только в настройках")
         return
 
-    print(f"🔍 ADMIN: Кнопка 'Работники' нажата user_id={message.from_user.id}")
+    removed = await db.remove_admin(target_id)
+    target = await db.get_user(target_id)
+    name = target['fio'] if target else target_id
+
+    if removed:
+        await message.answer(f"👷 {name} больше не администратор")
+    else:
+        await message.answer(f"ℹ️ {name} не является администратором")
+
+
+# --- Список работников ---
+@router.message(F.text == "👥 Работники")
+async def show_workers(message: types.Message, db: AsyncDatabase):
+    """Показать список всех работников"""
+    logger.debug("Кнопка 'Работники' нажата user_id=%s", message.from_user.id)
 
-    users = db.get_all_users()
+    users = await db.get_all_users()
 
     if not users:
         await message.answer("📭 В системе еще нет работников.")
@@ -77,47 +155,104 @@ async def show_workers(message: types.Message):
 
 # --- Отправка задания работнику ---
 @router.message(F.text == "📨 Отправить задание")
-async def send_task_to_worker(message: types.Message, state: FSMContext):
+async def send_task_to_worker(message: types.Message, state: FSMContext, db: AsyncDatabase):
     """Начало процесса отправки задания"""
-    user_id = message.from_user.id
-
-    # Проверка админа внутри функции
-    if not check_admin(user_id):
-        await message.answer("⛔ У вас нет прав администратора!")
-        return
-
-    print(f"🔍 ADMIN: Кнопка 'Отправить задание' нажата user_id={message.from_user.id}")
+    logger.debug("Кнопка 'Отправить задание' нажата user_id=%s", message.from_user.id)
 
-    workers = db.get_all_workers()
+    reply_markup, has_workers = await get_worker_picker(db)
 
-    if not workers:
+    if not has_workers:
         await message.answer("📭 В системе нет работников.")
         return
 
     await message.answer(
-        "👷 Выберите работника, которому хотите отправить задание:",
-        reply_markup=get_workers_keyboard(workers)
+        "👷 Выберите работника, которому хотите отправить задание, "
+        "или введите часть ФИО для поиска:",
+        reply_markup=reply_markup
     )
 
     await state.set_state(AdminStates.waiting_for_worker_selection)
 
 
-@router.callback_query(F.data.startswith("select_worker:"), AdminStates.waiting_for_worker_selection)
-async def select_worker(callback: types.CallbackQuery, state: FSMContext):
-    """Обработка выбора работника"""
-    user_id = callback.from_user.id
+BULK_BUTTON = InlineKeyboardButton(text="👥 Выбрать несколько", callback_data="bulk:start:0")
 
-    # Проверка админа внутри функции
-    if not check_admin(user_id):
-        await callback.answer("⛔ У вас нет прав администратора!", show_alert=True)
-        return
 
-    print(f"🔍 ADMIN CALLBACK: select_worker вызван, data={callback.data}")
+async def get_worker_picker(db: AsyncDatabase, anchor_id: int = None, direction: str = 'next') -> tuple:
+    """Клавиатура выбора работника для задания (страница списка) и есть ли на странице работники"""
+    if anchor_id is not None:
+        workers, has_prev, has_next = await db.get_workers_page(Config.WORKERS_PAGE_SIZE, anchor_id, direction)
+        return get_workers_keyboard(workers, has_prev, has_next, extra_buttons=(BULK_BUTTON,)), bool(workers)
+
+    # Первая страница строится заново только после изменения списка пользователей
+    # Нумерация версий у каждого экземпляра Database своя (с нуля), поэтому
+    # в ключе и сам экземпляр: другая БД в том же процессе не получит чужую клавиатуру
+    roster_version = (db.db, db.roster_version)
+    picker = workers_keyboard_cache.get(roster_version)
+    if picker is None:
+        workers, has_prev, has_next = await db.get_workers_page(Config.WORKERS_PAGE_SIZE)
+        picker = workers_keyboard_cache.set(
+            roster_version, (get_workers_keyboard(workers, has_prev, has_next, extra_buttons=(BULK_BUTTON,)), bool(workers))
+        )
+    return picker
+
+
+@router.callback_query(F.data.startswith("workers:"), AdminStates.waiting_for_worker_selection)
+async def page_workers(callback: types.CallbackQuery, db: AsyncDatabase):
+    """Листание списка работников"""
+    _, direction, anchor_id = callback.data.split(":")
+
+    if direction == 'first':
+        reply_markup, _ = await get_worker_picker(db)
+    else:
+        reply_markup, _ = await get_worker_picker(db, int(anchor_id), direction)
+
+    await callback.message.edit_text(
+        "👷 Выберите работника, которому хотите отправить задание, "
+        "или введите часть ФИО для поиска:",
+        reply_markup=reply_markup
+    )
+    await callback.answer()
+
+
+@router.message(
+    AdminStates.waiting_for_worker_selection,
+    F.text,
+    ~F.text.startswith("/"),
+    ~F.text.in_(ADMIN_BUTTONS)
+)
+async def search_worker(message: types.Message, db: AsyncDatabase):
+    """Поиск работника по части ФИО"""
+    query = message.text.strip()
+    limit = Config.WORKERS_PAGE_SIZE
+    # Лишняя строка только показывает, что найдены не все
+    workers = await db.search_workers(query, limit + 1)
+    has_more = len(workers) > limit
+    workers = workers[:limit]
+
+    back_button = InlineKeyboardButton(text="📋 Весь список", callback_data="workers:first:0")
+    reply_markup = get_workers_keyboard(workers, extra_buttons=(back_button,))
+
+    # Сообщение уходит с parse_mode=HTML: текст администратора экранируем
+    shown_query = html.escape(query)
+    if not workers:
+        text = f"😕 По запросу «{shown_query}» никого не найдено. Введите другую часть ФИО:"
+    elif has_more:
+        text = f"🔎 По «{shown_query}» найдено больше {limit}, показаны первые. Выберите или уточните запрос:"
+    else:
+        text = f"🔎 Найдено по «{shown_query}»: {len(workers)}. Выберите работника:"
+
+    await message.answer(text, reply_markup=reply_markup)
+
+
+@router.callback_query(F.data.startswith("select_worker:"), AdminStates.waiting_for_worker_selection)
+async def select_worker(callback: types.CallbackQuery, state: FSMContext, db: AsyncDatabase):
+    """Обработка выбора работника"""
+    logger.debug("select_worker вызван, data=%s", callback.data)
 
     worker_id = int(callback.data.split(":")[1])
 
     # Получаем информацию о работнике
-    worker = db.get_user(worker_id)
+    worker = await db.get_user(worker_id)
     if not worker:
         await callback.answer("❌ Работник не найден")
         return
@@ -129,7 +264,7 @@ async def select_worker(callback: types.CallbackQuery, state: FSMContext):
     await state.set_state(AdminStates.waiting_for_task_text)
 
     await callback.message.edit_text(
-        f"👷 Выбран работник: {worker_fio}\n\n"
+        f"👷 Выбран работник: {html.escape(worker_fio)}\n\n"
         f"✏️ Теперь введите текст задания:",
         reply_markup=None
     )
@@ -137,16 +272,24 @@ async def select_worker(callback: types.CallbackQuery, state: FSMContext):
     await callback.answer()
 
 
-@router.message(AdminStates.waiting_for_task_text)
-async def process_admin_task_text(message: types.Message, state: FSMContext):
-    """Обработка текста задания от администратора"""
-    user_id = message.from_user.id
+def render_task_notification(task_id: int, task_text: str, admin_fio: str) -> str:
+    """Текст уведомления работнику о новом задании"""
+    # Уведомление уходит с parse_mode=HTML: тексты и ФИО пользователей экранируем
+    return f"""
+📋 **Новое задание от администратора!**
+──────────────
+{html.escape(task_text)}
+──────────────
+📅 **Отправлено:** {datetime.now().strftime('%H:%M %d.%m.%Y')}
+👑 **От:** {html.escape(admin_fio)}
+🆔 **ID задания:** #{task_id}
+    """
 
-    # Проверка админа внутри функции
-    if not check_admin(user_id):
-        await message.answer("⛔ У вас нет прав администратора!")
-        return
 
+@router.message(AdminStates.waiting_for_task_text)
+async def process_admin_task_text(message: types.Message, state: FSMContext, db: AsyncDatabase,
+                                  outbox: OutboxDispatcher, user=None):
+    """Обработка текста задания от администратора"""
     task_text = message.text.strip()
     data = await state.get_data()
     worker_id = data.get('worker_id')
@@ -157,75 +300,221 @@ async def process_admin_task_text(message: types.Message, state: FSMContext):
         await message.answer("❌ Текст задания слишком короткий. Введите подробнее:")
         return
 
-    # Сохраняем задание в БД
-    task_id = db.add_admin_task(admin_id, worker_id, task_text)
+    # Профиль администратора передает RoleMiddleware
+    admin_fio = user['fio'] if user else "Администратор"
 
-    # Получаем информацию об администраторе
-    admin_user = db.get_user(admin_id)
-    admin_fio = admin_user[2] if admin_user else "Администратор"
+    def notify(task_id):
+        # Задание работнику с кнопками действий
+        task_message = render_task_notification(task_id, task_text, admin_fio)
+        return [make_notification(worker_id, task_message, get_task_actions_keyboard(task_id))]
 
-    # Отправляем задание работнику
-    task_message = f"""
-📋 **Новое задание от администратора!**
-──────────────
-{task_text}
-──────────────
-📅 **Отправлено:** {datetime.now().strftime('%H:%M %d.%m.%Y')}
-👑 **От:** {admin_fio}
-🆔 **ID задания:** #{task_id}
-    """
+    # Сохраняем задание в БД, отправка работнику - через очередь уведомлений
+    task_id = await db.add_admin_task(admin_id, worker_id, task_text, notify=notify)
+    outbox.wake()
 
-    try:
-        await message.bot.send_message(
-            worker_id,
-            task_message,
-            reply_markup=types.InlineKeyboardMarkup(
-                inline_keyboard=[
-                    [
-                        types.InlineKeyboardButton(
-                            text="✅ ПРИНЯТЬ",
-                            callback_data=f"accept_task:{task_id}"
-                        )
-                    ],
-                    [
-                        types.InlineKeyboardButton(
-                            text="📝 КОММЕНТАРИЙ",
-                            callback_data=f"comment_task:{task_id}"
-                        )
-                    ]
-                ]
-            )
-        )
+    await message.answer(
+        f"✅ Задание #{task_id} создано и отправляется работнику {html.escape(worker_fio)}",
+        reply_markup=get_main_keyboard('admin')
+    )
 
-        await message.answer(
-            f"✅ Задание #{task_id} отправлено работнику {worker_fio}",
-            reply_markup=get_main_keyboard('admin')
+    await state.clear()
+
+
+# --- Одно задание нескольким работникам ---
+@router.callback_query(F.data.startswith("bulk:"), AdminStates.waiting_for_worker_selection)
+async def bulk_select_workers(callback: types.CallbackQuery, state: FSMContext, db: AsyncDatabase):
+    """Отметка нескольких работников (или всех) для одного задания"""
+    _, action, *args = callback.data.split(":")
+    data = await state.get_data()
+    selected = set(data.get('bulk_ids', []))
+    select_all = data.get('bulk_all', False)
+    anchor_id, direction = None, 'next'
+
+    if action == 'start':
+        selected, select_all = set(), False
+    elif action == 'toggle':
+        worker_id, anchor_id, direction = int(args[0]), int(args[1]), 'at'
+        if select_all:
+            # Снимаем отметку с одного из «всех» - дальше работаем со списком
+            selected, select_all = set(await db.get_all_worker_ids()), False
+        selected ^= {worker_id}
+    elif action == 'all':
+        select_all, selected = not select_all, set()
+        anchor_id, direction = int(args[0]), 'at'
+    elif action in ('next', 'prev'):
+        anchor_id, direction = int(args[0]), action
+    elif action == 'done':
+        if not select_all and not selected:
+            await callback.answer("Отметьте хотя бы одного работника", show_alert=True)
+            return
+
+        count = "все работники" if select_all else len(selected)
+        await state.set_state(AdminStates.waiting_for_bulk_task_text)
+        await callback.message.edit_text(
+            f"👥 Получатели: {count}\n\n✏️ Теперь введите текст задания:",
+            reply_markup=None
         )
-    except Exception as e:
-        await message.answer(
-            f"❌ Не удалось отправить задание работнику {worker_fio}. "
-            f"Возможно, он не начал диалог с ботом.\n\n"
-            f"Ошибка: {str(e)}",
-            reply_markup=get_main_keyboard('admin')
+        await callback.answer()
+        return
+
+    await state.update_data(bulk_ids=sorted(selected), bulk_all=select_all)
+
+    workers, has_prev, has_next = await db.get_workers_page(Config.WORKERS_PAGE_SIZE, anchor_id or None, direction)
+    await callback.message.edit_text(
+        "👥 Отметьте работников и нажмите «Готово»:",
+        reply_markup=get_bulk_workers_keyboard(workers, selected, select_all, has_prev, has_next)
+    )
+    await callback.answer()
+
+
+@router.message(AdminStates.waiting_for_bulk_task_text)
+async def process_bulk_task_text(message: types.Message, state: FSMContext, db: AsyncDatabase,
+                                 outbox: OutboxDispatcher, bot: Bot, user=None):
+    """Создание задания для отмеченных работников и отправка с итоговым отчетом"""
+    task_text = message.text.strip()
+    if len(task_text) < 5:
+        await message.answer("❌ Текст задания слишком короткий. Введите подробнее:")
+        return
+
+    data = await state.get_data()
+    worker_ids = await db.get_all_worker_ids() if data.get('bulk_all') else data.get('bulk_ids', [])
+    await state.clear()
+
+    if not worker_ids:
+        await message.answer("📭 В системе нет работников.", reply_markup=get_main_keyboard('admin'))
+        return
+
+    admin_fio = user['fio'] if user else "Администратор"
+
+    def notify(task_id, worker_id, task_text):
+        task_message = render_task_notification(task_id, task_text, admin_fio)
+        return [make_notification(worker_id, task_message, get_task_actions_keyboard(task_id))]
+
+    # Все задания и уведомления - одной транзакцией; уведомления отправляем
+    # сами, сразу, а фоновая очередь подхватит только то, что не ушло
+    tasks, notifications = await db.add_admin_tasks_bulk(
+        message.from_user.id, worker_ids, task_text, notify=notify, hold=outbox.CLAIM_SECONDS
+    )
+    await message.answer(
+        f"⏳ Создано заданий: {len(tasks)}. Отправляю работникам...",
+        reply_markup=get_main_keyboard('admin')
+    )
+
+    results = await outbox.deliver(bot, notifications)
+    failed = [result for result in results if not result.ok]
+
+    report = f"📬 Задание «{truncate_text(task_text, 50)}»: доставлено {len(results) - len(failed)} из {len(results)}."
+    if failed:
+        names = []
+        for result in failed[:10]:
+            worker = await db.get_user(result.chat_id)
+            names.append(worker['fio'] if worker else str(result.chat_id))
+        if len(failed) > 10:
+            names.append(f"и еще {len(failed) - 10}")
+        report += f"\n❌ Не доставлено: {', '.join(names)}"
+        if not all(result.permanent for result in failed):
+            report += "\n🔁 Повторная отправка - автоматически."
+
+    await message.answer(report)
+
+
+# --- Импорт работников и заданий из файла ---
+IMPORT_HELP = """
+📥 **Импорт из CSV или XLSX**
+──────────────
+Первая строка файла - заголовки столбцов.
+
+👷 **Работники:** user_id (Telegram ID), fio, username (необязательно)
+📋 **Задания:** user_id работника, task_text
+
+Отправьте файл документом или нажмите «🏠 Главное меню» для отмены.
+"""
+
+
+@router.message(Command("import"))
+async def cmd_import(message: types.Message, state: FSMContext):
+    """Начало импорта: ждем файл"""
+    await state.set_state(AdminStates.waiting_for_import_file)
+    await message.answer(IMPORT_HELP, reply_markup=get_back_to_menu_keyboard())
+
+
+def render_import_report(filename: str, report) -> str:
+    """Отчет об импорте; имя файла и значения ячеек в ошибках экранируются (parse_mode=HTML)"""
+    title = "👷 Работников" if report.kind == 'workers' else "📋 Заданий"
+    text = (
+        f"📥 **Импорт «{html.escape(filename)}» завершен**\n"
+        f"Строк в файле: {report.total}\n"
+        f"{title} записано: {report.imported}\n"
+        f"Ошибок: {report.errors}"
+    )
+    if report.first_errors:
+        text += "\n──────────────\n" + "\n".join(
+            html.escape(truncate_text(error, 200)) for error in report.first_errors
         )
+        if report.errors > len(report.first_errors):
+            text += "\n…полный список - в файле"
+    return text
+
+
+@router.message(AdminStates.waiting_for_import_file, F.document)
+async def process_import_file(message: types.Message, state: FSMContext, db: AsyncDatabase,
+                              outbox: OutboxDispatcher, bot: Bot, user=None):
+    """Загрузка файла, построчная проверка и запись пачками с отчетом об ошибках"""
+    # Импорт и выгрузка нужны редко - их модули не загружаются при старте
+    from importer import SUPPORTED_EXTENSIONS, ImportFileError, import_file
+
+    document = message.document
+    filename = document.file_name or "import.csv"
+
+    if not filename.lower().endswith(SUPPORTED_EXTENSIONS):
+        await message.answer("❌ Поддерживаются файлы .csv и .xlsx")
+        return
+    if document.file_size and document.file_size > Config.IMPORT_MAX_FILE_SIZE:
+        await message.answer(f"❌ Файл больше {Config.IMPORT_MAX_FILE_SIZE // (1024 * 1024)} МБ.")
+        return
 
     await state.clear()
+    await message.answer("⏳ Загружаю и проверяю файл...", reply_markup=get_main_keyboard('admin'))
+
+    admin_fio = user['fio'] if user else "Администратор"
+
+    def notify(task_id, worker_id, task_text):
+        task_message = render_task_notification(task_id, task_text, admin_fio)
+        return [make_notification(worker_id, task_message, get_task_actions_keyboard(task_id))]
+
+    # Файл скачивается на диск и читается оттуда построчно, целиком в память не попадает
+    with tempfile.TemporaryDirectory(prefix="import_") as directory:
+        path = os.path.join(directory, "upload" + os.path.splitext(filename)[1].lower())
+        try:
+            await bot.download(document, destination=path)
+            report = await import_file(db, path, filename, message.from_user.id, notify=notify)
+        except ImportFileError as e:
+            await message.answer(f"❌ {html.escape(str(e))}")
+            return
+        except Exception as e:
+            # Пачки до ошибки уже записаны - админ должен об этом узнать
+            logger.exception("Ошибка импорта файла %s", filename)
+            await message.answer(
+                f"❌ Импорт прерван из-за ошибки: {html.escape(str(e))}\n"
+                f"Строки до нее могли быть уже записаны - проверьте результат перед повторной загрузкой."
+            )
+            return
+        finally:
+            outbox.wake()
+
+        await message.answer(render_import_report(filename, report))
+
+        if report.errors_path:
+            await message.answer_document(FSInputFile(report.errors_path, filename="import_errors.csv"))
 
 
 # --- Запросы от работников ---
 @router.message(F.text == "✅ Запросы от работников")
-async def show_worker_requests_admin(message: types.Message):
+async def show_worker_requests_admin(message: types.Message, db: AsyncDatabase):
     """Показать задания от работников на рассмотрении"""
-    user_id = message.from_user.id
-
-    # Проверка админа внутри функции
-    if not check_admin(user_id):
-        await message.answer("⛔ У вас нет прав администратора!")
-        return
-
-    print(f"🔍 ADMIN: Кнопка 'Запросы от работников' нажата")
+    logger.debug("Кнопка 'Запросы от работников' нажата")
 
-    tasks = db.get_pending_worker_tasks()
+    tasks = await db.get_pending_worker_tasks()
 
     if not tasks:
         await message.answer("📭 Нет заданий от работников на рассмотрении.")
@@ -242,8 +531,8 @@ async def show_worker_requests_admin(message: types.Message):
         task_message = f"""
 📋 **Запрос #{task_id}**
 ──────────────
-**От:** {worker_fio}
-**Задание:** {task_text}
+**От:** {html.escape(worker_fio)}
+**Задание:** {html.escape(task_text)}
 **Время:** {created_at}
         """
 
@@ -255,31 +544,14 @@ async def show_worker_requests_admin(message: types.Message):
 
 # --- Одобрение задания от работника ---
 @router.callback_query(F.data.startswith("approve_task:"))
-async def approve_worker_task(callback: types.CallbackQuery):
+async def approve_worker_task(callback: types.CallbackQuery, db: AsyncDatabase, outbox: OutboxDispatcher):
     """Одобрение задания от работника"""
-    user_id = callback.from_user.id
-
-    # Проверка админа внутри функции
-    if not check_admin(user_id):
-        await callback.answer("⛔ У вас нет прав администратора!", show_alert=True)
-        return
-
     task_id = int(callback.data.split(":")[1])
     admin_id = callback.from_user.id
 
-    # Обновляем статус задания
-    db.update_worker_task_status(task_id, "approved", admin_id)
-
     # Получаем информацию о задании
-    cursor = db.conn.cursor()
-    cursor.execute('''
-    SELECT wt.*, u.user_id as worker_id, u.fio as worker_fio
-    FROM worker_tasks wt
-    JOIN users u ON wt.from_worker_id = u.user_id
-    WHERE wt.task_id = ?
-    ''', (task_id,))
-
-    task = cursor.fetchone()
+    task = await db.get_worker_task_details(task_id)
+    notifications = []
 
     if task:
         worker_id = task['worker_id']
@@ -290,15 +562,15 @@ async def approve_worker_task(callback: types.CallbackQuery):
         notification = f"""
 ✅ **Ваш запрос одобрен!**
 ──────────────
-**Задание:** {task_text}
+**Задание:** {html.escape(task_text)}
 **ID запроса:** #{task_id}
 **Время:** {datetime.now().strftime('%H:%M %d.%m.%Y')}
         """
+        notifications.append(make_notification(worker_id, notification))
 
-        try:
-            await callback.message.bot.send_message(worker_id, notification)
-        except:
-            pass  # Если работник заблокировал бота
+    # Обновляем статус задания вместе с уведомлением работнику
+    await db.update_worker_task_status(task_id, "approved", admin_id, notifications=notifications)
+    outbox.wake()
 
     await callback.answer("✅ Задание одобрено!")
     await callback.message.edit_text(
@@ -311,13 +583,6 @@ async def approve_worker_task(callback: types.CallbackQuery):
 @router.callback_query(F.data.startswith("reject_task:"))
 async def reject_worker_task(callback: types.CallbackQuery, state: FSMContext):
     """Начало процесса отклонения задания"""
-    user_id = callback.from_user.id
-
-    # Проверка админа внутри функции
-    if not check_admin(user_id):
-        await callback.answer("⛔ У вас нет прав администратора!", show_alert=True)
-        return
-
     task_id = int(callback.data.split(":")[1])
 
     # Сохраняем task_id в состоянии
@@ -333,15 +598,9 @@ async def reject_worker_task(callback: types.CallbackQuery, state: FSMContext):
 
 
 @router.message(AdminStates.waiting_for_comment_review)
-async def process_rejection_comment(message: types.Message, state: FSMContext):
+async def process_rejection_comment(message: types.Message, state: FSMContext, db: AsyncDatabase,
+                                    outbox: OutboxDispatcher):
     """Обработка комментария при отклонении задания"""
-    user_id = message.from_user.id
-
-    # Проверка админа внутри функции
-    if not check_admin(user_id):
-        await message.answer("⛔ У вас нет прав администратора!")
-        return
-
     comment = message.text.strip()
     data = await state.get_data()
     task_id = data.get('task_id')
@@ -352,19 +611,9 @@ async def process_rejection_comment(message: types.Message, state: FSMContext):
         await state.clear()
         return
 
-    # Обновляем статус задания с комментарием
-    db.update_worker_task_status(task_id, "rejected", admin_id, comment)
-
     # Получаем информацию о задании
-    cursor = db.conn.cursor()
-    cursor.execute('''
-    SELECT wt.*, u.user_id as worker_id, u.fio as worker_fio
-    FROM worker_tasks wt
-    JOIN users u ON wt.from_worker_id = u.user_id
-    WHERE wt.task_id = ?
-    ''', (task_id,))
-
-    task = cursor.fetchone()
+    task = await db.get_worker_task_details(task_id)
+    notifications = []
 
     if task:
         worker_id = task['worker_id']
@@ -375,16 +624,16 @@ async def process_rejection_comment(message: types.Message, state: FSMContext):
         notification = f"""
 ❌ **Ваш запрос отклонен**
 ──────────────
-**Задание:** {task_text}
+**Задание:** {html.escape(task_text)}
 **ID запроса:** #{task_id}
-**Причина:** {comment}
+**Причина:** {html.escape(comment)}
 **Время:** {datetime.now().strftime('%H:%M %d.%m.%Y')}
         """
+        notifications.append(make_notification(worker_id, notification))
 
-        try:
-            await message.bot.send_message(worker_id, notification)
-        except:
-            pass  # Если работник заблокировал бота
+    # Обновляем статус задания с комментарием вместе с уведомлением работнику
+    await db.update_worker_task_status(task_id, "rejected", admin_id, comment, notifications=notifications)
+    outbox.wake()
 
     await message.answer(
         f"❌ Запрос #{task_id} отклонен с комментарием.",
@@ -394,74 +643,411 @@ async def process_rejection_comment(message: types.Message, state: FSMContext):
     await state.clear()
 
 
-# --- Просмотр всех заданий ---
+# --- Лента всех заданий ---
+TIMELINE_STATUSES = [
+    ('all', 'Все статусы'),
+    ('pending', '⏳ Ожидают'),
+    ('accepted', '✅ Приняты'),
+    ('commented', '📝 С комментарием'),
+    ('completed', '✅ Выполнены'),
+    ('approved', '✅ Одобрены'),
+    ('rejected', '❌ Отклонены'),
+]
+TIMELINE_PERIODS = [
+    ('all', 'За все время'),
+    ('today', 'Сегодня'),
+    ('7d', '7 дней'),
+    ('30d', '30 дней'),
+]
+TIMELINE_DAYS = {'today': 0, '7d': 7, '30d': 30}
+TIMELINE_DATE_FORMAT = '%Y-%m-%d %H:%M:%S'  # как CURRENT_TIMESTAMP в SQLite (UTC)
+
+
+def to_db_time(moment: datetime) -> str:
+    """Локальное время бота (наивное - как datetime.now()) в формате created_at, в UTC"""
+    return moment.astimezone(timezone.utc).strftime(TIMELINE_DATE_FORMAT)
+
+
+def from_db_time(value: str) -> datetime:
+    """created_at из БД (UTC) в локальное время бота"""
+    return datetime.strptime(value, TIMELINE_DATE_FORMAT).replace(tzinfo=timezone.utc).astimezone()
+
+
+def parse_date(text: str) -> datetime:
+    """Дата в формате ДД.ММ.ГГГГ или ГГГГ-ММ-ДД"""
+    for date_format in ('%d.%m.%Y', '%Y-%m-%d'):
+        try:
+            return datetime.strptime(text, date_format)
+        except ValueError:
+            pass
+    raise ValueError(f"Неверная дата: {text}")
+
+
+def get_timeline_query(filters: dict) -> dict:
+    """Фильтры ленты из FSM в параметры Database.get_timeline_page.
+
+    Границы дней - по локальному времени бота (и для «Сегодня», и для
+    дат, введенных админом), в запрос они уходят в UTC.
+    """
+    query = {'status': filters.get('status'), 'worker_id': filters.get('worker_id')}
+
+    period = filters.get('period')
+    if period in TIMELINE_DAYS:
+        start = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        query['date_from'] = to_db_time(start - timedelta(days=TIMELINE_DAYS[period]))
+    elif period == 'custom':
+        # В FSM - локальные границы периода, как их ввел админ
+        query['date_from'] = to_db_time(datetime.strptime(filters['date_from'], TIMELINE_DATE_FORMAT))
+        query['date_to'] = to_db_time(datetime.strptime(filters['date_to'], TIMELINE_DATE_FORMAT))
+    return query
+
+
+def get_timeline_labels(filters: dict) -> dict:
+    """Подписи текущих фильтров для кнопок"""
+    period = filters.get('period')
+    if period == 'custom':
+        period_label = f"{filters['date_from'][:10]} — {filters['date_to'][:10]}"
+    else:
+        period_label = dict(TIMELINE_PERIODS).get(period, 'За все время')
+
+    return {
+        'status': dict(TIMELINE_STATUSES).get(filters.get('status'), 'Все статусы'),
+        'period': period_label,
+        'worker': filters.get('worker_fio') or 'Все работники',
+    }
+
+
+def render_timeline_card(entry) -> str:
+    """Карточка записи ленты: задание администратора или запрос работника"""
+    status_emoji = get_status_emoji(entry['status'])
+    # Сообщение уходит с parse_mode=HTML: тексты и ФИО пользователей экранируем
+    task_text = html.escape(truncate_text(entry['task_text'], 200))
+    admin_fio = html.escape(str(entry['admin_fio']))
+    worker_fio = html.escape(str(entry['worker_fio']))
+
+    if entry['kind'] == 'a':
+        title = f"{status_emoji} **Задание #{entry['task_id']}**"
+        route = f"👑 {admin_fio} → 👷 {worker_fio}"
+    else:
+        title = f"{status_emoji} **Запрос #{entry['task_id']}**"
+        route = f"👷 {worker_fio}"
+        if entry['admin_fio']:
+            route += f" → 👑 {admin_fio}"
+
+    created_at = from_db_time(entry['created_at']).strftime('%d.%m.%Y %H:%M')
+    return (
+        f"{title}\n"
+        f"   {route}\n"
+        f"   {task_text}\n"
+        f"   Статус: {entry['status']} · {created_at}"
+    )
+
+
+async def get_timeline_page(db: AsyncDatabase, filters: dict, anchor: tuple = None, direction: str = 'next'):
+    """Текст и клавиатура страницы ленты заданий"""
+    entries, has_newer, has_older = await db.get_timeline_page(
+        Config.TIMELINE_PAGE_SIZE, anchor, direction, **get_timeline_query(filters)
+    )
+    labels = get_timeline_labels(filters)
+
+    if not entries:
+        text = "📭 Нет заданий по выбранным фильтрам."
+        return text, get_timeline_keyboard(entries, False, False, labels)
+
+    header = "📊 **Все задания** (задания администраторов и запросы работников)\n\n"
+    cards = [render_timeline_card(entry) for entry in entries]
+
+    # Страница режется только по границе карточек: не поместившиеся
+    # записи остаются для следующей страницы
+    from_end = direction == 'prev'
+    count = fit_cards(cards, header, from_end=from_end)
+    if count < len(entries):
+        if from_end:
+            entries, cards, has_newer = entries[-count:], cards[-count:], True
+        else:
+            entries, cards, has_older = entries[:count], cards[:count], True
+
+    text = header + "\n\n".join(cards)
+    return text, get_timeline_keyboard(entries, has_newer, has_older, labels)
+
+
+async def edit_timeline_message(callback: types.CallbackQuery, text: str, reply_markup):
+    try:
+        await callback.message.edit_text(text, reply_markup=reply_markup)
+    except TelegramBadRequest as e:
+        # Повторное нажатие той же кнопки - сообщение не изменилось; остальные ошибки не глотаем
+        if 'message is not modified' not in e.message:
+            raise
+        logger.debug("Лента не обновлена: %s", e)
+
+
 @router.message(F.text == "📊 Все задания")
-async def show_all_tasks(message: types.Message):
-    """Показать все задания в системе"""
-    user_id = message.from_user.id
+@router.message(Command("tasks"))
+async def show_all_tasks(message: types.Message, state: FSMContext, db: AsyncDatabase,
+                         command: CommandObject = None):
+    """Показать ленту всех заданий (первая страница с текущими фильтрами).
 
-    # Проверка админа внутри функции
-    if not check_admin(user_id):
-        await message.answer("⛔ У вас нет прав администратора!")
-        return
+    /tasks ДД.ММ.ГГГГ [ДД.ММ.ГГГГ] - задания за период.
+    """
+    logger.debug("Лента заданий запрошена user_id=%s", message.from_user.id)
 
-    print(f"🔍 ADMIN: Кнопка 'Все задания' нажата")
+    data = await state.get_data()
+    filters = data.get('timeline', {})
 
-    cursor = db.conn.cursor()
+    if command and command.args:
+        dates = command.args.split()
+        try:
+            date_from = parse_date(dates[0])
+            date_to = parse_date(dates[1]) if len(dates) > 1 else date_from
+        except ValueError:
+            await message.answer("❌ Формат: /tasks ДД.ММ.ГГГГ [ДД.ММ.ГГГГ]")
+            return
+
+        filters = dict(
+            filters,
+            period='custom',
+            date_from=date_from.strftime(TIMELINE_DATE_FORMAT),
+            date_to=(date_to + timedelta(days=1)).strftime(TIMELINE_DATE_FORMAT)
+        )
+        await state.update_data(timeline=filters)
 
-    # Задания от администраторов
-    cursor.execute('''
-    SELECT at.*, 
-           admin_user.fio as admin_fio,
-           worker_user.fio as worker_fio
-    FROM admin_tasks at
-    JOIN users admin_user ON at.from_admin_id = admin_user.user_id
-    JOIN users worker_user ON at.to_worker_id = worker_user.user_id
-    ORDER BY at.created_at DESC
-    LIMIT 20
-    ''')
+    text, reply_markup = await get_timeline_page(db, filters)
+    await message.answer(text, reply_markup=reply_markup)
 
-    admin_tasks = cursor.fetchall()
 
-    if not admin_tasks:
-        await message.answer("📭 В системе пока нет заданий.")
-        return
+@router.callback_query(F.data.startswith("tl:"))
+async def page_all_tasks(callback: types.CallbackQuery, state: FSMContext, db: AsyncDatabase):
+    """Листание ленты заданий с редактированием сообщения"""
+    _, direction, kind, task_id = callback.data.split(":")
+    data = await state.get_data()
+
+    text, reply_markup = await get_timeline_page(
+        db, data.get('timeline', {}), (kind, int(task_id)), direction
+    )
+    await edit_timeline_message(callback, text, reply_markup)
+    await callback.answer()
 
-    response = "📊 **Последние 20 заданий:**\n\n"
 
-    for task in admin_tasks:
-        task_id = task['task_id']
-        task_text = task['task_text']
-        status = task['status']
-        created_at = task['created_at']
-        admin_fio = task['admin_fio']
-        worker_fio = task['worker_fio']
+@router.callback_query(F.data.startswith("tl_filter:"))
+async def choose_timeline_filter(callback: types.CallbackQuery, db: AsyncDatabase):
+    """Выбор значения фильтра ленты"""
+    field = callback.data.split(":")[1]
+
+    if field == 'worker':
+        reply_markup = await get_timeline_worker_picker(db)
+    else:
+        options = TIMELINE_STATUSES if field == 'status' else TIMELINE_PERIODS
+        reply_markup = get_timeline_filter_keyboard(field, options)
+
+    await callback.message.edit_reply_markup(reply_markup=reply_markup)
+    await callback.answer()
+
+
+async def get_timeline_worker_picker(db: AsyncDatabase, anchor_id: int = None, direction: str = 'next'):
+    """Страница выбора работника для фильтра ленты"""
+    workers, has_prev, has_next = await db.get_workers_page(Config.WORKERS_PAGE_SIZE, anchor_id, direction)
+    return get_workers_keyboard(
+        workers, has_prev, has_next,
+        select_prefix="tl_set:worker",
+        page_prefix="tlw",
+        extra_buttons=(
+            InlineKeyboardButton(text="Все работники", callback_data="tl_set:worker:all"),
+            InlineKeyboardButton(text="⬅️ Назад", callback_data="tl_set:back:-")
+        )
+    )
+
 
-        status_emoji = {
-            'pending': '⏳',
-            'accepted': '✅',
-            'completed': '✅',
-            'commented': '📝'
-        }.get(status, '❓')
+@router.callback_query(F.data.startswith("tlw:"))
+async def page_timeline_workers(callback: types.CallbackQuery, db: AsyncDatabase):
+    """Листание работников в фильтре ленты"""
+    _, direction, anchor_id = callback.data.split(":")
 
-        # Обрезаем длинный текст
-        if len(task_text) > 100:
-            task_text_short = task_text[:100] + "..."
+    reply_markup = await get_timeline_worker_picker(db, int(anchor_id), direction)
+    await callback.message.edit_reply_markup(reply_markup=reply_markup)
+    await callback.answer()
+
+
+@router.callback_query(F.data.startswith("tl_set:"))
+async def set_timeline_filter(callback: types.CallbackQuery, state: FSMContext, db: AsyncDatabase):
+    """Применяем фильтр ленты и показываем первую страницу"""
+    _, field, value = callback.data.split(":")
+    data = await state.get_data()
+    filters = dict(data.get('timeline', {}))
+
+    if field == 'reset':
+        filters = {}
+    elif field == 'status':
+        filters['status'] = None if value == 'all' else value
+    elif field == 'period':
+        filters.update(period=None if value == 'all' else value, date_from=None, date_to=None)
+    elif field == 'worker':
+        worker = await db.get_user(int(value)) if value != 'all' else None
+        filters.update(worker_id=worker[0] if worker else None, worker_fio=worker[2] if worker else None)
+
+    if field != 'back':
+        await state.update_data(timeline=filters)
+
+    text, reply_markup = await get_timeline_page(db, filters)
+    await edit_timeline_message(callback, text, reply_markup)
+    await callback.answer()
+
+
+# --- Выгрузка заданий в файл ---
+EXPORT_STATUSES = [value for value, _ in TIMELINE_STATUSES if value != 'all']
+EXPORT_USAGE = "❌ Формат: /export [xlsx] [статус] [ДД.ММ.ГГГГ [ДД.ММ.ГГГГ]]"
+
+
+@router.message(Command("export"))
+async def cmd_export(message: types.Message, state: FSMContext, db: AsyncDatabase,
+                     command: CommandObject):
+    """Выгрузка заданий файлом: CSV (gzip) или XLSX.
+
+    /export [xlsx] [статус] [ДД.ММ.ГГГГ [ДД.ММ.ГГГГ]]; что не указано -
+    берется из текущих фильтров ленты «Все задания».
+    """
+    from exporter import EXPORT_FORMATS, ExportError, export_tasks
+
+    data = await state.get_data()
+    query = get_timeline_query(data.get('timeline', {}))
+    export_format, dates = 'csv', []
+
+    for arg in (command.args or '').lower().split():
+        if arg in EXPORT_FORMATS:
+            export_format = arg
+        elif arg in EXPORT_STATUSES:
+            query['status'] = arg
         else:
-            task_text_short = task_text
+            try:
+                dates.append(parse_date(arg))
+            except ValueError:
+                await message.answer(EXPORT_USAGE)
+                return
+
+    if len(dates) > 2:
+        await message.answer(EXPORT_USAGE)
+        return
+    if dates:
+        query['date_from'] = to_db_time(dates[0])
+        query['date_to'] = to_db_time(dates[-1] + timedelta(days=1))
 
-        response += f"{status_emoji} **Задание #{task_id}**\n"
-        response += f"   От: {admin_fio} → Для: {worker_fio}\n"
-        response += f"   Статус: {status}\n"
-        response += f"   Текст: {task_text_short}\n"
-        response += f"   Дата: {created_at}\n\n"
+    await message.answer("⏳ Готовлю выгрузку...")
 
-    await message.answer(response[:4000])  # Ограничение Telegram
+    filename = f"tasks_{datetime.now().strftime('%Y%m%d_%H%M')}." + ('xlsx' if export_format == 'xlsx' else 'csv.gz')
+    with tempfile.TemporaryDirectory(prefix="export_") as directory:
+        path = os.path.join(directory, filename)
+        try:
+            count = await export_tasks(db, path, export_format, **query)
+        except ExportError as e:
+            await message.answer(f"❌ {e}")
+            return
+
+        if not count:
+            await message.answer("📭 Нет заданий по выбранным фильтрам.")
+            return
+        await message.answer_document(FSInputFile(path, filename=filename), caption=f"📤 Выгружено записей: {count}")
+
+
+# --- Статистика ---
+def format_share(part: int, total: int) -> str:
+    return f"{part * 100 // total}%" if total else "—"
+
+
+def render_stats(stats: dict) -> str:
+    """Текст /stats по сводным счетчикам (см. Database.get_stats)"""
+    counters = stats['counters']
+
+    def count(kind, status):
+        return counters.get((kind, status), 0)
+
+    def total(kind):
+        return sum(value for (counter_kind, _), value in counters.items() if counter_kind == kind)
+
+    accepted, commented = count('a', 'accepted'), count('a', 'commented')
+    approved, rejected = count('w', 'approved'), count('w', 'rejected')
+
+    lines = [
+        "📈 **Статистика**",
+        "──────────────",
+        f"👥 Работников: {count('users', 'worker')}, администраторов: {count('users', 'admin')}",
+        "",
+        f"📋 **Задания администраторов:** {total('a')}",
+        f"   ⏳ Ожидают: {count('a', 'pending')} · ✅ Приняты: {accepted} · 📝 С комментарием: {commented}",
+        f"   Принято: {format_share(accepted, accepted + commented)} от отвеченных",
+    ]
+
+    latency = stats['latency']
+    median = histogram_percentile(latency, 0.5)
+    if median is not None:
+        def duration(seconds):
+            if seconds == float('inf'):
+                return f"больше {format_duration(stats['latency_limit'])}"
+            if seconds < 60:
+                return "меньше минуты"
+            return f"≈ {format_duration(seconds)}"
+
+        lines.append(
+            f"   ⏱ Время до ответа: медиана {duration(median)}, "
+            f"90% - {duration(histogram_percentile(latency, 0.9))} "
+            f"(ответов: {sum(value for _, value in latency)})"
+        )
+
+    lines += [
+        "",
+        f"📝 **Запросы работников:** {total('w')}",
+        f"   ⏳ На рассмотрении: {count('w', 'pending')} · ✅ Одобрено: {approved} · ❌ Отклонено: {rejected}",
+        f"   Одобрено: {format_share(approved, approved + rejected)} от рассмотренных",
+    ]
+
+    if stats['top_workers']:
+        lines += ["", "🏆 **Приняли больше всего заданий:**"]
+        for place, (worker_id, fio, worker_counters) in enumerate(stats['top_workers'], 1):
+            assigned = sum(value for (kind, _), value in worker_counters.items() if kind == 'a')
+            lines.append(
+                f"{place}. {fio or worker_id} - {worker_counters.get(('a', 'accepted'), 0)} из {assigned}, "
+                f"📝 {worker_counters.get(('a', 'commented'), 0)}, "
+                f"запросов: {sum(value for (kind, _), value in worker_counters.items() if kind == 'w')}"
+            )
+
+    return "\n".join(lines)
+
+
+@router.message(Command("stats"))
+async def cmd_stats(message: types.Message, db: AsyncDatabase):
+    """Сводная статистика по заданиям и работникам"""
+    stats = await db.get_stats()
+    await message.answer(render_stats(stats))
+
+
+# --- Профиль SQL-запросов ---
+@router.message(Command("dbprofile"))
+async def cmd_db_profile(message: types.Message, db: AsyncDatabase, command: CommandObject):
+    """Самые затратные SQL-запросы с запуска бота; /dbprofile reset - начать заново"""
+    if command.args and command.args.strip().lower() == 'reset':
+        await db.reset_query_profile()
+        await message.answer("♻️ Статистика запросов сброшена.")
+        return
+
+    profile = await db.get_query_profile(10)
+    if not profile:
+        await message.answer("📭 Запросов еще не было.")
+        return
+
+    header = "🐢 **Запросы по суммарному времени**\n\n"
+    cards = []
+    for place, query in enumerate(profile, 1):
+        average = query['total'] / query['calls'] * 1000
+        cards.append(
+            f"{place}. **{query['total'] * 1000:.1f} мс** · вызовов {query['calls']} · "
+            f"среднее {average:.2f} мс · макс {query['max'] * 1000:.1f} мс · строк {query['rows']}\n"
+            f"   {', '.join(query['sites'])}\n"
+            f"   <code>{html.escape(truncate_text(query['sql'], 300), quote=False)}</code>"
+        )
+    await message.answer(header + "\n\n".join(cards[:fit_cards(cards, header)]))
 
 
 # --- Тестовая кнопка для отладки ---
 @router.message(F.text == "🔄 Тест")
 async def test_button(message: types.Message):
     """Тестовая кнопка"""
-    print(f"🔍 TEST BUTTON: Нажата user_id={message.from_user.id}")
+    logger.debug("Тестовая кнопка нажата user_id=%s", message.from_user.id)
     await message.answer("✅ Тестовая кнопка работает!")
\ No newline at end of file
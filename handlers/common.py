@@ -1,51 +1,41 @@
 # handlers/common.py
+import html
+import logging
+
 from aiogram import Router, types, F
-from aiogram.filters import Command, CommandStart
+from aiogram.filters import Command, CommandObject, CommandStart
 from aiogram.fsm.context import FSMContext
 
-# АБСОЛЮТНЫЕ импорты
-try:
-    # Пытаемся импортировать обычным способом
-    from database import Database
-    from config import Config
-    from keyboards import get_main_keyboard
-except ImportError:
-    # Если не получается, добавляем путь в sys.path
-    import sys
-    import os
-
-    sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-    from database import Database
-    from config import Config
-    from keyboards import get_main_keyboard
+from config import Config
+from database import SNIPPET_END, SNIPPET_START, AsyncDatabase
+from keyboards import get_main_keyboard, get_search_keyboard
+from states.worker_states import WorkerStates
+from utils import get_status_emoji
 
 router = Router()
-db = Database()
+logger = logging.getLogger(__name__)
 
 
 # handlers/common.py (обновленная часть)
 @router.message(CommandStart())
-async def cmd_start(message: types.Message, state: FSMContext):
+async def cmd_start(message: types.Message, state: FSMContext, user=None, role: str = None):
     """Обработчик команды /start"""
     user_id = message.from_user.id
     username = message.from_user.username or "Нет username"
 
-    print(f"🔍 DEBUG: /start от user_id={user_id}, username={username}")
+    logger.debug("/start от user_id=%s, username=%s", user_id, username)
 
     # Очищаем состояние
     await state.clear()
 
-    # Проверяем, зарегистрирован ли пользователь
-    user = db.get_user(user_id)
-
+    # Профиль и роль определяет RoleMiddleware
     if user:
         # Пользователь уже зарегистрирован
-        fio = user[2]
-        role = user[3]
+        fio = user['fio']
 
-        print(f"🔍 DEBUG: Пользователь найден в БД, ФИО={fio}, роль={role}")
+        logger.debug("Пользователь найден в БД, ФИО=%s, роль=%s", fio, role)
 
-        if role == 'admin' or Config.is_admin(user_id):
+        if role == 'admin':
             await message.answer(
                 f"👑 Добро пожаловать, администратор {fio}!",
                 reply_markup=get_main_keyboard('admin')
@@ -57,23 +47,14 @@ async def cmd_start(message: types.Message, state: FSMContext):
             )
     else:
         # Новый пользователь - просим ввести ФИО
-        print(f"🔍 DEBUG: Новый пользователь, запрашиваю ФИО")
+        logger.debug("Новый пользователь, запрашиваю ФИО")
 
         await message.answer(
             "👋 Добро пожаловать в Construction Bot!\n\n"
             "Пожалуйста, введите ваше ФИО (полное имя):"
         )
-        # Импортируем WorkerStates локально
-        try:
-            from states.worker_states import WorkerStates
-        except ImportError:
-            import sys
-            import os
-            sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-            from states.worker_states import WorkerStates
-
         await state.set_state(WorkerStates.waiting_for_fio)
-        print(f"🔍 DEBUG: Установлено состояние: waiting_for_fio")
+        logger.debug("Установлено состояние: waiting_for_fio")
 
 
 
@@ -87,6 +68,7 @@ async def cmd_help(message: types.Message):
 /start - Начать работу с ботом
 /help - Показать эту справку
 /profile - Показать профиль
+/search текст - Поиск по заданиям (работник видит только свои)
 
 **Для работников:**
 📋 Мои задания - Просмотр заданий от администратора
@@ -98,25 +80,28 @@ async def cmd_help(message: types.Message):
 📨 Отправить задание - Назначить задание работнику
 ✅ Запросы от работников - Рассмотреть задания от работников
 📊 Все задания - Просмотр всех заданий
+/tasks ДД.ММ.ГГГГ [ДД.ММ.ГГГГ] - Задания за период
+/stats - Статистика по заданиям и работникам
+/dbprofile - Самые затратные SQL-запросы
+/import - Загрузить работников или задания из CSV/XLSX
+/export [xlsx] [статус] [даты] - Выгрузить задания файлом
+/addadmin ID - Назначить администратора
+/removeadmin ID - Снять права администратора
     """
     await message.answer(help_text)
 
 
 @router.message(Command("profile"))
-async def cmd_profile(message: types.Message):
+async def cmd_profile(message: types.Message, user=None, role: str = None):
     """Показать профиль пользователя"""
-    user_id = message.from_user.id
-    user = db.get_user(user_id)
-
     if user:
-        user_id_db, username, fio, role, registered_at = user
         profile_text = f"""
 📋 **Ваш профиль:**
 
-👤 **ФИО:** {fio}
-🆔 **ID:** {user_id_db}
+👤 **ФИО:** {user['fio']}
+🆔 **ID:** {user['user_id']}
 👥 **Роль:** {role}
-📅 **Зарегистрирован:** {registered_at}
+📅 **Зарегистрирован:** {user['registered_at']}
         """
         await message.answer(profile_text)
     else:
@@ -124,17 +109,82 @@ async def cmd_profile(message: types.Message):
 
 
 @router.message(F.text == "🏠 Главное меню")
-async def cmd_main_menu(message: types.Message, state: FSMContext):
+async def cmd_main_menu(message: types.Message, state: FSMContext, user=None, role: str = None):
     """Вернуться в главное меню"""
     await state.clear()
-    user_id = message.from_user.id
-    user = db.get_user(user_id)
 
     if user:
-        role = user[3]
         await message.answer(
             "🏠 Вы вернулись в главное меню",
             reply_markup=get_main_keyboard(role)
         )
     else:
-        await cmd_start(message, state)
\ No newline at end of file
+        await cmd_start(message, state, user, role)
+
+
+# --- Поиск по заданиям ---
+def render_snippet(snippet: str) -> str:
+    """Фрагмент текста для HTML: текст экранирован, совпадения выделены жирным"""
+    return html.escape(snippet).replace(SNIPPET_START, "<b>").replace(SNIPPET_END, "</b>")
+
+
+async def get_search_page(db: AsyncDatabase, query: str, offset: int, role: str, user_id: int):
+    """Текст и клавиатура страницы результатов поиска"""
+    limit = Config.SEARCH_PAGE_SIZE
+    # Работник ищет только по своим заданиям и запросам
+    worker_id = None if role == 'admin' else user_id
+    results, has_more = await db.search_tasks(query, limit, offset, worker_id)
+    # Сообщение уходит с parse_mode=HTML: запрос и тексты пользователей экранируем
+    shown_query = html.escape(query)
+
+    if not results:
+        return f"🔎 По запросу «{shown_query}» ничего не найдено.", None
+
+    cards = []
+    for result in results:
+        title = "Задание" if result['kind'] == 'a' else "Запрос"
+        card = f"{get_status_emoji(result['status'])} **{title} #{result['task_id']}**\n   {render_snippet(result['snippet'])}"
+        if role == 'admin':
+            card += f"\n   👷 {html.escape(str(result['worker_fio']))} · {result['created_at']}"
+        else:
+            card += f"\n   📅 {result['created_at']}"
+        cards.append(card)
+
+    text = f"🔎 **Поиск:** «{shown_query}» (с {offset + 1} по {offset + len(results)})\n\n" + "\n\n".join(cards)
+    return text, get_search_keyboard(offset, limit, has_more)
+
+
+@router.message(Command("search"))
+async def cmd_search(message: types.Message, command: CommandObject, state: FSMContext, db: AsyncDatabase,
+                     user=None, role: str = None):
+    """Полнотекстовый поиск: /search текст"""
+    if not user:
+        await message.answer("Сначала зарегистрируйтесь через /start")
+        return
+
+    query = (command.args or "").strip()
+    if not query:
+        await message.answer("🔎 Формат: /search текст (например: /search бетон секция 4)")
+        return
+
+    # Запрос нужен для листания - кнопки содержат только смещение
+    await state.update_data(search_query=query)
+    text, reply_markup = await get_search_page(db, query, 0, role, message.from_user.id)
+    await message.answer(text, reply_markup=reply_markup)
+
+
+@router.callback_query(F.data.startswith("search:"))
+async def page_search(callback: types.CallbackQuery, state: FSMContext, db: AsyncDatabase,
+                      user=None, role: str = None):
+    """Листание результатов поиска"""
+    data = await state.get_data()
+    query = data.get('search_query')
+
+    if not user or not query:
+        await callback.answer("Повторите поиск командой /search", show_alert=True)
+        return
+
+    offset = int(callback.data.split(":")[1])
+    text, reply_markup = await get_search_page(db, query, offset, role, callback.from_user.id)
+    await callback.message.edit_text(text, reply_markup=reply_markup)
+    await callback.answer()
@@ -1,34 +1,31 @@
 # handlers/worker.py - ИСПРАВЛЕННАЯ ВЕРСИЯ
-import sys
-import os
-
-# Добавляем корень проекта в путь Python
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import html
+import logging
 
 from aiogram import Router, types, F
 from aiogram.fsm.context import FSMContext
 from aiogram.filters import Command
-from database import Database
+from database import AsyncDatabase
 from keyboards import (
     get_main_keyboard,
-    get_task_actions_keyboard,
+    get_my_tasks_page_keyboard,
     get_back_to_menu_keyboard
 )
+from outbox import OutboxDispatcher, make_notification
 from states.worker_states import WorkerStates
 from config import Config
+from utils import fit_cards, truncate_text
 from datetime import datetime
 
 router = Router()
-db = Database()
-
-print("🔍 WORKER HANDLER: Инициализация...")
+logger = logging.getLogger(__name__)
 
 
 # --- Регистрация пользователя ---
 @router.message(WorkerStates.waiting_for_fio)
-async def process_fio(message: types.Message, state: FSMContext):
+async def process_fio(message: types.Message, state: FSMContext, db: AsyncDatabase):
     """Обработка ввода ФИО при регистрации"""
-    print(f"🔍 WORKER: process_fio вызван! Текст: {message.text}")
+    logger.debug("process_fio вызван! Текст: %s", message.text)
 
     fio = message.text.strip()
     user_id = message.from_user.id
@@ -38,17 +35,13 @@ async def process_fio(message: types.Message, state: FSMContext):
         await message.answer("❌ ФИО слишком короткое. Введите полное имя:")
         return
 
-    # Сохраняем пользователя в БД
-    db.add_user(user_id, username, fio)
-    print(f"🔍 WORKER: Пользователь сохранен: user_id={user_id}, fio={fio}")
-
-    # Получаем обновленные данные
-    user = db.get_user(user_id)
-    role = user[3] if user else 'worker'
+    # Сохраняем пользователя в БД (роль определяется при сохранении)
+    role = await db.add_user(user_id, username, fio)
+    logger.debug("Пользователь сохранен: user_id=%s, fio=%s, роль: %s", user_id, fio, role)
 
     # Очищаем состояние
     await state.clear()
-    print(f"🔍 WORKER: Состояние очищено, роль: {role}")
+    logger.debug("Состояние очищено, роль: %s", role)
 
     # Приветствуем в зависимости от роли
     if role == 'admin':
@@ -64,89 +57,103 @@ async def process_fio(message: types.Message, state: FSMContext):
 
 
 # --- Мои задания (работник) ---
+MY_TASKS_SEPARATOR = "\n──────────────\n"
+
+
+def render_my_task_card(task) -> str:
+    """Карточка задания на странице «Мои задания»"""
+    status = task['status']
+    status_text = {
+        'pending': '⏳ Ожидает принятия',
+        'accepted': '✅ Принято',
+        'completed': '✅ Выполнено',
+        'commented': '📝 С комментарием'
+    }.get(status, status)
+
+    # Сообщение уходит с parse_mode=HTML: тексты пользователей экранируем
+    card = (
+        f"📋 **Задание #{task['task_id']}**\n"
+        f"{html.escape(truncate_text(task['task_text'], 500))}\n"
+        f"📊 **Статус:** {status_text}\n"
+        f"📅 **Создано:** {task['created_at']}"
+    )
+    if task['worker_comment'] and status == 'commented':
+        card += f"\n📝 **Комментарий:** {html.escape(truncate_text(task['worker_comment'], 200))}"
+    return card
+
+
+async def get_my_tasks_page(db: AsyncDatabase, user_id: int, anchor_id: int = None, direction: str = 'next'):
+    """Текст и клавиатура страницы заданий работника (None, если заданий нет)"""
+    tasks, has_newer, has_older = await db.get_worker_tasks_page(
+        user_id, Config.TASKS_PAGE_SIZE, anchor_id, direction
+    )
+    logger.debug("Получено %s заданий для user_id=%s", len(tasks), user_id)
+
+    if not tasks:
+        return None, None
+
+    cards = [render_my_task_card(task) for task in tasks]
+
+    # Страница режется только по границе карточек: не поместившиеся
+    # задания остаются для следующей страницы
+    from_end = direction == 'prev'
+    count = fit_cards(cards, separator=MY_TASKS_SEPARATOR, from_end=from_end)
+    if count < len(tasks):
+        if from_end:
+            tasks, cards, has_newer = tasks[-count:], cards[-count:], True
+        else:
+            tasks, cards, has_older = tasks[:count], cards[:count], True
+
+    return MY_TASKS_SEPARATOR.join(cards), get_my_tasks_page_keyboard(tasks, has_newer, has_older)
+
+
 @router.message(F.text == "📋 Мои задания")
-async def show_my_tasks(message: types.Message):
-    """Показать задания работника"""
-    print(f"🔍 WORKER: Кнопка '📋 Мои задания' нажата user_id={message.from_user.id}")
+async def show_my_tasks(message: types.Message, db: AsyncDatabase, user=None):
+    """Показать задания работника (первая страница)"""
+    logger.debug("Кнопка '📋 Мои задания' нажата user_id=%s", message.from_user.id)
 
     user_id = message.from_user.id
-    user = db.get_user(user_id)
 
     if not user:
-        print(f"🔍 WORKER: Пользователь {user_id} не найден в БД")
+        logger.debug("Пользователь %s не найден в БД", user_id)
         await message.answer("Сначала зарегистрируйтесь через /start")
         return
 
-    print(f"🔍 WORKER: Пользователь найден: {user['fio']}")
+    logger.debug("Пользователь найден: %s", user['fio'])
 
-    # Получаем задания
-    tasks = db.get_worker_tasks(user_id)
-    print(f"🔍 WORKER: Получено {len(tasks)} заданий для user_id={user_id}")
+    text, reply_markup = await get_my_tasks_page(db, user_id)
 
-    if not tasks:
+    if not text:
         await message.answer("📭 У вас пока нет заданий.")
         return
 
-    for task in tasks:
-        task_id = task['task_id']
-        task_text = task['task_text']
-        status = task['status']
-        created_at = task['created_at']
-        comment = task['worker_comment']
+    await message.answer(text, reply_markup=reply_markup)
 
-        status_text = {
-            'pending': '⏳ Ожидает принятия',
-            'accepted': '✅ Принято',
-            'completed': '✅ Выполнено',
-            'commented': '📝 С комментарием'
-        }.get(status, status)
 
-        task_message = f"""
-📋 **Задание #{task_id}**
-──────────────
-{task_text}
-──────────────
-📊 **Статус:** {status_text}
-📅 **Создано:** {created_at}
-        """
+@router.callback_query(F.data.startswith("my_tasks:"))
+async def page_my_tasks(callback: types.CallbackQuery, db: AsyncDatabase):
+    """Листание страниц «Мои задания» с редактированием сообщения"""
+    _, direction, anchor_id = callback.data.split(":")
 
-        if status == 'pending':
-            # Отправляем задание с кнопками действий
-            print(f"🔍 WORKER: Отправляю задание #{task_id} с кнопками действий")
-            await message.answer(
-                task_message,
-                reply_markup=get_task_actions_keyboard(task_id)
-            )
-        else:
-            # Отправляем только информацию о задании
-            if comment and status == 'commented':
-                task_message += f"\n📝 **Комментарий:** {comment}"
+    text, reply_markup = await get_my_tasks_page(db, callback.from_user.id, int(anchor_id), direction)
 
-            await message.answer(task_message)
+    if text:
+        await callback.message.edit_text(text, reply_markup=reply_markup)
+    await callback.answer()
 
 
 # --- Принятие задания ---
 @router.callback_query(F.data.startswith("accept_task:"))
-async def accept_task(callback: types.CallbackQuery):
+async def accept_task(callback: types.CallbackQuery, db: AsyncDatabase, outbox: OutboxDispatcher):
     """Обработка принятия задания"""
-    print(f"🔍 WORKER CALLBACK: accept_task вызван, data={callback.data}")
+    logger.debug("accept_task вызван, data=%s", callback.data)
 
     task_id = int(callback.data.split(":")[1])
-    print(f"🔍 WORKER: Принимаем задание #{task_id}")
-
-    # Обновляем статус задания
-    db.update_task_status(task_id, "accepted")
+    logger.debug("Принимаем задание #%s", task_id)
 
     # Получаем информацию о задании
-    cursor = db.conn.cursor()
-    cursor.execute('''
-    SELECT at.*, u.fio as worker_fio, admin_user.fio as admin_fio
-    FROM admin_tasks at
-    JOIN users u ON at.to_worker_id = u.user_id
-    JOIN users admin_user ON at.from_admin_id = admin_user.user_id
-    WHERE at.task_id = ?
-    ''', (task_id,))
-    task = cursor.fetchone()
+    task = await db.get_admin_task_details(task_id)
+    notifications = []
 
     if task:
         # Уведомляем администратора
@@ -154,24 +161,30 @@ async def accept_task(callback: types.CallbackQuery):
         worker_fio = task['worker_fio']
         task_text = task['task_text']
 
+        # Уведомление уходит с parse_mode=HTML: тексты и ФИО пользователей экранируем
         notification = f"""
 ✅ **Задание принято!**
 ──────────────
-**Работник:** {worker_fio}
-**Задание:** {task_text}
+**Работник:** {html.escape(worker_fio)}
+**Задание:** {html.escape(task_text)}
 **Время:** {datetime.now().strftime('%H:%M %d.%m.%Y')}
         """
+        notifications.append(make_notification(admin_id, notification))
 
-        try:
-            await callback.message.bot.send_message(
-                admin_id,
-                notification
-            )
-            print(f"🔍 WORKER: Уведомление отправлено администратору {admin_id}")
-        except Exception as e:
-            print(f"🔍 WORKER: Ошибка отправки уведомления администратору: {e}")
+    # Обновляем статус задания вместе с уведомлением администратору
+    await db.update_task_status(task_id, "accepted", notifications=notifications)
+    outbox.wake()
 
     await callback.answer("✅ Задание принято!")
+
+    parts = callback.data.split(":")
+    if len(parts) > 2:
+        # Принято со страницы «Мои задания» - обновляем ту же страницу
+        text, reply_markup = await get_my_tasks_page(db, callback.from_user.id, int(parts[2]), 'at')
+        if text:
+            await callback.message.edit_text(text, reply_markup=reply_markup)
+            return
+
     await callback.message.edit_text(
         f"✅ Вы приняли задание #{task_id}",
         reply_markup=None
@@ -182,7 +195,7 @@ async def accept_task(callback: types.CallbackQuery):
 @router.callback_query(F.data.startswith("comment_task:"))
 async def comment_task(callback: types.CallbackQuery, state: FSMContext):
     """Начало процесса комментирования задания"""
-    print(f"🔍 WORKER CALLBACK: comment_task вызван, data={callback.data}")
+    logger.debug("comment_task вызван, data=%s", callback.data)
 
     task_id = int(callback.data.split(":")[1])
 
@@ -199,9 +212,10 @@ async def comment_task(callback: types.CallbackQuery, state: FSMContext):
 
 
 @router.message(WorkerStates.waiting_for_comment)
-async def process_task_comment(message: types.Message, state: FSMContext):
+async def process_task_comment(message: types.Message, state: FSMContext, db: AsyncDatabase,
+                               outbox: OutboxDispatcher):
     """Обработка комментария к заданию"""
-    print(f"🔍 WORKER: process_task_comment вызван, текст: {message.text}")
+    logger.debug("process_task_comment вызван, текст: %s", message.text)
 
     comment = message.text.strip()
     data = await state.get_data()
@@ -212,19 +226,9 @@ async def process_task_comment(message: types.Message, state: FSMContext):
         await state.clear()
         return
 
-    # Обновляем задание с комментарием
-    db.update_task_status(task_id, "commented", comment)
-
     # Получаем информацию о задании
-    cursor = db.conn.cursor()
-    cursor.execute('''
-    SELECT at.*, u.fio as worker_fio, admin_user.fio as admin_fio
-    FROM admin_tasks at
-    JOIN users u ON at.to_worker_id = u.user_id
-    JOIN users admin_user ON at.from_admin_id = admin_user.user_id
-    WHERE at.task_id = ?
-    ''', (task_id,))
-    task = cursor.fetchone()
+    task = await db.get_admin_task_details(task_id)
+    notifications = []
 
     if task:
         # Уведомляем администратора
@@ -235,20 +239,16 @@ async def process_task_comment(message: types.Message, state: FSMContext):
         notification = f"""
 📝 **Комментарий к заданию**
 ──────────────
-**Работник:** {worker_fio}
-**Задание:** {task_text}
-**Комментарий:** {comment}
+**Работник:** {html.escape(worker_fio)}
+**Задание:** {html.escape(task_text)}
+**Комментарий:** {html.escape(comment)}
 **Время:** {datetime.now().strftime('%H:%M %d.%m.%Y')}
         """
+        notifications.append(make_notification(admin_id, notification))
 
-        try:
-            await message.bot.send_message(
-                admin_id,
-                notification
-            )
-            print(f"🔍 WORKER: Комментарий отправлен администратору {admin_id}")
-        except Exception as e:
-            print(f"🔍 WORKER: Ошибка отправки комментария администратору: {e}")
+    # Обновляем задание с комментарием вместе с уведомлением администратору
+    await db.update_task_status(task_id, "commented", comment, notifications=notifications)
+    outbox.wake()
 
     await message.answer(
         f"📝 Ваш комментарий к заданию #{task_id} отправлен администратору.",
@@ -260,12 +260,9 @@ async def process_task_comment(message: types.Message, state: FSMContext):
 
 # --- Создание задания работником ---
 @router.message(F.text == "📝 Создать задание")
-async def create_worker_task(message: types.Message, state: FSMContext):
+async def create_worker_task(message: types.Message, state: FSMContext, user=None):
     """Начало создания задания работником"""
-    print(f"🔍 WORKER: Кнопка '📝 Создать задание' нажата user_id={message.from_user.id}")
-
-    user_id = message.from_user.id
-    user = db.get_user(user_id)
+    logger.debug("Кнопка '📝 Создать задание' нажата user_id=%s", message.from_user.id)
 
     if not user:
         await message.answer("Сначала зарегистрируйтесь через /start")
@@ -280,9 +277,10 @@ async def create_worker_task(message: types.Message, state: FSMContext):
 
 
 @router.message(WorkerStates.waiting_for_task_text)
-async def process_worker_task_text(message: types.Message, state: FSMContext):
+async def process_worker_task_text(message: types.Message, state: FSMContext, db: AsyncDatabase,
+                                   outbox: OutboxDispatcher, user=None):
     """Обработка текста задания от работника"""
-    print(f"🔍 WORKER: process_worker_task_text вызван, текст: {message.text}")
+    logger.debug("process_worker_task_text вызван, текст: %s", message.text)
 
     task_text = message.text.strip()
     user_id = message.from_user.id
@@ -291,33 +289,27 @@ async def process_worker_task_text(message: types.Message, state: FSMContext):
         await message.answer("❌ Текст задания слишком короткий. Введите подробнее:")
         return
 
-    # Сохраняем задание в БД
-    task_id = db.add_worker_task(user_id, task_text)
-    print(f"🔍 WORKER: Задание #{task_id} сохранено в БД")
-
-    # Получаем информацию о работнике
-    user = db.get_user(user_id)
+    # Профиль работника передает RoleMiddleware
     worker_fio = user[2] if user else "Неизвестный"
 
-    # Уведомляем всех администраторов
-    admin_ids = Config.get_admin_ids()
-    print(f"🔍 WORKER: Отправляю уведомления администраторам: {admin_ids}")
+    # Уведомляем всех администраторов (множество из таблицы admins)
+    admin_ids = db.admin_ids
+    logger.debug("Ставлю в очередь уведомления администраторам: %s", admin_ids)
 
-    for admin_id in admin_ids:
-        try:
-            await message.bot.send_message(
-                admin_id,
-                f"""
+    def notify(task_id):
+        notification = f"""
 📝 **Новый запрос от работника**
 ──────────────
-**От:** {worker_fio}
-**Задание:** {task_text}
+**От:** {html.escape(worker_fio)}
+**Задание:** {html.escape(task_text)}
 **ID запроса:** #{task_id}
-                """
-            )
-            print(f"🔍 WORKER: Уведомление отправлено администратору {admin_id}")
-        except Exception as e:
-            print(f"🔍 WORKER: Ошибка отправки администратору {admin_id}: {e}")
+        """
+        return [make_notification(admin_id, notification) for admin_id in admin_ids]
+
+    # Сохраняем задание в БД вместе с уведомлениями
+    task_id = await db.add_worker_task(user_id, task_text, notify=notify)
+    outbox.wake()
+    logger.debug("Задание #%s сохранено в БД", task_id)
 
     await message.answer(
         f"✅ Ваше задание #{task_id} отправлено на согласование администратору.",
@@ -329,23 +321,14 @@ async def process_worker_task_text(message: types.Message, state: FSMContext):
 
 # --- Статус запросов работника ---
 @router.message(F.text == "📊 Статус запросов")
-async def show_worker_requests(message: types.Message):
+async def show_worker_requests(message: types.Message, db: AsyncDatabase):
     """Показать статус заданий, отправленных работником"""
-    print(f"🔍 WORKER: Кнопка '📊 Статус запросов' нажата user_id={message.from_user.id}")
+    logger.debug("Кнопка '📊 Статус запросов' нажата user_id=%s", message.from_user.id)
 
     user_id = message.from_user.id
 
-    cursor = db.conn.cursor()
-    cursor.execute('''
-    SELECT wt.*, u.fio as reviewer_fio
-    FROM worker_tasks wt
-    LEFT JOIN users u ON wt.reviewed_by = u.user_id
-    WHERE wt.from_worker_id = ?
-    ORDER BY wt.created_at DESC
-    ''', (user_id,))
-
-    tasks = cursor.fetchall()
-    print(f"🔍 WORKER: Получено {len(tasks)} заданий от работника")
+    tasks = await db.get_worker_requests(user_id)
+    logger.debug("Получено %s заданий от работника", len(tasks))
 
     if not tasks:
         await message.answer("📭 Вы еще не отправляли заданий на согласование.")
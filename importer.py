@@ -0,0 +1,232 @@
+# importer.py
+"""Импорт работников и заданий из CSV/XLSX.
+
+Файл читается построчно (для XLSX - openpyxl в режиме read_only),
+строки проверяются и записываются в БД пачками по batch_size, каждая
+пачка - одной транзакцией. Чтение файла идет в отдельном потоке, запись -
+в потоке БД, поэтому цикл событий не блокируется, а в памяти держится
+только текущая пачка. Ошибки пишутся в CSV-отчет на диске.
+"""
+import asyncio
+import csv
+import logging
+import os
+from dataclasses import dataclass, field
+from typing import Iterator, List, Optional, Tuple
+
+from config import Config
+from database import AsyncDatabase
+from utils import validate_fio
+
+logger = logging.getLogger(__name__)
+
+# Допустимые названия столбцов (без учета регистра)
+COLUMNS = {
+    'user_id': ('user_id', 'id', 'telegram_id', 'telegram id', 'айди'),
+    'fio': ('fio', 'фио', 'ф.и.о.', 'имя'),
+    'username': ('username', 'логин'),
+    'task_text': ('task_text', 'task', 'задание', 'текст', 'текст задания'),
+}
+
+SUPPORTED_EXTENSIONS = ('.csv', '.xlsx')
+MAX_TASK_LENGTH = 3500  # текст задания + оформление уведомления должны влезть в сообщение
+MAX_USER_ID = 2 ** 63 - 1  # больше не помещается в INTEGER SQLite
+
+
+class ImportFileError(Exception):
+    """Файл нельзя импортировать целиком (формат, заголовок)"""
+
+
+@dataclass
+class ImportReport:
+    """Итог импорта: kind - 'workers' или 'tasks'"""
+    kind: str = None
+    total: int = 0
+    imported: int = 0
+    errors: int = 0
+    first_errors: List[str] = field(default_factory=list)
+    errors_path: Optional[str] = None
+
+
+def _read_csv(path: str) -> Iterator[list]:
+    # Excel в русской локали сохраняет CSV в cp1251 и с разделителем ';'
+    with open(path, 'rb') as file:
+        sample = file.read(64 * 1024)
+    try:
+        sample.decode('utf-8-sig')
+        encoding = 'utf-8-sig'
+    except UnicodeDecodeError:
+        encoding = 'cp1251'
+
+    text_sample = sample.decode(encoding, errors='ignore')
+    try:
+        dialect = csv.Sniffer().sniff(text_sample, delimiters=',;\t')
+    except csv.Error:
+        dialect = csv.excel
+
+    with open(path, newline='', encoding=encoding, errors='replace') as file:
+        yield from csv.reader(file, dialect)
+
+
+def _read_xlsx(path: str) -> Iterator[list]:
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise ImportFileError("Для XLSX нужен пакет openpyxl, загрузите файл в формате CSV")
+
+    try:
+        workbook = load_workbook(path, read_only=True, data_only=True)
+    except Exception as e:
+        raise ImportFileError(f"Не удалось открыть XLSX: {e}")
+    try:
+        for row in workbook.active.iter_rows(values_only=True):
+            yield ['' if value is None else str(value) for value in row]
+    finally:
+        workbook.close()
+
+
+def read_rows(path: str, filename: str) -> Iterator[list]:
+    """Строки файла как списки строк"""
+    extension = os.path.splitext(filename.lower())[1]
+    if extension == '.csv':
+        return _read_csv(path)
+    if extension == '.xlsx':
+        return _read_xlsx(path)
+    raise ImportFileError("Поддерживаются файлы .csv и .xlsx")
+
+
+def parse_header(header: list) -> Tuple[str, dict]:
+    """Тип файла и номера столбцов по заголовку"""
+    names = [str(name).strip().lower() for name in header]
+    columns = {}
+    for column, aliases in COLUMNS.items():
+        for index, name in enumerate(names):
+            if name in aliases:
+                columns[column] = index
+                break
+
+    if 'user_id' not in columns:
+        raise ImportFileError("В первой строке нет столбца user_id (Telegram ID)")
+    if 'task_text' in columns:
+        return 'tasks', columns
+    if 'fio' in columns:
+        return 'workers', columns
+    raise ImportFileError("Нужен столбец fio (работники) или task_text (задания)")
+
+
+def _cell(row: list, columns: dict, column: str) -> str:
+    index = columns.get(column)
+    if index is None or index >= len(row):
+        return ''
+    return str(row[index]).strip()
+
+
+def _parse_user_id(value: str) -> int:
+    # Excel часто превращает ID в число с плавающей точкой: 123456.0
+    if value.endswith('.0'):
+        value = value[:-2]
+    if not value.isdigit():
+        raise ValueError(f"неверный user_id: {value!r}")
+    user_id = int(value)
+    if not 0 < user_id <= MAX_USER_ID:
+        raise ValueError(f"user_id вне допустимого диапазона: {value}")
+    return user_id
+
+
+def validate_row(kind: str, row: list, columns: dict) -> tuple:
+    """Проверенная строка для записи в БД; ValueError с причиной, если строка неверная"""
+    user_id = _parse_user_id(_cell(row, columns, 'user_id'))
+
+    if kind == 'workers':
+        fio = ' '.join(_cell(row, columns, 'fio').split())
+        is_valid, message = validate_fio(fio)
+        if not is_valid:
+            raise ValueError(message.lstrip('❌ '))
+        return user_id, _cell(row, columns, 'username') or None, fio
+
+    task_text = _cell(row, columns, 'task_text')
+    if len(task_text) < 5:
+        raise ValueError("текст задания короче 5 символов")
+    if len(task_text) > MAX_TASK_LENGTH:
+        raise ValueError(f"текст задания длиннее {MAX_TASK_LENGTH} символов")
+    return user_id, task_text
+
+
+def _next_batch(rows: Iterator[list], size: int) -> list:
+    """Следующие size строк файла (выполняется в потоке чтения)"""
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            break
+    return batch
+
+
+async def import_file(db: AsyncDatabase, path: str, filename: str, admin_id: int,
+                      notify=None, batch_size: int = None) -> ImportReport:
+    """Импортируем файл path; notify - уведомления о заданиях (см. add_admin_tasks_many)"""
+    batch_size = batch_size or Config.IMPORT_BATCH_SIZE
+    report = ImportReport()
+    rows = read_rows(path, filename)
+
+    header = await asyncio.to_thread(_next_batch, rows, 1)
+    if not header:
+        raise ImportFileError("Файл пустой")
+    report.kind, columns = parse_header(header[0])
+
+    errors_path = path + '.errors.csv'
+    with open(errors_path, 'w', newline='', encoding='utf-8-sig') as errors_file:
+        errors = csv.writer(errors_file, delimiter=';')
+        errors.writerow(['строка', 'ошибка', 'данные'])
+        line = 1
+
+        while True:
+            batch = await asyncio.to_thread(_next_batch, rows, batch_size)
+            if not batch:
+                break
+
+            valid, valid_lines = [], []
+            for row in batch:
+                line += 1
+                if not any(str(value).strip() for value in row):
+                    continue  # пустые строки пропускаем молча
+                report.total += 1
+                try:
+                    valid.append(validate_row(report.kind, row, columns))
+                    valid_lines.append(line)
+                except ValueError as e:
+                    _add_error(report, errors, line, str(e), row)
+
+            if report.kind == 'tasks' and valid:
+                # Задание можно выдать только зарегистрированному работнику
+                workers = await db.get_existing_worker_ids(list({task[0] for task in valid}))
+                checked = []
+                for task, task_line in zip(valid, valid_lines):
+                    if task[0] in workers:
+                        checked.append(task)
+                    else:
+                        _add_error(report, errors, task_line, f"работник {task[0]} не найден", [task[0], task[1]])
+                valid = checked
+
+            if valid:
+                if report.kind == 'workers':
+                    await db.import_workers(valid)
+                else:
+                    await db.add_admin_tasks_many(admin_id, valid, notify=notify)
+                report.imported += len(valid)
+
+    if report.errors:
+        report.errors_path = errors_path
+    else:
+        os.remove(errors_path)
+
+    logger.info("Импорт %s (%s): строк %s, записано %s, ошибок %s",
+                filename, report.kind, report.total, report.imported, report.errors)
+    return report
+
+
+def _add_error(report: ImportReport, writer, line: int, error: str, row: list):
+    report.errors += 1
+    writer.writerow([line, error, ' | '.join(str(value) for value in row)])
+    if len(report.first_errors) < 10:
+        report.first_errors.append(f"строка {line}: {error}")
@@ -1,10 +1,14 @@
+from functools import lru_cache
+
 from aiogram.types import ReplyKeyboardMarkup, KeyboardButton, InlineKeyboardMarkup, InlineKeyboardButton
 from aiogram.utils.keyboard import ReplyKeyboardBuilder, InlineKeyboardBuilder
 
+# Клавиатуры без параметров строятся один раз при импорте и переиспользуются:
+# разметка не изменяется после создания, поэтому один объект можно
+# отправлять в любом количестве сообщений.
 
-# keyboards.py - обновленная функция get_main_keyboard
-def get_main_keyboard(role: str = 'worker') -> ReplyKeyboardMarkup:
-    """Главная клавиатура в зависимости от роли"""
+
+def _build_main_keyboard(role: str) -> ReplyKeyboardMarkup:
     builder = ReplyKeyboardBuilder()
 
     if role == 'admin':
@@ -23,18 +27,105 @@ def get_main_keyboard(role: str = 'worker') -> ReplyKeyboardMarkup:
     return builder.as_markup(resize_keyboard=True)
 
 
-def get_workers_keyboard(workers: list) -> InlineKeyboardMarkup:
-    """Клавиатура для выбора работника"""
+MAIN_KEYBOARDS = {role: _build_main_keyboard(role) for role in ('admin', 'worker')}
+
+
+def get_main_keyboard(role: str = 'worker') -> ReplyKeyboardMarkup:
+    """Главная клавиатура в зависимости от роли"""
+    return MAIN_KEYBOARDS['admin' if role == 'admin' else 'worker']
+
+
+def get_workers_keyboard(
+    workers: list,
+    has_prev: bool = False,
+    has_next: bool = False,
+    select_prefix: str = "select_worker",
+    page_prefix: str = "workers",
+    extra_buttons: tuple = ()
+) -> InlineKeyboardMarkup:
+    """Клавиатура для выбора работника: страница списка и листание.
+
+    Кнопки работников - {select_prefix}:{user_id}, листание -
+    {page_prefix}:prev|next:{user_id крайнего работника}.
+    """
     builder = InlineKeyboardBuilder()
 
     for worker in workers:
         worker_id, fio = worker
-        builder.button(text=f"👷 {fio}", callback_data=f"select_worker:{worker_id}")
+        builder.row(InlineKeyboardButton(text=f"👷 {fio}", callback_data=f"{select_prefix}:{worker_id}"))
+
+    navigation = []
+    if has_prev:
+        navigation.append(InlineKeyboardButton(text="⬅️", callback_data=f"{page_prefix}:prev:{workers[0][0]}"))
+    if has_next:
+        navigation.append(InlineKeyboardButton(text="➡️", callback_data=f"{page_prefix}:next:{workers[-1][0]}"))
+    if navigation:
+        builder.row(*navigation)
+
+    for button in extra_buttons:
+        builder.row(button)
+
+    return builder.as_markup()
+
+
+def get_bulk_workers_keyboard(
+    workers: list,
+    selected: set,
+    select_all: bool,
+    has_prev: bool,
+    has_next: bool
+) -> InlineKeyboardMarkup:
+    """Выбор нескольких работников: отметки на странице, «все» и «готово»"""
+    builder = InlineKeyboardBuilder()
+    page_anchor = workers[0][0] if workers else 0
+
+    for worker_id, fio in workers:
+        mark = "✅" if select_all or worker_id in selected else "⬜"
+        builder.row(InlineKeyboardButton(text=f"{mark} {fio}", callback_data=f"bulk:toggle:{worker_id}:{page_anchor}"))
+
+    navigation = []
+    if has_prev:
+        navigation.append(InlineKeyboardButton(text="⬅️", callback_data=f"bulk:prev:{page_anchor}"))
+    if has_next:
+        navigation.append(InlineKeyboardButton(text="➡️", callback_data=f"bulk:next:{workers[-1][0]}"))
+    if navigation:
+        builder.row(*navigation)
+
+    builder.row(InlineKeyboardButton(
+        text="☑️ Снять «все»" if select_all else "👥 Все работники",
+        callback_data=f"bulk:all:{page_anchor}"
+    ))
+    count = "все" if select_all else len(selected)
+    builder.row(InlineKeyboardButton(text=f"➡️ Готово ({count})", callback_data="bulk:done:0"))
 
-    builder.adjust(1)
     return builder.as_markup()
 
 
+class VersionedMarkup:
+    """Последняя построенная клавиатура и версия данных, из которых она построена.
+
+    Используется для первой страницы выбора работника: версия - экземпляр
+    Database и его roster_version, который меняется при любом изменении
+    пользователей; только тогда клавиатуру нужно строить заново. Вместе с клавиатурой
+    можно хранить и сведения о ней (например, есть ли на странице работники).
+    """
+
+    def __init__(self):
+        self._version = None
+        self._markup = None
+
+    def get(self, version):
+        return self._markup if self._version == version else None
+
+    def set(self, version, markup):
+        self._version, self._markup = version, markup
+        return markup
+
+
+workers_keyboard_cache = VersionedMarkup()
+
+
+@lru_cache(maxsize=1024)
 def get_task_actions_keyboard(task_id: int) -> InlineKeyboardMarkup:
     """Клавиатура действий с заданием"""
     builder = InlineKeyboardBuilder()
@@ -46,6 +137,88 @@ def get_task_actions_keyboard(task_id: int) -> InlineKeyboardMarkup:
     return builder.as_markup()
 
 
+def get_my_tasks_page_keyboard(tasks: list, has_newer: bool, has_older: bool) -> InlineKeyboardMarkup:
+    """Клавиатура страницы «Мои задания»: действия с заданиями и листание"""
+    builder = InlineKeyboardBuilder()
+    page_anchor = tasks[0]['task_id']
+
+    for task in tasks:
+        if task['status'] == 'pending':
+            task_id = task['task_id']
+            builder.row(
+                InlineKeyboardButton(text=f"✅ Принять #{task_id}", callback_data=f"accept_task:{task_id}:{page_anchor}"),
+                InlineKeyboardButton(text=f"📝 #{task_id}", callback_data=f"comment_task:{task_id}")
+            )
+
+    navigation = []
+    if has_newer:
+        navigation.append(InlineKeyboardButton(text="⬅️ Новее", callback_data=f"my_tasks:prev:{page_anchor}"))
+    if has_older:
+        navigation.append(InlineKeyboardButton(text="Старее ➡️", callback_data=f"my_tasks:next:{tasks[-1]['task_id']}"))
+    if navigation:
+        builder.row(*navigation)
+
+    return builder.as_markup()
+
+
+def get_timeline_keyboard(entries: list, has_newer: bool, has_older: bool, filter_labels: dict) -> InlineKeyboardMarkup:
+    """Клавиатура ленты заданий: листание и фильтры"""
+    builder = InlineKeyboardBuilder()
+
+    navigation = []
+    if has_newer:
+        first = entries[0]
+        navigation.append(InlineKeyboardButton(
+            text="⬅️ Новее", callback_data=f"tl:prev:{first['kind']}:{first['task_id']}"
+        ))
+    if has_older:
+        last = entries[-1]
+        navigation.append(InlineKeyboardButton(
+            text="Старее ➡️", callback_data=f"tl:next:{last['kind']}:{last['task_id']}"
+        ))
+    if navigation:
+        builder.row(*navigation)
+
+    builder.row(
+        InlineKeyboardButton(text=f"📊 {filter_labels['status']}", callback_data="tl_filter:status"),
+        InlineKeyboardButton(text=f"📅 {filter_labels['period']}", callback_data="tl_filter:period")
+    )
+    builder.row(
+        InlineKeyboardButton(text=f"👷 {filter_labels['worker']}", callback_data="tl_filter:worker"),
+        InlineKeyboardButton(text="♻️ Сбросить", callback_data="tl_set:reset:-")
+    )
+    return builder.as_markup()
+
+
+def get_timeline_filter_keyboard(field: str, options: list) -> InlineKeyboardMarkup:
+    """Выбор значения фильтра ленты: options - список (значение, подпись)"""
+    builder = InlineKeyboardBuilder()
+
+    for value, label in options:
+        builder.button(text=label, callback_data=f"tl_set:{field}:{value}")
+    builder.button(text="⬅️ Назад", callback_data="tl_set:back:-")
+
+    builder.adjust(2)
+    return builder.as_markup()
+
+
+@lru_cache(maxsize=1024)
+def get_search_keyboard(offset: int, limit: int, has_more: bool) -> InlineKeyboardMarkup:
+    """Листание результатов поиска"""
+    builder = InlineKeyboardBuilder()
+
+    navigation = []
+    if offset > 0:
+        navigation.append(InlineKeyboardButton(text="⬅️ Назад", callback_data=f"search:{max(offset - limit, 0)}"))
+    if has_more:
+        navigation.append(InlineKeyboardButton(text="Дальше ➡️", callback_data=f"search:{offset + limit}"))
+    if navigation:
+        builder.row(*navigation)
+
+    return builder.as_markup()
+
+
+@lru_cache(maxsize=1024)
 def get_worker_task_review_keyboard(task_id: int) -> InlineKeyboardMarkup:
     """Клавиатура для рассмотрения задания от работника"""
     builder = InlineKeyboardBuilder()
@@ -57,8 +230,15 @@ def get_worker_task_review_keyboard(task_id: int) -> InlineKeyboardMarkup:
     return builder.as_markup()
 
 
-def get_back_to_menu_keyboard() -> ReplyKeyboardMarkup:
-    """Клавиатура для возврата в меню"""
+def _build_back_to_menu_keyboard() -> ReplyKeyboardMarkup:
     builder = ReplyKeyboardBuilder()
     builder.button(text="🏠 Главное меню")
-    return builder.as_markup(resize_keyboard=True)
\ No newline at end of file
+    return builder.as_markup(resize_keyboard=True)
+
+
+BACK_TO_MENU_KEYBOARD = _build_back_to_menu_keyboard()
+
+
+def get_back_to_menu_keyboard() -> ReplyKeyboardMarkup:
+    """Клавиатура для возврата в меню"""
+    return BACK_TO_MENU_KEYBOARD
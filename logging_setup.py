@@ -0,0 +1,47 @@
+# logging_setup.py
+import atexit
+import json
+import logging
+import queue
+from logging.handlers import QueueHandler, QueueListener
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+
+class JsonFormatter(logging.Formatter):
+    """Форматтер логов в одну JSON-строку на запись"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        if record.exc_info:
+            payload['exc_info'] = self.formatException(record.exc_info)
+        return json.dumps(payload, ensure_ascii=False)
+
+
+def setup_logging(level: str = 'INFO', fmt: str = 'text') -> QueueListener:
+    """Настраиваем логирование.
+
+    Обработчики (запись в stderr) работают в отдельном потоке QueueListener,
+    а цикл событий лишь кладет запись в очередь. Отладочные сообщения
+    отключены уровнем по умолчанию, и при %-аргументах их форматирование
+    не выполняется вовсе.
+    """
+    handler = logging.StreamHandler()
+    handler.setFormatter(JsonFormatter() if fmt == 'json' else logging.Formatter(TEXT_FORMAT))
+
+    log_queue = queue.SimpleQueue()
+    listener = QueueListener(log_queue, handler, respect_handler_level=True)
+
+    queue_handler = QueueHandler(log_queue)
+    # Сообщение подставляется в очереди, итоговый формат задает handler
+    queue_handler.setFormatter(logging.Formatter('%(message)s'))
+
+    logging.basicConfig(level=level, handlers=[queue_handler], force=True)
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
@@ -0,0 +1,190 @@
+# metrics.py
+"""Метрики бота в текстовом формате Prometheus.
+
+Счетчики и гистограммы живут в памяти процесса, /metrics отдает их
+текущие значения. Обновление метрики - поиск интервала (bisect) и пара
+сложений под блокировкой, поэтому инструментирование не выключается.
+Метрики обновляются и из потока БД, отсюда блокировки.
+"""
+import bisect
+import logging
+import threading
+from typing import Callable, Dict, Tuple
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# Границы гистограмм длительности, секунды
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+REGISTRY = []
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._values = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def _labels(self, values: tuple, extra: str = '') -> str:
+        pairs = [f'{name}="{_escape(value)}"' for name, value in zip(self.labelnames, values)]
+        if extra:
+            pairs.append(extra)
+        return '{' + ','.join(pairs) + '}' if pairs else ''
+
+    def _samples(self):
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+        lines += list(self._samples())
+        return '\n'.join(lines)
+
+
+class Counter(_Metric):
+    """Монотонный счетчик: inc(*значения меток)"""
+    kind = 'counter'
+
+    def inc(self, *labels, amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels) -> float:
+        return self._values.get(labels, 0)
+
+    def _samples(self):
+        with self._lock:
+            items = list(self._values.items())
+        for labels, value in items:
+            yield f'{self.name}{self._labels(labels)} {value}'
+
+
+class Histogram(_Metric):
+    """Гистограмма с фиксированными границами: observe(значение, *значения меток)"""
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, *labels):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(labels)
+            if state is None:
+                # Счетчики по интервалам (последний - +Inf) и сумма
+                state = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            state[0][index] += 1
+            state[1] += value
+
+    def _samples(self):
+        with self._lock:
+            items = [(labels, list(counts), total) for labels, (counts, total) in self._values.items()]
+        for labels, counts, total in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), counts):
+                cumulative += count
+                le = f'le="{bound}"'
+                yield f'{self.name}_bucket{self._labels(labels, le)} {cumulative}'
+            yield f'{self.name}_sum{self._labels(labels)} {total}'
+            yield f'{self.name}_count{self._labels(labels)} {cumulative}'
+
+
+class Gauge(_Metric):
+    """Текущее значение, вычисляемое при каждом запросе /metrics.
+
+    function возвращает {кортеж значений меток: значение}.
+    """
+    kind = 'gauge'
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        super().__init__(name, documentation, labelnames)
+        self.function: Callable[[], Dict[Tuple, float]] = dict
+
+    def set_function(self, function: Callable[[], Dict[Tuple, float]]):
+        self.function = function
+
+    def _samples(self):
+        try:
+            items = list(self.function().items())
+        except Exception as e:
+            logger.warning("Метрика %s не посчитана: %s", self.name, e)
+            return
+        for labels, value in items:
+            yield f'{self.name}{self._labels(labels)} {value}'
+
+
+class FunctionCounter(Gauge):
+    """Счетчик, который ведет чужой код (например, кэш); значения, как у Gauge, считает функция"""
+    kind = 'counter'
+
+
+def render() -> str:
+    """Все метрики в текстовом формате Prometheus"""
+    return '\n'.join(metric.render() for metric in REGISTRY) + '\n'
+
+
+updates_total = Counter('bot_updates_total', 'Updates received, by update type', ('type',))
+handler_calls_total = Counter(
+    'bot_handler_calls_total', 'Handler calls, by handler and result (ok, error)', ('handler', 'result')
+)
+handler_duration = Histogram('bot_handler_duration_seconds', 'Handler execution time', ('handler',))
+db_query_duration = Histogram(
+    'bot_db_query_duration_seconds', 'Database method execution time in the database thread', ('method',)
+)
+db_errors_total = Counter('bot_db_errors_total', 'Database method errors', ('method',))
+telegram_request_duration = Histogram(
+    'bot_telegram_request_duration_seconds', 'Telegram Bot API request time', ('method',)
+)
+telegram_errors_total = Counter(
+    'bot_telegram_errors_total', 'Telegram Bot API request errors, by exception type', ('method', 'error')
+)
+notifications_failed_total = Counter(
+    'bot_notifications_failed_total',
+    'Notifications given up on and marked failed, by reason (permanent error, attempts exhausted)', ('reason',)
+)
+fsm_states = Gauge('bot_fsm_states', 'Active conversations (cached FSM records), by state', ('state',))
+user_cache_lookups = FunctionCounter(
+    'bot_user_cache_lookups_total', 'User cache lookups since the database was opened, by result (hit, miss)',
+    ('result',)
+)
+
+
+class MetricsServer:
+    """HTTP-сервер только для /metrics (по умолчанию слушает localhost)"""
+
+    def __init__(self, host: str = None, port: int = None, path: str = None):
+        self.host = host or Config.METRICS_HOST
+        self.port = port if port is not None else Config.METRICS_PORT
+        self.path = path or Config.METRICS_PATH
+        self._runner = None
+
+    async def start(self):
+        from aiohttp import web
+
+        async def handle(request: web.Request) -> web.Response:
+            response = web.Response(text=render())
+            response.headers['Content-Type'] = 'text/plain; version=0.0.4; charset=utf-8'
+            return response
+
+        app = web.Application()
+        app.router.add_get(self.path, handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        logger.info("📈 Метрики: http://%s:%s%s", self.host, self.port, self.path)
+
+    async def close(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
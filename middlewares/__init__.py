@@ -0,0 +1,12 @@
+# Middlewares package
+from .dependencies import DependencyMiddleware
+from .metrics import HandlerMetricsMiddleware, TelegramMetricsMiddleware, UpdateMetricsMiddleware
+from .role import RoleMiddleware
+
+__all__ = [
+    'DependencyMiddleware',
+    'HandlerMetricsMiddleware',
+    'RoleMiddleware',
+    'TelegramMetricsMiddleware',
+    'UpdateMetricsMiddleware',
+]
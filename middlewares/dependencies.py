@@ -0,0 +1,21 @@
+# middlewares/dependencies.py
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+
+
+class DependencyMiddleware(BaseMiddleware):
+    """Передает общие объекты бота (БД и т.п.) в аргументы обработчиков"""
+
+    def __init__(self, **dependencies: Any):
+        self.dependencies = dependencies
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        data.update(self.dependencies)
+        return await handler(event, data)
@@ -0,0 +1,71 @@
+# middlewares/metrics.py
+import time
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.methods import TelegramMethod
+from aiogram.methods.base import Response, TelegramType
+from aiogram.types import TelegramObject, Update
+
+import metrics
+
+
+class UpdateMetricsMiddleware(BaseMiddleware):
+    """Считает входящие апдейты по типу (outer middleware на dp.update)"""
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        if isinstance(event, Update):
+            metrics.updates_total.inc(event.event_type)
+        return await handler(event, data)
+
+
+class HandlerMetricsMiddleware(BaseMiddleware):
+    """Число вызовов, ошибки и время работы каждого обработчика.
+
+    Регистрируется как inner middleware на наблюдателях диспетчера
+    (message, callback_query) и действует на обработчики всех роутеров.
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        handler_object = data.get('handler')
+        name = handler_object.callback.__name__ if handler_object else 'unknown'
+        started = time.perf_counter()
+        result = 'error'
+        try:
+            response = await handler(event, data)
+            result = 'ok'
+            return response
+        finally:
+            metrics.handler_duration.observe(time.perf_counter() - started, name)
+            metrics.handler_calls_total.inc(name, result)
+
+
+class TelegramMetricsMiddleware(BaseRequestMiddleware):
+    """Время и ошибки запросов к Bot API (middleware сессии бота)"""
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot,
+        method: TelegramMethod[TelegramType]
+    ) -> Response[TelegramType]:
+        name = type(method).__name__
+        started = time.perf_counter()
+        try:
+            return await make_request(bot, method)
+        except Exception as e:
+            metrics.telegram_errors_total.inc(name, type(e).__name__)
+            raise
+        finally:
+            metrics.telegram_request_duration.observe(time.perf_counter() - started, name)
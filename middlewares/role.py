@@ -0,0 +1,40 @@
+# middlewares/role.py
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+
+from database import AsyncDatabase
+
+
+class RoleMiddleware(BaseMiddleware):
+    """Определяет роль отправителя один раз на апдейт.
+
+    В аргументы обработчиков и фильтров передаются user (строка users
+    или None, если пользователь не зарегистрирован) и role: 'admin',
+    'worker' или None. Администраторы берутся из таблицы admins
+    (множество в памяти), профиль - из кэша пользователей.
+    """
+
+    def __init__(self, db: AsyncDatabase):
+        self.db = db
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        from_user = data.get('event_from_user')
+        user = role = None
+
+        if from_user is not None:
+            user = await self.db.get_user(from_user.id)
+            if await self.db.is_admin(from_user.id):
+                role = 'admin'
+            elif user is not None:
+                role = user['role']
+
+        data['user'] = user
+        data['role'] = role
+        return await handler(event, data)
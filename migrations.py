@@ -0,0 +1,349 @@
+# migrations.py
+"""Версионированные миграции схемы БД.
+
+Текущая версия схемы хранится в PRAGMA user_version. Каждая миграция
+применяется один раз, в отдельной транзакции вместе с повышением версии,
+поэтому существующий construction.db обновляется без потери данных.
+"""
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Границы интервалов гистограммы времени ответа, секунды: от минуты до
+# недели; все, что дольше, попадает в последний интервал
+LATENCY_BUCKETS = (60, 300, 900, 1800, 3600, 2 * 3600, 4 * 3600, 8 * 3600, 12 * 3600,
+                   86400, 2 * 86400, 3 * 86400, 7 * 86400)
+LATENCY_OVERFLOW = 10 ** 9
+
+
+def _latency_bucket(row: str) -> str:
+    """SQL-выражение: интервал гистограммы для времени от created_at до read_at строки row"""
+    seconds = f"(julianday({row}.read_at) - julianday({row}.created_at)) * 86400"
+    cases = ' '.join(f"WHEN {seconds} <= {bound} THEN {bound}" for bound in LATENCY_BUCKETS)
+    return f"CASE {cases} ELSE {LATENCY_OVERFLOW} END"
+
+
+def _counter_triggers(kind: str, table: str, worker_column: str) -> list:
+    """Триггеры, поддерживающие stat_counters и worker_counters для таблицы заданий"""
+    def add(row, delta):
+        return f'''
+            INSERT INTO stat_counters (kind, status, count) VALUES ('{kind}', {row}.status, {delta})
+            ON CONFLICT (kind, status) DO UPDATE SET count = count + {delta};
+            INSERT INTO worker_counters (worker_id, kind, status, count)
+            VALUES ({row}.{worker_column}, '{kind}', {row}.status, {delta})
+            ON CONFLICT (worker_id, kind, status) DO UPDATE SET count = count + {delta};'''
+
+    return [
+        f'''
+        CREATE TRIGGER IF NOT EXISTS {table}_counters_insert AFTER INSERT ON {table} BEGIN{add('new', 1)}
+        END
+        ''',
+        f'''
+        CREATE TRIGGER IF NOT EXISTS {table}_counters_update AFTER UPDATE OF status, {worker_column} ON {table}
+        WHEN old.status IS NOT new.status OR old.{worker_column} IS NOT new.{worker_column} BEGIN{add('old', -1)}{add('new', 1)}
+        END
+        ''',
+        f'''
+        CREATE TRIGGER IF NOT EXISTS {table}_counters_delete AFTER DELETE ON {table} BEGIN{add('old', -1)}
+        END
+        ''',
+    ]
+
+MIGRATIONS = [
+    (1, "Базовые таблицы", [
+        '''
+        CREATE TABLE IF NOT EXISTS users (
+            user_id INTEGER PRIMARY KEY,
+            username TEXT,
+            fio TEXT NOT NULL,
+            role TEXT DEFAULT 'worker',
+            registered_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS admin_tasks (
+            task_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            from_admin_id INTEGER NOT NULL,
+            to_worker_id INTEGER NOT NULL,
+            task_text TEXT NOT NULL,
+            status TEXT DEFAULT 'pending', -- pending, accepted, completed, commented
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            read_at TIMESTAMP,
+            completed_at TIMESTAMP,
+            worker_comment TEXT,
+            FOREIGN KEY (to_worker_id) REFERENCES users (user_id),
+            FOREIGN KEY (from_admin_id) REFERENCES users (user_id)
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS worker_tasks (
+            task_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            from_worker_id INTEGER NOT NULL,
+            task_text TEXT NOT NULL,
+            status TEXT DEFAULT 'pending', -- pending, approved, rejected
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            admin_comment TEXT,
+            reviewed_at TIMESTAMP,
+            reviewed_by INTEGER,
+            FOREIGN KEY (from_worker_id) REFERENCES users (user_id),
+            FOREIGN KEY (reviewed_by) REFERENCES users (user_id)
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS notifications (
+            notification_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            message TEXT NOT NULL,
+            is_read INTEGER DEFAULT 0,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users (user_id)
+        )
+        ''',
+    ]),
+    (2, "Индексы для частых запросов", [
+        # get_worker_tasks: WHERE to_worker_id = ? [AND status = ?] ORDER BY created_at DESC
+        'CREATE INDEX IF NOT EXISTS idx_admin_tasks_worker_created ON admin_tasks (to_worker_id, created_at)',
+        'CREATE INDEX IF NOT EXISTS idx_admin_tasks_worker_status_created ON admin_tasks (to_worker_id, status, created_at)',
+        # get_timeline_page, ветка admin_tasks: ORDER BY created_at
+        'CREATE INDEX IF NOT EXISTS idx_admin_tasks_created ON admin_tasks (created_at)',
+        # get_pending_worker_tasks: WHERE status = 'pending' ORDER BY created_at
+        'CREATE INDEX IF NOT EXISTS idx_worker_tasks_status_created ON worker_tasks (status, created_at)',
+        # get_worker_requests: WHERE from_worker_id = ? ORDER BY created_at DESC
+        'CREATE INDEX IF NOT EXISTS idx_worker_tasks_worker_created ON worker_tasks (from_worker_id, created_at)',
+        # get_all_workers / get_all_users: покрывающий индекс (user_id - это rowid)
+        'CREATE INDEX IF NOT EXISTS idx_users_role_fio ON users (role, fio)',
+    ]),
+    (3, "Хранилище состояний FSM", [
+        '''
+        CREATE TABLE IF NOT EXISTS fsm_storage (
+            key TEXT PRIMARY KEY,
+            state TEXT,
+            data TEXT,
+            updated_at REAL NOT NULL -- unix time последнего обращения
+        ) WITHOUT ROWID
+        ''',
+        'CREATE INDEX IF NOT EXISTS idx_fsm_storage_updated ON fsm_storage (updated_at)',
+    ]),
+    (4, "Очередь уведомлений (outbox)", [
+        "ALTER TABLE notifications ADD COLUMN reply_markup TEXT",
+        "ALTER TABLE notifications ADD COLUMN status TEXT DEFAULT 'pending'",  # pending, sent, failed
+        "ALTER TABLE notifications ADD COLUMN attempts INTEGER DEFAULT 0",
+        "ALTER TABLE notifications ADD COLUMN next_attempt_at TIMESTAMP",
+        "ALTER TABLE notifications ADD COLUMN sent_at TIMESTAMP",
+        "ALTER TABLE notifications ADD COLUMN last_error TEXT",
+        # Записи, созданные до outbox, не отправляем
+        "UPDATE notifications SET status = 'sent'",
+        'CREATE INDEX IF NOT EXISTS idx_notifications_due ON notifications (status, next_attempt_at)',
+    ]),
+    (5, "Индексы ленты заданий", [
+        # get_timeline_page: ветки UNION ALL с фильтром по статусу / без фильтров
+        'CREATE INDEX IF NOT EXISTS idx_admin_tasks_status_created ON admin_tasks (status, created_at)',
+        'CREATE INDEX IF NOT EXISTS idx_worker_tasks_created ON worker_tasks (created_at)',
+        'CREATE INDEX IF NOT EXISTS idx_worker_tasks_worker_status_created '
+        'ON worker_tasks (from_worker_id, status, created_at)',
+    ]),
+    (6, "Таблица администраторов", [
+        '''
+        CREATE TABLE IF NOT EXISTS admins (
+            user_id INTEGER PRIMARY KEY,
+            added_by INTEGER, -- NULL: из ADMIN_IDS
+            added_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        ''',
+        # Уже зарегистрированные администраторы
+        "INSERT OR IGNORE INTO admins (user_id) SELECT user_id FROM users WHERE role = 'admin'",
+    ]),
+    (7, "Поиск пользователей по ФИО (FTS5 trigram)", [
+        # Внешнее содержимое: индекс хранит только триграммы, ФИО - в users
+        "CREATE VIRTUAL TABLE IF NOT EXISTS users_fts USING fts5("
+        "fio, content='users', content_rowid='user_id', tokenize='trigram')",
+        '''
+        CREATE TRIGGER IF NOT EXISTS users_fts_insert AFTER INSERT ON users BEGIN
+            INSERT INTO users_fts (rowid, fio) VALUES (new.user_id, new.fio);
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS users_fts_delete AFTER DELETE ON users BEGIN
+            INSERT INTO users_fts (users_fts, rowid, fio) VALUES ('delete', old.user_id, old.fio);
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS users_fts_update AFTER UPDATE OF fio ON users BEGIN
+            INSERT INTO users_fts (users_fts, rowid, fio) VALUES ('delete', old.user_id, old.fio);
+            INSERT INTO users_fts (rowid, fio) VALUES (new.user_id, new.fio);
+        END
+        ''',
+        "INSERT INTO users_fts (users_fts) VALUES ('rebuild')",
+    ]),
+    (8, "Полнотекстовый поиск по заданиям (FTS5)", [
+        # Общий индекс двух таблиц: rowid = task_id * 2 для заданий
+        # администраторов и task_id * 2 + 1 для запросов работников,
+        # worker_id - для поиска только по своим заданиям
+        '''
+        CREATE VIRTUAL TABLE IF NOT EXISTS tasks_fts USING fts5(
+            task_text, comment, worker_id UNINDEXED,
+            tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3'
+        )
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS admin_tasks_fts_insert AFTER INSERT ON admin_tasks BEGIN
+            INSERT INTO tasks_fts (rowid, task_text, comment, worker_id)
+            VALUES (new.task_id * 2, new.task_text, new.worker_comment, new.to_worker_id);
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS admin_tasks_fts_update AFTER UPDATE OF task_text, worker_comment ON admin_tasks BEGIN
+            UPDATE tasks_fts SET task_text = new.task_text, comment = new.worker_comment
+            WHERE rowid = new.task_id * 2;
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS admin_tasks_fts_delete AFTER DELETE ON admin_tasks BEGIN
+            DELETE FROM tasks_fts WHERE rowid = old.task_id * 2;
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS worker_tasks_fts_insert AFTER INSERT ON worker_tasks BEGIN
+            INSERT INTO tasks_fts (rowid, task_text, comment, worker_id)
+            VALUES (new.task_id * 2 + 1, new.task_text, new.admin_comment, new.from_worker_id);
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS worker_tasks_fts_update AFTER UPDATE OF task_text, admin_comment ON worker_tasks BEGIN
+            UPDATE tasks_fts SET task_text = new.task_text, comment = new.admin_comment
+            WHERE rowid = new.task_id * 2 + 1;
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS worker_tasks_fts_delete AFTER DELETE ON worker_tasks BEGIN
+            DELETE FROM tasks_fts WHERE rowid = old.task_id * 2 + 1;
+        END
+        ''',
+        '''
+        INSERT INTO tasks_fts (rowid, task_text, comment, worker_id)
+        SELECT task_id * 2, task_text, worker_comment, to_worker_id FROM admin_tasks
+        ''',
+        '''
+        INSERT INTO tasks_fts (rowid, task_text, comment, worker_id)
+        SELECT task_id * 2 + 1, task_text, admin_comment, from_worker_id FROM worker_tasks
+        ''',
+    ]),
+    (9, "Сводная статистика (счетчики и гистограмма времени ответа)", [
+        # Счетчики по статусам: kind 'a' - admin_tasks, 'w' - worker_tasks,
+        # 'users' - пользователи по ролям (status = role)
+        '''
+        CREATE TABLE IF NOT EXISTS stat_counters (
+            kind TEXT NOT NULL,
+            status TEXT NOT NULL,
+            count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (kind, status)
+        ) WITHOUT ROWID
+        ''',
+        # Те же счетчики заданий в разрезе работников
+        '''
+        CREATE TABLE IF NOT EXISTS worker_counters (
+            worker_id INTEGER NOT NULL,
+            kind TEXT NOT NULL,
+            status TEXT NOT NULL,
+            count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (worker_id, kind, status)
+        ) WITHOUT ROWID
+        ''',
+        # Лучшие работники по статусу - без обхода всей таблицы
+        'CREATE INDEX IF NOT EXISTS idx_worker_counters_top ON worker_counters (kind, status, count)',
+        # Время от создания задания до ответа работника (read_at):
+        # bucket - верхняя граница интервала в секундах
+        '''
+        CREATE TABLE IF NOT EXISTS read_latency_hist (
+            bucket INTEGER PRIMARY KEY,
+            count INTEGER NOT NULL DEFAULT 0
+        )
+        ''',
+        *_counter_triggers('a', 'admin_tasks', 'to_worker_id'),
+        *_counter_triggers('w', 'worker_tasks', 'from_worker_id'),
+        f'''
+        CREATE TRIGGER IF NOT EXISTS admin_tasks_read_latency AFTER UPDATE OF read_at ON admin_tasks
+        WHEN old.read_at IS NULL AND new.read_at IS NOT NULL BEGIN
+            INSERT INTO read_latency_hist (bucket, count) VALUES ({_latency_bucket('new')}, 1)
+            ON CONFLICT (bucket) DO UPDATE SET count = count + 1;
+        END
+        ''',
+        f'''
+        CREATE TRIGGER IF NOT EXISTS admin_tasks_read_latency_delete AFTER DELETE ON admin_tasks
+        WHEN old.read_at IS NOT NULL BEGIN
+            UPDATE read_latency_hist SET count = count - 1 WHERE bucket = {_latency_bucket('old')};
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS users_counters_insert AFTER INSERT ON users BEGIN
+            INSERT INTO stat_counters (kind, status, count) VALUES ('users', new.role, 1)
+            ON CONFLICT (kind, status) DO UPDATE SET count = count + 1;
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS users_counters_update AFTER UPDATE OF role ON users
+        WHEN old.role IS NOT new.role BEGIN
+            UPDATE stat_counters SET count = count - 1 WHERE kind = 'users' AND status = old.role;
+            INSERT INTO stat_counters (kind, status, count) VALUES ('users', new.role, 1)
+            ON CONFLICT (kind, status) DO UPDATE SET count = count + 1;
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS users_counters_delete AFTER DELETE ON users BEGIN
+            UPDATE stat_counters SET count = count - 1 WHERE kind = 'users' AND status = old.role;
+        END
+        ''',
+        # Заполняем по уже накопленным данным
+        '''
+        INSERT INTO stat_counters (kind, status, count)
+        SELECT 'a', status, COUNT(*) FROM admin_tasks GROUP BY status
+        UNION ALL SELECT 'w', status, COUNT(*) FROM worker_tasks GROUP BY status
+        UNION ALL SELECT 'users', role, COUNT(*) FROM users GROUP BY role
+        ''',
+        '''
+        INSERT INTO worker_counters (worker_id, kind, status, count)
+        SELECT to_worker_id, 'a', status, COUNT(*) FROM admin_tasks GROUP BY to_worker_id, status
+        UNION ALL
+        SELECT from_worker_id, 'w', status, COUNT(*) FROM worker_tasks GROUP BY from_worker_id, status
+        ''',
+        f'''
+        INSERT INTO read_latency_hist (bucket, count)
+        SELECT {_latency_bucket('admin_tasks')} AS bucket, COUNT(*) FROM admin_tasks
+        WHERE read_at IS NOT NULL GROUP BY bucket
+        ''',
+    ]),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def get_schema_version(conn) -> int:
+    """Текущая версия схемы БД"""
+    return conn.execute('PRAGMA user_version').fetchone()[0]
+
+
+def migrate(conn) -> int:
+    """Применяем все недостающие миграции, возвращаем итоговую версию"""
+    current = get_schema_version(conn)
+    if current >= SCHEMA_VERSION:
+        # Обычный запуск: схема актуальна, достаточно одного чтения user_version
+        return current
+
+    for version, description, statements in MIGRATIONS:
+        if version <= current:
+            continue
+
+        try:
+            conn.execute('BEGIN')
+            for statement in statements:
+                conn.execute(statement)
+            conn.execute(f'PRAGMA user_version = {version}')
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+        logger.info("Применена миграция %s: %s", version, description)
+        current = version
+
+    return current
@@ -1,9 +1,5 @@
 # check_database.py
-import sys
-import os
-
-sys.path.append(os.path.dirname(os.path.abspath(__file__)))
-
+from config import Config
 from database import Database
 
 print("🧪 Проверка базы данных...")
@@ -50,6 +46,42 @@ try:
     for table in tables:
         print(f"  📁 {table[0]}")
 
+    # Проверяем, что частые запросы идут по индексам: вызываем сами методы
+    # чтения и смотрим планы запросов, которые перехватил профилировщик
+    print("\n🧭 Планы частых запросов:")
+    worker_id = workers[0][0] if workers else 1
+    hot_calls = [
+        ("get_worker_tasks", 'get_worker_tasks', (worker_id,), {}),
+        ("get_worker_tasks (status)", 'get_worker_tasks', (worker_id, 'pending'), {}),
+        ("get_worker_tasks_page", 'get_worker_tasks_page', (worker_id, Config.TASKS_PAGE_SIZE), {}),
+        ("get_pending_worker_tasks", 'get_pending_worker_tasks', (), {}),
+        ("get_worker_requests", 'get_worker_requests', (worker_id,), {}),
+        ("get_all_workers", 'get_all_workers', (), {}),
+        ("get_workers_page", 'get_workers_page', (Config.WORKERS_PAGE_SIZE, worker_id), {}),
+        ("search_workers (prefix)", 'search_workers', ('Ив', Config.WORKERS_PAGE_SIZE), {}),
+        ("get_timeline_page", 'get_timeline_page', (Config.TIMELINE_PAGE_SIZE,), {}),
+        ("get_timeline_page (status)", 'get_timeline_page', (Config.TIMELINE_PAGE_SIZE,), {'status': 'pending'}),
+        ("get_stats", 'get_stats', (), {}),
+    ]
+    hot_queries = []
+    for name, method, args, kwargs in hot_calls:
+        with db.profiler.capture() as queries:
+            getattr(db, method)(*args, **kwargs)
+        hot_queries += [(name, sql, params) for sql, params in queries]
+    # Выгрузка читает таблицы целиком, но по индексу и без сортировки в памяти
+    for filters in ({}, {'status': 'pending', 'date_from': '2024-01-01 00:00:00'}):
+        for kind, sql, params in db.get_export_queries(**filters):
+            hot_queries.append((f"get_export_queries ({kind}{', status' if filters else ''})", sql, tuple(params)))
+
+    # Счетчики и гистограмма статистики - десяток строк, их читают целиком
+    small_tables = {'stat_counters', 'read_latency_hist'}
+    for name, sql, params in hot_queries:
+        plan = db.profiler.explain(db.conn, sql, params)
+        uses_index = (any('INDEX' in line or 'PRIMARY KEY' in line or line.split()[-1] in small_tables
+                          for line in plan)
+                      and 'TEMP B-TREE' not in ' '.join(plan))
+        print(f"  {'✅' if uses_index else '❌'} {name}: {'; '.join(plan)}")
+
 except Exception as e:
     print(f"❌ Ошибка: {e}")
     import traceback
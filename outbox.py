@@ -0,0 +1,145 @@
+# outbox.py
+import asyncio
+import logging
+from typing import List, Optional
+
+from aiogram import Bot
+from aiogram.types import InlineKeyboardMarkup
+
+import metrics
+from broadcaster import Broadcaster, DeliveryResult
+from config import Config
+from database import AsyncDatabase
+
+logger = logging.getLogger(__name__)
+
+
+def make_notification(user_id: int, message: str, reply_markup: Optional[InlineKeyboardMarkup] = None) -> tuple:
+    """Строка для очереди уведомлений: (user_id, message, reply_markup в JSON)"""
+    markup = reply_markup.model_dump_json(exclude_none=True) if reply_markup else None
+    return user_id, message, markup
+
+
+class OutboxDispatcher:
+    """Фоновая отправка уведомлений из таблицы notifications.
+
+    Обработчики записывают уведомление в одной транзакции с изменением
+    задания и сразу отвечают пользователю, а диспетчер забирает очередь
+    пачками, отправляет через Broadcaster и повторяет неудачные попытки
+    с экспоненциальной задержкой. После max_attempts попыток (или при
+    постоянной ошибке, например бот заблокирован) уведомление помечается
+    как failed и остается в таблице для разбора; об этом пишется ошибка в
+    лог и растет счетчик bot_notifications_failed_total.
+    """
+
+    # На сколько секунд откладывается фоновая отправка уведомлений, которые
+    # обработчик отправляет сам через deliver() (массовая рассылка задания)
+    CLAIM_SECONDS = 300
+
+    def __init__(
+        self,
+        db: AsyncDatabase,
+        broadcaster: Broadcaster,
+        batch_size: int = None,
+        poll_interval: float = None,
+        max_attempts: int = None
+    ):
+        self.db = db
+        self.broadcaster = broadcaster
+        self.batch_size = batch_size or Config.OUTBOX_BATCH_SIZE
+        self.poll_interval = poll_interval or Config.OUTBOX_POLL_INTERVAL
+        self.max_attempts = max_attempts or Config.OUTBOX_MAX_ATTEMPTS
+
+        self._wakeup = asyncio.Event()
+        self._in_flight = set()
+        self._task = None
+
+    def wake(self):
+        """Сообщаем, что в очереди появились новые уведомления"""
+        self._wakeup.set()
+
+    def retry_delay(self, attempts: int) -> int:
+        """Задержка перед следующей попыткой, секунды"""
+        return min(Config.OUTBOX_RETRY_BASE * 2 ** attempts, 3600)
+
+    async def deliver(self, bot: Bot, notifications: list) -> List[DeliveryResult]:
+        """Отправляем строки очереди и записываем результат в БД"""
+        ids = [row['notification_id'] for row in notifications]
+        self._in_flight.update(ids)
+        try:
+            results = await self.broadcaster.send_many(bot, (
+                (
+                    row['user_id'],
+                    row['message'],
+                    {'reply_markup': InlineKeyboardMarkup.model_validate_json(row['reply_markup'])}
+                    if row['reply_markup'] else {}
+                )
+                for row in notifications
+            ))
+
+            sent, failed = [], []
+            for row, result in zip(notifications, results):
+                if result.ok:
+                    sent.append(row['notification_id'])
+                else:
+                    attempts = row['attempts'] + 1
+                    give_up = result.permanent or attempts >= self.max_attempts
+                    delay = None if give_up else self.retry_delay(attempts)
+                    failed.append((row['notification_id'], result.error, delay))
+                    if give_up:
+                        # Больше не отправляется - об этом должен узнать человек
+                        metrics.notifications_failed_total.inc('permanent' if result.permanent else 'attempts')
+                        logger.error(
+                            "Уведомление #%s для user_id=%s не доставлено и помечено failed (попыток: %s): %s",
+                            row['notification_id'], row['user_id'], attempts, result.error
+                        )
+
+            if sent:
+                await self.db.mark_notifications_sent(sent)
+            if failed:
+                await self.db.mark_notifications_failed(failed)
+                logger.warning("Не доставлено уведомлений: %s из %s", len(failed), len(results))
+            return results
+        finally:
+            self._in_flight.difference_update(ids)
+
+    async def drain(self, bot: Bot) -> int:
+        """Отправляем все уведомления, которые пора отправить; возвращаем их число"""
+        total = 0
+        while True:
+            batch = await self.db.get_due_notifications(self.batch_size, list(self._in_flight))
+            if not batch:
+                return total
+            await self.deliver(bot, batch)
+            total += len(batch)
+
+    async def _run(self, bot: Bot):
+        while True:
+            # asyncio.timeout, а не wait_for: в Python 3.11 wait_for теряет отмену,
+            # пришедшую одновременно с wake(), и close() ждет следующего опроса
+            try:
+                async with asyncio.timeout(self.poll_interval):
+                    await self._wakeup.wait()
+            except TimeoutError:
+                pass
+            self._wakeup.clear()
+
+            try:
+                await self.drain(bot)
+            except Exception as e:
+                logger.error("Ошибка отправки очереди уведомлений: %s", e)
+
+    async def start(self, bot: Bot):
+        """Запускаем фоновую отправку (вызывается при старте бота)"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(bot))
+            self.wake()
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
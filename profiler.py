@@ -0,0 +1,203 @@
+# profiler.py
+import logging
+import re
+import sqlite3
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from functools import lru_cache
+
+logger = logging.getLogger(__name__)
+
+# Списки параметров IN (?, ?, ...) разной длины - один и тот же запрос
+_PLACEHOLDERS = re.compile(r'\?(\s*,\s*\?)+')
+_EXPLAINABLE = ('SELECT', 'INSERT', 'UPDATE', 'DELETE', 'WITH', 'REPLACE')
+
+
+@lru_cache(maxsize=1024)
+def normalize_sql(sql: str) -> str:
+    """Текст запроса для группировки: без лишних пробелов и длины списков IN"""
+    return _PLACEHOLDERS.sub('?, ...', ' '.join(sql.split()))
+
+
+class QueryProfiler:
+    """Статистика SQL-запросов: вызовы, суммарное и максимальное время, строки, места вызова.
+
+    Запросы дольше slow_ms пишутся в лог вместе с EXPLAIN QUERY PLAN.
+    Потокобезопасен: им пользуются и поток БД, и соединения выгрузки.
+    """
+
+    def __init__(self, slow_ms: float = 100):
+        self.slow_seconds = slow_ms / 1000
+        self._stats = {}
+        self._captures = []
+        self._lock = threading.Lock()
+
+    def record(self, conn, sql: str, params, elapsed: float, rows: int, site: str):
+        key = normalize_sql(sql)
+        with self._lock:
+            stats = self._stats.get(key)
+            if stats is None:
+                stats = self._stats[key] = {'calls': 0, 'total': 0.0, 'max': 0.0, 'rows': 0, 'sites': set()}
+            stats['calls'] += 1
+            stats['total'] += elapsed
+            stats['max'] = max(stats['max'], elapsed)
+            stats['rows'] += max(rows, 0)
+            stats['sites'].add(site)
+            for queries in self._captures:
+                queries.append((sql, params))
+
+        if elapsed >= self.slow_seconds:
+            logger.warning(
+                "Медленный запрос %.1f мс (%s, строк: %s): %s\nПлан: %s",
+                elapsed * 1000, site, rows, key, '; '.join(self.explain(conn, sql, params)) or '-'
+            )
+
+    @staticmethod
+    def explain(conn, sql: str, params) -> list:
+        """EXPLAIN QUERY PLAN мимо профилировщика; пустой список, если план получить нельзя"""
+        if not sql.lstrip().upper().startswith(_EXPLAINABLE):
+            return []
+        try:
+            cursor = sqlite3.Cursor(conn)
+            sqlite3.Cursor.execute(cursor, 'EXPLAIN QUERY PLAN ' + sql, params)
+            return [row[-1] for row in sqlite3.Cursor.fetchall(cursor)]
+        except sqlite3.Error as e:
+            return [f"нет плана: {e}"]
+
+    @contextmanager
+    def capture(self):
+        """Список (sql, params) всех запросов, выполненных внутри блока, - например, для проверки планов"""
+        queries = []
+        with self._lock:
+            self._captures.append(queries)
+        try:
+            yield queries
+        finally:
+            with self._lock:
+                self._captures.remove(queries)
+
+    def top(self, limit: int = 10) -> list:
+        """Запросы с наибольшим суммарным временем"""
+        with self._lock:
+            items = [(sql, dict(stats, sites=sorted(stats['sites']))) for sql, stats in self._stats.items()]
+        items.sort(key=lambda item: item[1]['total'], reverse=True)
+        return [dict(stats, sql=sql) for sql, stats in items[:limit]]
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+
+class ProfilingCursor(sqlite3.Cursor):
+    """Курсор, который замеряет выполнение запроса вместе с чтением строк.
+
+    SQLite выполняет SELECT по мере чтения, поэтому время и число строк
+    копятся в execute и fetch*, а в профилировщик запрос попадает, когда
+    строки прочитаны до конца, курсор выполняет следующий запрос или
+    удаляется.
+    """
+
+    _query = None
+
+    def _site(self) -> str:
+        # Первый кадр вне этого модуля - метод Database, который выполнил запрос
+        frame = sys._getframe(2)
+        while frame is not None and frame.f_code.co_filename == __file__:
+            frame = frame.f_back
+        return frame.f_code.co_name if frame is not None else '?'
+
+    def _timed(self, method, *args):
+        started = time.perf_counter()
+        try:
+            return method(self, *args)
+        finally:
+            self._query[3] += time.perf_counter() - started
+
+    def _finish(self):
+        query, self._query = self._query, None
+        if query is not None:
+            sql, params, site, elapsed, rows = query
+            self.connection.profiler.record(self.connection, sql, params, elapsed, rows, site)
+
+    def _start(self, method, sql, params, explain_params):
+        self._finish()
+        self._query = [sql, explain_params, self._site(), 0.0, 0]
+        try:
+            self._timed(method, sql, params)
+        except Exception:
+            self._finish()
+            raise
+        if self.description is None:
+            # Запрос без результата (INSERT/UPDATE/DDL) уже выполнен
+            self._query[4] = self.rowcount
+            self._finish()
+        return self
+
+    def execute(self, sql, parameters=()):
+        return self._start(sqlite3.Cursor.execute, sql, parameters, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        seq_of_parameters = list(seq_of_parameters)
+        return self._start(sqlite3.Cursor.executemany, sql, seq_of_parameters,
+                           seq_of_parameters[0] if seq_of_parameters else ())
+
+    def fetchone(self):
+        if self._query is None:
+            return sqlite3.Cursor.fetchone(self)
+        row = self._timed(sqlite3.Cursor.fetchone)
+        if row is None:
+            self._finish()
+        else:
+            self._query[4] += 1
+        return row
+
+    def fetchmany(self, size=None):
+        if self._query is None:
+            return sqlite3.Cursor.fetchmany(self, size or self.arraysize)
+        rows = self._timed(sqlite3.Cursor.fetchmany, size or self.arraysize)
+        self._query[4] += len(rows)
+        if not rows:
+            self._finish()
+        return rows
+
+    def fetchall(self):
+        if self._query is None:
+            return sqlite3.Cursor.fetchall(self)
+        rows = self._timed(sqlite3.Cursor.fetchall)
+        self._query[4] += len(rows)
+        self._finish()
+        return rows
+
+    def __next__(self):
+        row = self.fetchone()
+        if row is None:
+            raise StopIteration
+        return row
+
+    def close(self):
+        self._finish()
+        super().close()
+
+    def __del__(self):
+        try:
+            self._finish()
+        except Exception:
+            pass
+
+
+class ProfilingConnection(sqlite3.Connection):
+    """Соединение, все запросы которого (в том числе conn.execute) идут через ProfilingCursor"""
+
+    profiler: QueryProfiler = None
+
+    def cursor(self, factory=ProfilingCursor):
+        return super().cursor(factory)
+
+    # Connection.execute в C создает курсор в обход cursor().execute
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
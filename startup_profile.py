@@ -0,0 +1,163 @@
+# startup_profile.py
+"""Профиль холодного старта (bot.py --startup-profile).
+
+Время импорта каждого модуля (собственное и вместе с вложенными
+импортами) замеряется через обертку загрузчиков в sys.meta_path, этапы
+запуска отмечаются mark(). Отчет печатается в stderr, когда бот готов
+принимать апдейты, и еще одна строка - после первого обработанного
+апдейта. Отсчет идет от старта процесса (на Linux - по /proc), так что
+в итог попадает и запуск интерпретатора.
+
+Без флага профиль выключен и ничего не делает.
+"""
+import os
+import sys
+import time
+
+TOP_MODULES = 25
+
+
+def _process_started() -> float:
+    """Момент старта процесса по шкале time.perf_counter()"""
+    now = time.perf_counter()
+    try:
+        with open('/proc/self/stat') as file:
+            # Поле 22 - время старта в тиках с загрузки системы; имя процесса в скобках может содержать пробелы
+            start_ticks = int(file.read().rsplit(')', 1)[1].split()[19])
+        age = time.clock_gettime(time.CLOCK_BOOTTIME) - start_ticks / os.sysconf('SC_CLK_TCK')
+        return now - max(age, 0.0)
+    except (OSError, ValueError, IndexError, AttributeError):
+        return now
+
+
+class _TimedLoader:
+    """Загрузчик-обертка: замеряет exec_module, остальное передает исходному"""
+
+    def __init__(self, loader, profile: 'StartupProfile'):
+        self._loader = loader
+        self._profile = profile
+
+    def __getattr__(self, name):
+        return getattr(self._loader, name)
+
+    def create_module(self, spec):
+        return self._loader.create_module(spec)
+
+    def exec_module(self, module):
+        self._profile._enter(module.__name__)
+        try:
+            self._loader.exec_module(module)
+        finally:
+            self._profile._exit(module.__name__, self._loader)
+
+
+class _TimingFinder:
+    """Первый элемент sys.meta_path: находит модуль остальными искателями и оборачивает загрузчик"""
+
+    def __init__(self, profile: 'StartupProfile'):
+        self._profile = profile
+
+    def find_spec(self, name, path=None, target=None):
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, 'find_spec'):
+                continue
+            spec = finder.find_spec(name, path, target)
+            if spec is not None:
+                if spec.loader is not None and hasattr(spec.loader, 'exec_module'):
+                    spec.loader = _TimedLoader(spec.loader, self._profile)
+                return spec
+        return None
+
+
+class StartupProfile:
+    """Импорты модулей и этапы запуска с моментами от старта процесса"""
+
+    def __init__(self):
+        self.enabled = False
+        self.started_at = None
+        self.imports = {}  # модуль: [всего, собственное время]
+        self.marks = []  # (этап, момент)
+        self._stack = []
+        self._finder = None
+        self._first_update = True
+
+    def enable(self):
+        """Включаем профиль; вызывать до импорта профилируемых модулей"""
+        if self.enabled:
+            return
+        self.enabled = True
+        self.started_at = _process_started()
+        self.marks.append(('интерпретатор и импорты до профиля', time.perf_counter()))
+        self._finder = _TimingFinder(self)
+        sys.meta_path.insert(0, self._finder)
+
+    def _enter(self, name: str):
+        self._stack.append([name, time.perf_counter(), 0.0])
+
+    def _exit(self, name: str, loader):
+        _, started, children = self._stack.pop()
+        elapsed = time.perf_counter() - started
+        self.imports[name] = [elapsed, elapsed - children]
+        if self._stack:
+            self._stack[-1][2] += elapsed
+        # Модулю возвращаем исходный загрузчик
+        module = sys.modules.get(name)
+        if module is not None and getattr(module, '__spec__', None) is not None:
+            module.__spec__.loader = loader
+            module.__loader__ = loader
+
+    def mark(self, stage: str):
+        """Этап запуска завершен"""
+        if self.enabled:
+            self.marks.append((stage, time.perf_counter()))
+
+    def marker(self, stage: str):
+        """Обработчик dp.startup, отмечающий этап"""
+        async def mark_stage():
+            self.mark(stage)
+        return mark_stage
+
+    async def on_update(self, handler, event, data):
+        """Внешний middleware dp.update: время до первого обработанного апдейта"""
+        try:
+            return await handler(event, data)
+        finally:
+            if self._first_update:
+                self._first_update = False
+                self.mark('первый апдейт обработан')
+                print(f"⏱ От старта процесса до обработки первого апдейта: "
+                      f"{(time.perf_counter() - self.started_at) * 1000:.0f} мс", file=sys.stderr, flush=True)
+
+    def report(self, top: int = TOP_MODULES) -> str:
+        """Этапы запуска и самые долгие импорты"""
+        lines = ['⏱ Профиль запуска (мс от старта процесса / длительность этапа):']
+        previous = self.started_at
+        for stage, moment in self.marks:
+            lines.append(f"  {(moment - self.started_at) * 1000:8.1f}  {(moment - previous) * 1000:8.1f}  {stage}")
+            previous = moment
+
+        packages = {}
+        for name, (_, own) in self.imports.items():
+            package = name.split('.')[0]
+            packages[package] = packages.get(package, 0.0) + own
+        lines.append('Импорт по пакетам, мс:')
+        for package, own in sorted(packages.items(), key=lambda item: item[1], reverse=True)[:top]:
+            lines.append(f"  {own * 1000:8.1f}  {package}")
+
+        lines.append("Самые долгие модули, мс (собственное время / вместе с вложенными импортами):")
+        modules = sorted(self.imports.items(), key=lambda item: item[1][1], reverse=True)
+        for name, (total, own) in modules[:top]:
+            lines.append(f"  {own * 1000:8.1f}  {total * 1000:8.1f}  {name}")
+        return '\n'.join(lines)
+
+    async def ready(self):
+        """Бот готов принимать апдейты: печатаем отчет и перестаем замерять импорты"""
+        if not self.enabled:
+            return
+        self.mark('готов к приему апдейтов')
+        if self._finder in sys.meta_path:
+            sys.meta_path.remove(self._finder)
+        print(self.report(), file=sys.stderr, flush=True)
+
+
+startup_profile = StartupProfile()
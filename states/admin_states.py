@@ -4,4 +4,6 @@ class AdminStates(StatesGroup):
     """Состояния для администратора"""
     waiting_for_worker_selection = State()  # Ожидание выбора работника
     waiting_for_task_text = State()         # Ожидание текста задания
-    waiting_for_comment_review = State()    # Ожидание рассмотрения комментария работника
\ No newline at end of file
+    waiting_for_comment_review = State()    # Ожидание рассмотрения комментария работника
+    waiting_for_bulk_task_text = State()    # Ожидание текста задания для нескольких работников
+    waiting_for_import_file = State()       # Ожидание файла для импорта
@@ -0,0 +1,107 @@
+# tests/conftest.py
+import asyncio
+import sqlite3
+from datetime import datetime
+
+import pytest
+from aiogram import Bot
+from aiogram.client.default import DefaultBotProperties
+from aiogram.client.session.base import BaseSession
+from aiogram.methods import SendMessage
+from aiogram.types import CallbackQuery, Chat, Message, Update, User
+
+from database import AsyncDatabase
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / 'test.db')
+
+
+def committed(db_path: str, sql: str, params: tuple = ()) -> list:
+    """Строки, которые видит другое соединение, - то есть только зафиксированные"""
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute(sql, params).fetchall()
+    finally:
+        conn.close()
+
+
+def run_with_db(db_path: str, scenario, group_commit_ms: int = 5):
+    """Выполняем scenario(db) с открытой AsyncDatabase"""
+    async def main():
+        db = AsyncDatabase(db_path, group_commit_ms=group_commit_ms)
+        await db.connect()
+        try:
+            return await scenario(db)
+        finally:
+            await db.close()
+
+    return asyncio.run(main())
+
+
+class RecordingSession(BaseSession):
+    """Сессия бота без сети: запоминает запросы к Bot API"""
+
+    def __init__(self):
+        super().__init__()
+        self.requests = []
+
+    async def make_request(self, bot, method, timeout=None):
+        self.requests.append(method)
+        if isinstance(method, SendMessage):
+            return Message(
+                message_id=len(self.requests), date=datetime.now(),
+                chat=Chat(id=method.chat_id, type='private'), text=method.text
+            )
+        return True
+
+    async def stream_content(self, *args, **kwargs):
+        raise NotImplementedError
+
+    async def close(self):
+        pass
+
+
+def feed_updates(db_path: str, scenario, *updates: Update) -> list:
+    """Прогоняем апдейты через диспетчер бота; возвращаем запросы к Bot API.
+
+    scenario(db) готовит данные до первого апдейта.
+    """
+    from bot import create_dispatcher
+
+    async def main():
+        db = AsyncDatabase(db_path, group_commit_ms=0)
+        dp = create_dispatcher(db)
+        session = RecordingSession()
+        bot = Bot('42:TEST', session=session, default=DefaultBotProperties(parse_mode='HTML'))
+        await dp.emit_startup(bot=bot)
+        try:
+            await scenario(db)
+            for update in updates:
+                await dp.feed_update(bot, update)
+        finally:
+            await dp.emit_shutdown(bot=bot)
+            # Роутеры обработчиков - модульные объекты: отцепляем их для следующего диспетчера
+            for router in dp.sub_routers:
+                router._parent_router = None
+            dp.sub_routers.clear()
+        return session.requests
+
+    return asyncio.run(main())
+
+
+def callback_update(user_id: int, data: str) -> Update:
+    """Нажатие инлайн-кнопки пользователем user_id"""
+    return Update(update_id=1, callback_query=CallbackQuery(
+        id='1', chat_instance='1', data=data, from_user=User(id=user_id, is_bot=False, first_name='Тест'),
+        message=Message(message_id=1, date=datetime.now(), text='Кнопки', chat=Chat(id=user_id, type='private'))
+    ))
+
+
+def message_update(user_id: int, text: str) -> Update:
+    """Текстовое сообщение от пользователя user_id"""
+    return Update(update_id=1, message=Message(
+        message_id=1, date=datetime.now(), text=text,
+        chat=Chat(id=user_id, type='private'), from_user=User(id=user_id, is_bot=False, first_name='Тест')
+    ))
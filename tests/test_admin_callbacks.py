@@ -0,0 +1,35 @@
+# tests/test_admin_callbacks.py
+"""Ответ на кнопки администратора, которые не обработал ни один обработчик"""
+from aiogram.methods import AnswerCallbackQuery
+
+from conftest import callback_update, feed_updates
+
+ADMIN_ID = 1
+WORKER_ID = 2
+
+
+async def add_users(db):
+    await db.add_admin(ADMIN_ID, ADMIN_ID)
+    await db.add_user(WORKER_ID, None, 'Иванов Иван')
+
+
+def answers(requests) -> list:
+    return [request.text for request in requests if isinstance(request, AnswerCallbackQuery)]
+
+
+def test_admin_old_picker_button_is_stale_not_denied(db_path):
+    # Диалог выбора работника уже завершен - состояния нет
+    requests = feed_updates(
+        db_path, add_users,
+        callback_update(ADMIN_ID, f'select_worker:{WORKER_ID}'),
+        callback_update(ADMIN_ID, 'workers:next:2'),
+        callback_update(ADMIN_ID, 'bulk:done:0'),
+    )
+
+    assert answers(requests) == ["⌛ Выбор устарел, начните заново из меню."] * 3
+
+
+def test_worker_admin_button_is_denied(db_path):
+    requests = feed_updates(db_path, add_users, callback_update(WORKER_ID, f'select_worker:{WORKER_ID}'))
+
+    assert answers(requests) == ["⛔ У вас нет прав администратора!"]
@@ -0,0 +1,57 @@
+# tests/test_admin_tasks_many.py
+"""Пачка заданий возвращает ровно свои строки и пишется целиком или никак"""
+import sqlite3
+
+import pytest
+
+from conftest import committed, run_with_db
+
+
+def notify(task_id, worker_id, task_text):
+    return [(worker_id, f"Задание #{task_id}: {task_text}", None)]
+
+
+async def add_workers(db):
+    for worker_id in (2, 3):
+        await db.add_user(worker_id, None, f'Работник {worker_id}')
+
+
+def test_returns_created_rows(db_path):
+    async def scenario(db):
+        await add_workers(db)
+        # Чужие строки в очереди и в заданиях не должны попасть в результат
+        await db.add_admin_task(1, 3, 'Старое задание', notify=lambda task_id: [(3, 'старое', None)])
+        tasks, notifications = await db.add_admin_tasks_many(
+            1, [(2, 'Залить бетон'), (99, 'Не работник'), (3, 'Поставить леса')], notify=notify
+        )
+        return [tuple(row) for row in tasks], [tuple(row) for row in notifications]
+
+    tasks, notifications = run_with_db(db_path, scenario)
+
+    assert tasks == committed(db_path, '''
+        SELECT task_id, to_worker_id, task_text FROM admin_tasks WHERE task_text != 'Старое задание' ORDER BY task_id
+    ''')
+    assert [(worker_id, text) for _, worker_id, text in tasks] == [(2, 'Залить бетон'), (3, 'Поставить леса')]
+    assert notifications == committed(db_path, '''
+        SELECT notification_id, user_id, message, reply_markup, attempts
+        FROM notifications WHERE message != 'старое' ORDER BY notification_id
+    ''')
+    assert [row[2] for row in notifications] == [f"Задание #{task_id}: {text}" for task_id, _, text in tasks]
+
+
+@pytest.mark.parametrize('group_commit_ms', [0, 5])
+def test_failed_notification_rolls_back_whole_batch(db_path, group_commit_ms):
+    def broken_notify(task_id, worker_id, task_text):
+        return [(None if worker_id == 3 else worker_id, task_text, None)]
+
+    async def scenario(db):
+        await add_workers(db)
+        with pytest.raises(sqlite3.IntegrityError):
+            await db.add_admin_tasks_many(1, [(2, 'Залить бетон'), (3, 'Поставить леса')], notify=broken_notify)
+        await db.add_worker_task(2, 'Нужен кран к девяти')
+
+    run_with_db(db_path, scenario, group_commit_ms)
+
+    assert committed(db_path, 'SELECT COUNT(*) FROM admin_tasks') == [(0,)]
+    assert committed(db_path, 'SELECT COUNT(*) FROM notifications') == [(0,)]
+    assert committed(db_path, 'SELECT COUNT(*) FROM worker_tasks') == [(1,)]
@@ -0,0 +1,57 @@
+# tests/test_admin_timeline.py
+"""Лента в обработчиках администратора: часовой пояс периодов, экранирование, ошибки Telegram"""
+import asyncio
+import time
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.methods import EditMessageText
+
+from handlers.admin import edit_timeline_message, get_timeline_query, render_timeline_card
+
+
+@pytest.fixture
+def moscow_time(monkeypatch):
+    monkeypatch.setenv('TZ', 'Europe/Moscow')
+    time.tzset()
+    yield
+    monkeypatch.undo()
+    time.tzset()
+
+
+def test_today_and_custom_period_use_local_days(moscow_time):
+    today = get_timeline_query({'period': 'today'})
+    midnight = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    # Москва - UTC+3 без перехода на летнее время
+    assert today['date_from'] == (midnight - timedelta(hours=3)).strftime('%Y-%m-%d %H:%M:%S')
+
+    custom = get_timeline_query({
+        'period': 'custom', 'date_from': '2024-05-01 00:00:00', 'date_to': '2024-05-02 00:00:00'
+    })
+    assert (custom['date_from'], custom['date_to']) == ('2024-04-30 21:00:00', '2024-05-01 21:00:00')
+
+
+def test_card_escapes_user_content(moscow_time):
+    card = render_timeline_card({
+        'kind': 'a', 'task_id': 1, 'status': 'pending', 'created_at': '2024-04-30 21:30:00',
+        'task_text': 'Залить <b>бетон</b> & убрать', 'admin_fio': 'Админ <i>', 'worker_fio': 'Иванов & Ко',
+    })
+    assert 'Залить &lt;b&gt;бетон&lt;/b&gt; &amp; убрать' in card
+    assert 'Админ &lt;i&gt;' in card and 'Иванов &amp; Ко' in card
+    assert '01.05.2024 00:30' in card
+
+
+def edit_failing_with(text: str):
+    async def edit_text(*args, **kwargs):
+        raise TelegramBadRequest(EditMessageText(text='-'), text)
+    return SimpleNamespace(message=SimpleNamespace(edit_text=edit_text))
+
+
+def test_only_not_modified_error_is_ignored():
+    not_modified = 'Bad Request: message is not modified: specified new message content is the same'
+    asyncio.run(edit_timeline_message(edit_failing_with(not_modified), 'текст', None))
+
+    with pytest.raises(TelegramBadRequest):
+        asyncio.run(edit_timeline_message(edit_failing_with("Bad Request: can't parse entities"), 'текст', None))
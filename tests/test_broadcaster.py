@@ -0,0 +1,55 @@
+# tests/test_broadcaster.py
+"""Ответ RetryAfter останавливает всю отправку бота, а не только один чат"""
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import SendMessage
+
+from broadcaster import Broadcaster, TokenBucket
+
+
+class FloodedBot:
+    """Первая отправка в чат 1 получает RetryAfter, остальные проходят"""
+
+    def __init__(self, retry_after: int):
+        self.retry_after = retry_after
+        self.flooded_at = None
+        self.sent = []
+
+    async def send_message(self, chat_id, text, **kwargs):
+        loop = asyncio.get_running_loop()
+        if chat_id == 1 and self.flooded_at is None:
+            self.flooded_at = loop.time()
+            raise TelegramRetryAfter(SendMessage(chat_id=chat_id, text=text), 'Flood control exceeded',
+                                     self.retry_after)
+        self.sent.append((chat_id, loop.time()))
+        return SimpleNamespace(message_id=len(self.sent))
+
+
+def test_retry_after_pauses_other_chats():
+    async def main():
+        broadcaster = Broadcaster(global_rate=100, chat_rate=100, max_retries=1)
+        bot = FloodedBot(retry_after=1)
+        flooded = asyncio.ensure_future(broadcaster.send(bot, 1, 'первое'))
+        await asyncio.sleep(0.05)
+        other = await broadcaster.send(bot, 2, 'второе')
+        return bot, await flooded, other
+
+    bot, flooded, other = asyncio.run(main())
+
+    assert flooded.ok and other.ok
+    assert sorted(chat_id for chat_id, _ in bot.sent) == [1, 2]
+    assert all(moment - bot.flooded_at >= 0.95 for _, moment in bot.sent)
+
+
+def test_pauses_do_not_add_up():
+    async def main():
+        bucket = TokenBucket(rate=10, capacity=10)
+        bucket.pause(1)
+        bucket.pause(1)
+        bucket.pause(0.5)
+        return bucket.tokens
+
+    assert asyncio.run(main()) == pytest.approx(-10, abs=0.01)
@@ -0,0 +1,62 @@
+# tests/test_fsm_storage.py
+"""Состояния, которые не удалось записать в БД, не теряются и уходят следующим сбросом"""
+import asyncio
+import sqlite3
+
+import pytest
+from aiogram.fsm.storage.base import StorageKey
+
+from conftest import committed, run_with_db
+from fsm_storage import SQLiteStorage
+
+KEY = StorageKey(bot_id=1, chat_id=2, user_id=2)
+
+
+def test_failed_flush_keeps_dirty_records(db_path):
+    async def scenario(db):
+        storage = SQLiteStorage(db, ttl=3600, flush_interval=60)
+        await storage.set_state(KEY, 'AdminStates:waiting_for_task_text')
+        await storage.set_data(KEY, {'worker_id': 2})
+
+        save_fsm_records = db.save_fsm_records
+
+        async def failing(records):
+            raise sqlite3.OperationalError('database is locked')
+
+        db.save_fsm_records = failing
+        with pytest.raises(sqlite3.OperationalError):
+            await storage.flush()
+
+        db.save_fsm_records = save_fsm_records
+        await storage.flush()
+
+    run_with_db(db_path, scenario)
+
+    assert committed(db_path, 'SELECT state, data FROM fsm_storage') == [
+        ('AdminStates:waiting_for_task_text', '{"worker_id":2}')
+    ]
+
+
+def test_close_during_slow_save_keeps_records(db_path):
+    async def scenario(db):
+        storage = SQLiteStorage(db, ttl=3600, flush_interval=0.01)
+        await storage.start()
+        await storage.set_state(KEY, 'AdminStates:waiting_for_task_text')
+
+        save_fsm_records = db.save_fsm_records
+        saving = asyncio.Event()
+
+        async def slow(records):
+            saving.set()
+            await asyncio.sleep(10)
+            return await save_fsm_records(records)
+
+        db.save_fsm_records = slow
+        await asyncio.wait_for(saving.wait(), 5)
+        # Фоновый сброс отменяется посреди записи
+        db.save_fsm_records = save_fsm_records
+        await asyncio.wait_for(storage.close(), 5)
+
+    run_with_db(db_path, scenario)
+
+    assert committed(db_path, 'SELECT state FROM fsm_storage') == [('AdminStates:waiting_for_task_text',)]
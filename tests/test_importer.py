@@ -0,0 +1,44 @@
+# tests/test_importer.py
+"""Неверные строки файла импорта становятся ошибками строк, а не прерывают импорт"""
+from conftest import committed, run_with_db
+from importer import import_file
+
+WORKERS_CSV = (
+    "user_id;fio\n"
+    "2;Иванов Иван\n"
+    "0;Нулев Ноль\n"
+    "9223372036854775808;Большов Борис\n"
+    "100000000000000000000;Огромнов Олег\n"
+    "9223372036854775807;Петров Петр\n"
+)
+
+
+def test_out_of_range_user_ids_are_row_errors(db_path, tmp_path):
+    path = tmp_path / 'workers.csv'
+    path.write_text(WORKERS_CSV, encoding='utf-8')
+
+    async def scenario(db):
+        return await import_file(db, str(path), 'workers.csv', admin_id=1)
+
+    report = run_with_db(db_path, scenario)
+
+    assert (report.total, report.imported, report.errors) == (5, 2, 3)
+    assert [error.split(':')[0] for error in report.first_errors] == ['строка 3', 'строка 4', 'строка 5']
+    assert committed(db_path, 'SELECT user_id FROM users ORDER BY user_id') == [(2,), (2 ** 63 - 1,)]
+
+
+def test_report_escapes_file_name_and_cell_values(db_path, tmp_path):
+    from handlers.admin import render_import_report
+
+    path = tmp_path / 'workers.csv'
+    path.write_text("user_id;fio\n<b>&1;Иванов Иван\n3;Петров Петр\n", encoding='utf-8')
+
+    async def scenario(db):
+        return await import_file(db, str(path), 'a<b>.csv', admin_id=1)
+
+    report = run_with_db(db_path, scenario)
+    text = render_import_report('a<b>.csv', report)
+
+    assert '«a&lt;b&gt;.csv»' in text
+    assert '&lt;b&gt;&amp;1' in text
+    assert '<b>' not in text
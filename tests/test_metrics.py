@@ -0,0 +1,23 @@
+# tests/test_metrics.py
+"""Попадания и промахи кэша пользователей видны в /metrics"""
+import metrics
+from conftest import run_with_db
+
+
+def test_user_cache_lookups_exported(db_path):
+    async def scenario(db):
+        metrics.user_cache_lookups.set_function(db.count_user_cache)
+        try:
+            await db.add_user(2, None, 'Иванов Иван')
+            await db.get_user(2)  # промах - загрузка из БД
+            await db.get_user(2)
+            await db.get_user(2)
+            return metrics.render()
+        finally:
+            metrics.user_cache_lookups.set_function(dict)
+
+    text = run_with_db(db_path, scenario)
+
+    assert '# TYPE bot_user_cache_lookups_total counter' in text
+    assert 'bot_user_cache_lookups_total{result="hit"} 2' in text
+    assert 'bot_user_cache_lookups_total{result="miss"} 1' in text
@@ -0,0 +1,51 @@
+# tests/test_my_tasks.py
+"""Страница «Мои задания»: корректный HTML и не длиннее одного сообщения"""
+from conftest import run_with_db
+from handlers.worker import get_my_tasks_page
+from utils import MESSAGE_MAX_LENGTH
+
+WORKER_ID = 2
+
+
+def buttons(markup) -> list:
+    return [button.callback_data for row in markup.inline_keyboard for button in row]
+
+
+def page_anchor(markup, direction: str) -> int:
+    """task_id из кнопки листания my_tasks:{direction}:{task_id}"""
+    prefix = f'my_tasks:{direction}:'
+    return next(int(data[len(prefix):]) for data in buttons(markup) if data.startswith(prefix))
+
+
+def test_my_tasks_page_escapes_task_text_and_comment(db_path):
+    async def scenario(db):
+        await db.add_user(WORKER_ID, None, 'Иванов Иван')
+        task_id = await db.add_admin_task(1, WORKER_ID, 'Бетон <M300> & арматура')
+        await db.update_task_status(task_id, 'commented', 'Нет <крана>')
+        return await get_my_tasks_page(db, WORKER_ID)
+
+    text, _ = run_with_db(db_path, scenario)
+
+    assert 'Бетон &lt;M300&gt; &amp; арматура' in text
+    assert 'Нет &lt;крана&gt;' in text
+
+
+def test_my_tasks_page_fits_one_message(db_path):
+    async def scenario(db):
+        await db.add_user(WORKER_ID, None, 'Иванов Иван')
+        for number in range(5):
+            # После экранирования каждая карточка - больше 2000 символов
+            await db.add_admin_task(1, WORKER_ID, f'{number} ' + '<&' * 250)
+        first = await get_my_tasks_page(db, WORKER_ID)
+        second = await get_my_tasks_page(db, WORKER_ID, page_anchor(first[1], 'next'), 'next')
+        back = await get_my_tasks_page(db, WORKER_ID, page_anchor(second[1], 'prev'), 'prev')
+        return first, second, back
+
+    pages = run_with_db(db_path, scenario)
+
+    for text, _ in pages:
+        assert len(text) <= MESSAGE_MAX_LENGTH
+    (first, _), (second, _), (back, _) = pages
+    assert first.startswith('📋 **Задание #5**')
+    assert second.startswith('📋 **Задание #4**')
+    assert back == first
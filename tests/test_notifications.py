@@ -0,0 +1,65 @@
+# tests/test_notifications.py
+"""Уведомления с текстами пользователей - корректный HTML; недоставленные не теряются молча"""
+import logging
+
+import metrics
+from broadcaster import DeliveryResult
+from conftest import callback_update, committed, feed_updates, message_update, run_with_db
+from outbox import OutboxDispatcher
+
+ADMIN_ID = 1
+WORKER_ID = 2
+TASK_TEXT = 'Нужен бетон <M300> & кран'
+
+
+async def add_users(db):
+    await db.add_admin(ADMIN_ID, ADMIN_ID)
+    await db.add_user(ADMIN_ID, None, 'Петров <Админ>')
+    await db.add_user(WORKER_ID, None, 'Иванов & сыновья')
+
+
+def test_request_and_rejection_notifications_are_escaped(db_path):
+    feed_updates(
+        db_path, add_users,
+        message_update(WORKER_ID, "📝 Создать задание"),
+        message_update(WORKER_ID, TASK_TEXT),
+        callback_update(ADMIN_ID, 'reject_task:1'),
+        message_update(ADMIN_ID, 'Марка <M300> не нужна'),
+    )
+
+    (to_admin,), (to_worker,) = (
+        committed(db_path, 'SELECT message FROM notifications WHERE user_id = ?', (user_id,))
+        for user_id in (ADMIN_ID, WORKER_ID)
+    )
+    assert 'Иванов &amp; сыновья' in to_admin[0]
+    assert 'Нужен бетон &lt;M300&gt; &amp; кран' in to_admin[0]
+    assert 'Нужен бетон &lt;M300&gt; &amp; кран' in to_worker[0]
+    assert 'Марка &lt;M300&gt; не нужна' in to_worker[0]
+    # Сам текст хранится как есть
+    assert committed(db_path, 'SELECT task_text FROM worker_tasks') == [(TASK_TEXT,)]
+
+
+class RejectingBroadcaster:
+    """Broadcaster, которому Telegram отвечает постоянной ошибкой"""
+
+    async def send_many(self, bot, messages):
+        return [DeliveryResult(chat_id, False, error='Bad Request: chat not found', permanent=True)
+                for chat_id, _, _ in messages]
+
+
+def test_permanently_failed_notification_is_logged(db_path, caplog):
+    async def scenario(db):
+        await db.add_user(WORKER_ID, None, 'Иванов Иван')
+        await db.add_admin_task(ADMIN_ID, WORKER_ID, 'Залить бетон',
+                                notify=lambda task_id: [(WORKER_ID, 'Задание', None)])
+        outbox = OutboxDispatcher(db, RejectingBroadcaster())
+        return await outbox.drain(bot=None)
+
+    before = metrics.notifications_failed_total.value('permanent')
+    with caplog.at_level(logging.ERROR, logger='outbox'):
+        assert run_with_db(db_path, scenario) == 1
+
+    assert committed(db_path, 'SELECT status FROM notifications') == [('failed',)]
+    assert metrics.notifications_failed_total.value('permanent') == before + 1
+    assert any('помечено failed' in record.getMessage() and 'chat not found' in record.getMessage()
+               for record in caplog.records)
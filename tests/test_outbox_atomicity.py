@@ -0,0 +1,62 @@
+# tests/test_outbox_atomicity.py
+"""Изменение задания и уведомления о нем фиксируются вместе или не фиксируются вовсе"""
+import sqlite3
+
+import pytest
+
+from conftest import committed, run_with_db
+from database import Database
+
+# user_id NOT NULL: вставка такого уведомления падает после изменения задания
+BROKEN_NOTIFICATION = (None, 'Задание принято', None)
+
+
+@pytest.mark.parametrize('group_commit_ms', [0, 5])
+def test_status_change_rolled_back_with_failed_notification(db_path, group_commit_ms):
+    async def scenario(db):
+        await db.add_user(2, None, 'Иванов Иван')
+        task_id = await db.add_admin_task(1, 2, 'Залить бетон')
+        with pytest.raises(sqlite3.IntegrityError):
+            await db.update_task_status(task_id, 'accepted', notifications=[(1, 'ok', None), BROKEN_NOTIFICATION])
+        # Чужая запись после ошибки - ее коммит не должен захватить откаченное
+        await db.add_worker_task(2, 'Нужен кран к девяти')
+        return task_id
+
+    task_id = run_with_db(db_path, scenario, group_commit_ms)
+
+    assert committed(db_path, 'SELECT status, read_at FROM admin_tasks WHERE task_id = ?', (task_id,)) == [
+        ('pending', None)
+    ]
+    assert committed(db_path, 'SELECT COUNT(*) FROM notifications') == [(0,)]
+
+
+@pytest.mark.parametrize('group_commit_ms', [0, 5])
+def test_worker_task_rolled_back_with_failed_notification(db_path, group_commit_ms):
+    async def scenario(db):
+        await db.add_user(2, None, 'Иванов Иван')
+        with pytest.raises(sqlite3.IntegrityError):
+            await db.add_worker_task(2, 'Нужен кран к девяти', notify=lambda task_id: [BROKEN_NOTIFICATION])
+        await db.add_admin_task(1, 2, 'Залить бетон')
+
+    run_with_db(db_path, scenario, group_commit_ms)
+
+    assert committed(db_path, 'SELECT COUNT(*) FROM worker_tasks') == [(0,)]
+    assert committed(db_path, 'SELECT COUNT(*) FROM notifications') == [(0,)]
+    assert committed(db_path, 'SELECT COUNT(*) FROM admin_tasks') == [(1,)]
+
+
+def test_sync_database_rolls_back_failed_notification(db_path):
+    db = Database(db_path)
+    try:
+        db.add_user(2, None, 'Иванов Иван')
+        task_id = db.add_admin_task(1, 2, 'Залить бетон')
+        with pytest.raises(sqlite3.IntegrityError):
+            db.update_worker_task_status(task_id, 'approved', 1, notifications=[BROKEN_NOTIFICATION])
+        with pytest.raises(sqlite3.IntegrityError):
+            db.update_task_status(task_id, 'accepted', notifications=[(1, 'ok', None), BROKEN_NOTIFICATION])
+        db.commit()
+    finally:
+        db.close()
+
+    assert committed(db_path, 'SELECT status FROM admin_tasks WHERE task_id = ?', (task_id,)) == [('pending',)]
+    assert committed(db_path, 'SELECT COUNT(*) FROM notifications') == [(0,)]
@@ -0,0 +1,92 @@
+# tests/test_query_plans.py
+"""Запросы, которые реально выполняют методы Database, идут по индексам и без сортировки в памяти.
+
+БД создается миграциями и заполняется генератором bench.db_bench (с
+ANALYZE), методы вызываются с аргументами замеров db_bench, а SQL и
+параметры каждого запроса перехватываются у профилировщика - проверяется
+ровно то, что уходит в SQLite.
+"""
+import random
+
+import pytest
+
+from bench.db_bench import BENCHMARKS, Benchmark, seed
+from config import Config
+from database import Database
+
+# Ветки методов, которых нет среди замеров
+EXTRA_CASES = [
+    Benchmark('get_workers_page (prev)', 'get_workers_page',
+              lambda data, rng: (Config.WORKERS_PAGE_SIZE, rng.choice(data.workers), 'prev')),
+    Benchmark('get_worker_tasks_page (anchor)', 'get_worker_tasks_page',
+              lambda data, rng: (rng.choice(data.workers), Config.TASKS_PAGE_SIZE, rng.choice(data.admin_task_ids))),
+    Benchmark('get_worker_tasks_page (prev)', 'get_worker_tasks_page',
+              lambda data, rng: (rng.choice(data.workers), Config.TASKS_PAGE_SIZE,
+                                 rng.choice(data.admin_task_ids), 'prev')),
+    Benchmark('get_timeline_page (prev)', 'get_timeline_page',
+              lambda data, rng: (Config.TIMELINE_PAGE_SIZE, ('w', rng.choice(data.worker_task_ids)), 'prev')),
+    Benchmark('get_timeline_page (dates)', 'get_timeline_page', lambda data, rng: (Config.TIMELINE_PAGE_SIZE,),
+              {'date_from': '2000-01-01 00:00:00', 'date_to': '2100-01-01 00:00:00'}),
+    Benchmark('search_workers (prefix)', 'search_workers', lambda data, rng: ('Ив', Config.WORKERS_PAGE_SIZE)),
+    Benchmark('get_existing_worker_ids', 'get_existing_worker_ids', lambda data, rng: (data.workers[:5],)),
+    Benchmark('get_due_notifications', 'get_due_notifications', kwargs={'exclude_ids': [1, 2]}),
+    Benchmark('mark_notifications_sent', 'mark_notifications_sent', lambda data, rng: ([1, 2],)),
+    Benchmark('get_fsm_record', 'get_fsm_record', lambda data, rng: ('1:1:1',)),
+    Benchmark('delete_expired_fsm_records', 'delete_expired_fsm_records', lambda data, rng: (0.0,)),
+]
+
+# Полнотекстовый индекс отдает совпадения в порядке rowid, сортируются только найденные
+# строки (работники - по ФИО, задания - по bm25); иначе пришлось бы обходить всю таблицу
+TEMP_BTREE_ALLOWED = {'search_workers', 'search_tasks'}
+# Счетчики и гистограмма - десяток строк, которые статистика читает целиком
+FULL_SCAN_ALLOWED = {'stat_counters', 'read_latency_hist'}
+
+
+@pytest.fixture(scope='module')
+def seeded(tmp_path_factory):
+    db = Database(str(tmp_path_factory.mktemp('plans') / 'plans.db'))
+    data = seed(db, random.Random(1), workers=300, admins=3, admin_tasks=3000, worker_tasks=1000)
+    tables = {row[0] for row in db.conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    yield db, data, tables
+    db.close()
+
+
+def capture_queries(db: Database, case: Benchmark, data) -> list:
+    """(sql, params) всех запросов, выполненных методом"""
+    with db.profiler.capture() as queries:
+        getattr(db, case.method)(*case.args(data, random.Random(2)), **case.kwargs)
+    db.commit()
+    return queries
+
+
+def plan_problems(plan: list, tables: set, method: str) -> list:
+    problems = []
+    for line in plan:
+        if 'USE TEMP B-TREE' in line and method not in TEMP_BTREE_ALLOWED:
+            problems.append(line)
+        words = line.split()
+        # SCAN таблицы без индекса - полный проход; SCAN подзапроса или CONSTANT ROW - нет
+        if words[0] == 'SCAN' and words[1] in tables and 'INDEX' not in line and words[1] not in FULL_SCAN_ALLOWED:
+            problems.append(line)
+    uses_index = any('INDEX' in line or 'PRIMARY KEY' in line for line in plan)
+    if not uses_index and not any(line.split()[1] in FULL_SCAN_ALLOWED for line in plan):
+        problems.append('нет индекса')
+    return problems
+
+
+# get_user в замерах - попадание в кэш без запросов, его промах - load_user
+CASES = [case for case in BENCHMARKS if case.method != 'get_user'] + EXTRA_CASES
+
+
+@pytest.mark.parametrize('case', CASES, ids=lambda case: case.name)
+def test_queries_use_indexes(seeded, case):
+    db, data, tables = seeded
+    queries = capture_queries(db, case, data)
+    assert queries, f"{case.name} не выполнил ни одного запроса"
+
+    for sql, params in queries:
+        plan = db.profiler.explain(db.conn, sql, params)
+        if not plan:
+            continue  # у INSERT ... VALUES плана нет
+        problems = plan_problems(plan, tables, case.method)
+        assert not problems, f"{' '.join(sql.split())}\nплан: {'; '.join(plan)}\nпроблемы: {problems}"
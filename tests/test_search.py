@@ -0,0 +1,20 @@
+# tests/test_search.py
+"""Страница результатов поиска - корректный HTML при любых текстах"""
+from conftest import run_with_db
+from handlers.common import get_search_page
+
+
+def test_search_page_escapes_query_and_snippet(db_path):
+    async def scenario(db):
+        await db.add_user(2, None, 'Иванов <Иван>')
+        await db.add_admin_task(1, 2, 'Нужен «бетон» <M300> & арматура, секция 4')
+        found = await get_search_page(db, 'бетон', 0, 'admin', 1)
+        missing = await get_search_page(db, '<b>кран & co', 0, 'admin', 1)
+        return found, missing
+
+    (text, _), (missing_text, _) = run_with_db(db_path, scenario)
+
+    assert '«<b>бетон</b>» &lt;M300&gt; &amp; арматура' in text
+    assert 'Иванов &lt;Иван&gt;' in text
+    assert '\x02' not in text and '\x03' not in text
+    assert missing_text == '🔎 По запросу «&lt;b&gt;кран &amp; co» ничего не найдено.'
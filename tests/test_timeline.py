@@ -0,0 +1,55 @@
+# tests/test_timeline.py
+"""Листание ленты вперед и назад проходит все записи по одному разу и в порядке ключа"""
+import random
+
+import pytest
+
+from bench.db_bench import seed
+from database import Database
+
+PAGE = 7
+
+
+@pytest.fixture(scope='module')
+def db(tmp_path_factory):
+    db = Database(str(tmp_path_factory.mktemp('timeline') / 'timeline.db'))
+    seed(db, random.Random(3), workers=5, admins=2, admin_tasks=120, worker_tasks=60)
+    # Одинаковое время создания у заданий обеих таблиц - ключ должен различать их по task_id и kind
+    db.conn.execute("UPDATE admin_tasks SET created_at = '2024-05-01 12:00:00' WHERE task_id <= 10")
+    db.conn.execute("UPDATE worker_tasks SET created_at = '2024-05-01 12:00:00' WHERE task_id <= 10")
+    db.commit()
+    yield db
+    db.close()
+
+
+def expected(db: Database, status: str = None) -> list:
+    rows = []
+    for kind, table, _, _ in Database.TIMELINE_SOURCES:
+        where, params = ('WHERE status = ?', (status,)) if status else ('', ())
+        rows += [(row[0], row[1], kind) for row in db.conn.execute(
+            f'SELECT created_at, task_id FROM {table} {where}', params
+        )]
+    return [(kind, task_id) for _, task_id, kind in sorted(rows, reverse=True)]
+
+
+@pytest.mark.parametrize('filters', [{}, {'status': 'pending'}])
+def test_pages_cover_timeline_in_order(db, filters):
+    entries, has_newer, has_older = db.get_timeline_page(PAGE, **filters)
+    pages = [entries]
+    assert not has_newer
+    while has_older:
+        last = pages[-1][-1]
+        entries, _, has_older = db.get_timeline_page(PAGE, (last['kind'], last['task_id']), 'next', **filters)
+        pages.append(entries)
+
+    forward = [(row['kind'], row['task_id']) for page in pages for row in page]
+    assert forward == expected(db, filters.get('status'))
+
+    # Назад от последней страницы - те же страницы
+    backward = [pages[-1]]
+    has_newer = True
+    while has_newer:
+        first = backward[-1][0]
+        entries, has_newer, _ = db.get_timeline_page(PAGE, (first['kind'], first['task_id']), 'prev', **filters)
+        backward.append(entries)
+    assert [(row['kind'], row['task_id']) for page in reversed(backward) for row in page] == forward
@@ -0,0 +1,66 @@
+# tests/test_transactions.py
+"""Записи метода, завершившегося ошибкой, не фиксируются ничьим коммитом"""
+import asyncio
+
+import pytest
+
+from conftest import committed, run_with_db
+from database import AsyncDatabase
+
+BAD_WORKERS = [(3, None, 'Сидоров Сидор'), (10 ** 20, None, 'Плохой Ряд')]
+
+
+@pytest.mark.parametrize('group_commit_ms', [0, 5])
+def test_failed_write_is_not_committed_by_next_write(db_path, group_commit_ms):
+    async def scenario(db):
+        await db.add_user(2, None, 'Иванов Иван')
+        with pytest.raises(OverflowError):
+            await db.import_workers(BAD_WORKERS)
+        await db.add_worker_task(2, 'Нужен кран к девяти')
+
+    run_with_db(db_path, scenario, group_commit_ms)
+
+    assert committed(db_path, 'SELECT user_id FROM users ORDER BY user_id') == [(2,)]
+    assert len(committed(db_path, 'SELECT task_id FROM worker_tasks')) == 1
+
+
+def test_failed_write_in_open_group_keeps_other_writes(db_path):
+    async def scenario(db):
+        await db.add_user(2, None, 'Иванов Иван')
+        # Обе записи попадают в одну групповую транзакцию
+        results = await asyncio.gather(
+            db.add_worker_task(2, 'Нужен кран к девяти'),
+            db.import_workers(BAD_WORKERS),
+            db.add_worker_task(2, 'Нужны леса на секцию'),
+            return_exceptions=True
+        )
+        assert isinstance(results[1], OverflowError)
+
+    run_with_db(db_path, scenario, group_commit_ms=50)
+
+    assert committed(db_path, 'SELECT user_id FROM users ORDER BY user_id') == [(2,)]
+    assert len(committed(db_path, 'SELECT task_id FROM worker_tasks')) == 2
+
+
+def test_close_commits_pending_writes_without_waiting_for_timer(db_path):
+    async def main():
+        db = AsyncDatabase(db_path, group_commit_ms=60_000)
+        await db.connect()
+        waiting = asyncio.ensure_future(db.add_user(2, None, 'Иванов Иван'))
+        while db._commit_timer is None:
+            await asyncio.sleep(0.001)
+        timer = db._commit_timer
+        # Запись уже в очереди потока БД, но закончится во время закрытия
+        late = asyncio.ensure_future(db.add_worker_task(2, 'Нужен кран к девяти'))
+        await asyncio.sleep(0)
+
+        await asyncio.wait_for(db.close(), 5)
+        await asyncio.wait_for(asyncio.gather(waiting, late), 1)
+        assert timer.cancelled()
+        with pytest.raises(AttributeError):
+            await db.add_worker_task(2, 'После закрытия')
+
+    asyncio.run(main())
+
+    assert committed(db_path, 'SELECT user_id FROM users') == [(2,)]
+    assert committed(db_path, 'SELECT task_text FROM worker_tasks') == [('Нужен кран к девяти',)]
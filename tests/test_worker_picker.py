@@ -0,0 +1,73 @@
+# tests/test_worker_picker.py
+"""Выбор работника: признак наличия работников, кэш первой страницы и поиск по ФИО"""
+from aiogram.methods import SendMessage
+
+from config import Config
+from conftest import feed_updates, message_update, run_with_db
+from handlers.admin import get_worker_picker
+
+
+def test_picker_reports_workers_and_follows_roster(db_path):
+    async def scenario(db):
+        markup, has_workers = await get_worker_picker(db)
+        assert not has_workers
+        # Кнопка выбора нескольких есть и без работников
+        assert markup.inline_keyboard
+
+        await db.add_user(2, None, 'Иванов Иван')
+        markup, has_workers = await get_worker_picker(db)
+        assert has_workers
+        assert any(button.callback_data == 'select_worker:2' for row in markup.inline_keyboard for button in row)
+
+        # Пока список не менялся, первая страница берется из кэша
+        assert await get_worker_picker(db) == (markup, has_workers)
+
+    run_with_db(db_path, scenario)
+
+
+def test_picker_cache_is_per_database(tmp_path):
+    async def first(db):
+        await db.add_user(2, None, 'Иванов Иван')
+        return await get_worker_picker(db)
+
+    async def second(db):
+        # Та же roster_version, что и у первой БД
+        await db.add_user(3, None, 'Петров Петр')
+        return await get_worker_picker(db)
+
+    run_with_db(str(tmp_path / 'first.db'), first)
+    markup, _ = run_with_db(str(tmp_path / 'second.db'), second)
+
+    workers = [button.callback_data for row in markup.inline_keyboard for button in row
+               if button.callback_data.startswith('select_worker:')]
+    assert workers == ['select_worker:3']
+
+
+def search_answer(db_path, workers: int, query: str) -> str:
+    """Ответ на поиск работника при workers работниках «Иванов N»"""
+    async def add_users(db):
+        await db.add_admin(1, 1)
+        for number in range(workers):
+            await db.add_user(10 + number, None, f'Иванов {number}')
+
+    requests = feed_updates(
+        db_path, add_users,
+        message_update(1, "📨 Отправить задание"),
+        message_update(1, query),
+    )
+    return [request.text for request in requests if isinstance(request, SendMessage)][-1]
+
+
+def test_search_reports_more_only_when_there_are_more(db_path, tmp_path):
+    limit = Config.WORKERS_PAGE_SIZE
+
+    assert search_answer(db_path, limit, 'Иванов') == f"🔎 Найдено по «Иванов»: {limit}. Выберите работника:"
+    assert search_answer(str(tmp_path / 'more.db'), limit + 1, 'Иванов').startswith(
+        f"🔎 По «Иванов» найдено больше {limit}, показаны первые."
+    )
+
+
+def test_search_escapes_query(db_path):
+    assert search_answer(db_path, 1, '<Ив> & Co') == (
+        "😕 По запросу «&lt;Ив&gt; &amp; Co» никого не найдено. Введите другую часть ФИО:"
+    )
@@ -1,9 +1,13 @@
 import logging
+import math
 from typing import Optional
 from datetime import datetime
 
 logger = logging.getLogger(__name__)
 
+# Максимальная длина текста сообщения Telegram
+MESSAGE_MAX_LENGTH = 4096
+
 
 def format_datetime(dt: Optional[str]) -> str:
     """Форматирование даты и времени"""
@@ -19,7 +23,7 @@ def format_datetime(dt: Optional[str]) -> str:
 
         return dt_obj.strftime("%d.%m.%Y %H:%M")
     except Exception as e:
-        logger.warning(f"Ошибка форматирования даты {dt}: {e}")
+        logger.warning("Ошибка форматирования даты %s: %s", dt, e)
         return str(dt)
 
 
@@ -36,6 +40,60 @@ def truncate_text(text: str, max_length: int = 100) -> str:
     return text[:max_length - 3] + "..."
 
 
+def fit_cards(cards: list, header: str = "", separator: str = "\n\n",
+              max_length: int = MESSAGE_MAX_LENGTH, from_end: bool = False) -> int:
+    """Сколько карточек целиком помещается в одно сообщение вместе с заголовком.
+
+    Карточки не разрезаются: лишние переносятся на следующую страницу.
+    from_end - набираем карточки с конца списка. Первая карточка
+    помещается всегда (слишком длинную нужно обрезать заранее).
+    """
+    length = len(header)
+    count = 0
+    for card in (reversed(cards) if from_end else cards):
+        length += len(card) + (len(separator) if count else 0)
+        if count and length > max_length:
+            break
+        count += 1
+    return count
+
+
+def histogram_percentile(buckets: list, fraction: float) -> Optional[float]:
+    """Процентиль по гистограмме [(верхняя граница, count)], отсортированной по границе.
+
+    Внутри интервала значения считаются распределенными равномерно.
+    Граница None - открытый последний интервал (результат - inf).
+    None - если гистограмма пустая.
+    """
+    total = sum(count for _, count in buckets)
+    if not total:
+        return None
+
+    target = total * fraction
+    lower, seen = 0, 0
+    for upper, count in buckets:
+        if count and seen + count >= target:
+            if upper is None:
+                return math.inf
+            return lower + (upper - lower) * (target - seen) / count
+        lower, seen = upper, seen + count
+    return lower
+
+
+def format_duration(seconds: float) -> str:
+    """Длительность коротко: 45 сек, 12 мин, 3 ч 20 мин, 2 д 5 ч"""
+    seconds = int(seconds)
+    if seconds < 60:
+        return f"{seconds} сек"
+    if seconds < 3600:
+        return f"{seconds // 60} мин"
+    if seconds < 86400:
+        hours, minutes = divmod(seconds // 60, 60)
+        return f"{hours} ч {minutes} мин" if minutes else f"{hours} ч"
+    days, hours = divmod(seconds // 3600, 24)
+    return f"{days} д {hours} ч" if hours else f"{days} д"
+
+
 def validate_fio(fio: str) -> tuple[bool, str]:
     """Валидация ФИО"""
     fio = fio.strip()